@@ -0,0 +1,114 @@
+"""
+Kandidat recognition per course: set student_id yang terdaftar (CourseEnrollment).
+
+Recognition di endpoint attendance hanya boleh menghasilkan mahasiswa yang
+terdaftar di course sesi itu, jadi klasifikasi dibatasi ke set ini (kolom SVM /
+baris galeri, lihat face_recognition.classify_features) dan probabilitasnya
+dinormalisasi ulang di subset tersebut.
+
+Set di-load sekali per course (saat sesi dibuat / request pertama) dan
+di-invalidate setelah commit yang menambah / menghapus / mengubah
+CourseEnrollment lewat ORM. Perubahan di luar ORM (SQL langsung, proses lain)
+terlihat paling lambat setelah CANDIDATE_CACHE_TTL detik.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+
+from . import metrics, models
+from .database import SessionLocal
+
+# 0 = tanpa cache (enrollment di-query tiap request)
+CANDIDATE_CACHE_TTL = float(os.getenv("CANDIDATE_CACHE_TTL", "300"))
+CANDIDATE_CACHE_SIZE = int(os.getenv("CANDIDATE_CACHE_SIZE", "1024"))
+
+# Kunci di Session.info: course yang enrollment-nya berubah di transaksi berjalan
+_DIRTY_KEY = "candidate_cache_dirty"
+
+LOOKUPS = metrics.register(metrics.Counter(
+    "candidate_cache_lookups_total", "Lookup set kandidat recognition per course (hit / miss)", labels=("result",)
+))
+
+
+class CandidateCache:
+    def __init__(self, ttl: float = CANDIDATE_CACHE_TTL, max_entries: int = CANDIDATE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # course_id -> (frozenset student_id, expires_at)
+        self._versions = {}
+        # Dipanggil dengan course_id setiap enrollment course berubah (mis. registry sesi aktif)
+        self.listeners = []
+
+    def get(self, db, course_id: int):
+        """frozenset student_id yang terdaftar di course"""
+        with self._lock:
+            entry = self._entries.get(course_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(course_id)
+                LOOKUPS.inc(1, "hit")
+                return entry[0]
+        LOOKUPS.inc(1, "miss")
+        return self.load(db, course_id)
+
+    def load(self, db, course_id: int):
+        """Query enrollment course (satu SELECT) dan simpan di cache"""
+        with self._lock:
+            version = self._versions.get(course_id, 0)
+        rows = db.query(models.CourseEnrollment.student_id).filter(models.CourseEnrollment.course_id == course_id)
+        candidates = frozenset(row.student_id for row in rows)
+        with self._lock:
+            # Enrollment berubah selagi query berjalan -> jangan simpan set lama
+            if self.ttl > 0 and self._versions.get(course_id, 0) == version:
+                self._entries[course_id] = (candidates, time.monotonic() + self.ttl)
+                self._entries.move_to_end(course_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return candidates
+
+    def invalidate(self, course_id: int):
+        with self._lock:
+            self._versions[course_id] = self._versions.get(course_id, 0) + 1
+            self._entries.pop(course_id, None)
+        for listener in self.listeners:
+            listener(course_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+candidate_cache = CandidateCache()
+
+metrics.register(metrics.Gauge(
+    "candidate_cache_courses", "Course dengan set kandidat di memori", lambda: {(): len(candidate_cache)}
+))
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _collect_enrollment_changes(db, flush_context, instances):
+    courses = {
+        obj.course_id
+        for obj in (*db.new, *db.dirty, *db.deleted)
+        if isinstance(obj, models.CourseEnrollment)
+    }
+    # Enrollment yang dipindah ke course lain: course lama juga berubah
+    for obj in db.dirty:
+        if isinstance(obj, models.CourseEnrollment):
+            courses.update(v for v in inspect(obj).attrs.course_id.history.deleted or () if v is not None)
+    if courses:
+        db.info.setdefault(_DIRTY_KEY, set()).update(courses)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_after_commit(db):
+    for course_id in db.info.pop(_DIRTY_KEY, ()):
+        candidate_cache.invalidate(course_id)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_after_rollback(db):
+    db.info.pop(_DIRTY_KEY, None)
@@ -0,0 +1,111 @@
+"""
+Export detektor YOLO (yolov5su.pt) ke ONNX untuk backend FACE_DETECTOR=onnx.
+
+    python -m app.detector_export [--imgsz 640 | --imgsz H W] [--int8] [--calib 64]
+
+Menghasilkan model_files/yolov5su.onnx (fp32, input fixed 1x3xHxW) dan dengan
+--int8 juga model_files/yolov5su.int8.onnx: kuantisasi statis (QDQ, per channel)
+yang dikalibrasi dengan gambar app/dataset yang di-letterbox seperti saat inference.
+Shape input sebaiknya mengikuti rasio kamera (frame 720x1280 portrait:
+--imgsz 640 384, sama dengan letterbox PyTorch), padding persegi 640x640
+membuang ~40% komputasi. Pilih model lewat ONNX_MODEL_PATH. Cek latensi / memori / kecocokan box:
+python -m benchmarks.bench_onnx
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+
+from .detectors import ONNX_MODEL_PATH, YOLO_MODEL_PATH, letterbox
+
+
+def int8_path(onnx_path: str) -> str:
+    root, ext = os.path.splitext(onnx_path)
+    return f"{root}.int8{ext}"
+
+
+def export_onnx(weights: str = YOLO_MODEL_PATH, out: str = ONNX_MODEL_PATH, imgsz=640) -> str:
+    """Export lewat ultralytics (batch 1, shape statis, tanpa NMS di graph)"""
+    from ultralytics import YOLO
+
+    # ultralytics menulis .onnx di sebelah weights: export dari salinan di direktori sementara
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, os.path.basename(weights))
+        shutil.copyfile(weights, src)
+        exported = YOLO(src).export(format="onnx", imgsz=imgsz, dynamic=False, simplify=False, opset=17, verbose=False)
+        shutil.move(exported, out)
+    return out
+
+
+class _DatasetCalibration:
+    """CalibrationDataReader onnxruntime: gambar dataset, preprocessing sama dengan OnnxDetector"""
+
+    def __init__(self, paths, input_name: str, shape):
+        self.paths = iter(paths)
+        self.input_name = input_name
+        self.shape = shape
+
+    def get_next(self):
+        for path in self.paths:
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+            if image is None:
+                continue
+            canvas = letterbox(image, self.shape)[0]
+            return {self.input_name: cv2.dnn.blobFromImage(canvas, 1 / 255.0, swapRB=True)}
+        return None
+
+
+def quantize_int8(onnx_path: str, out: str, calib: int = 64) -> str:
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    from .training import scan_dataset
+
+    model_input = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0]
+    items = scan_dataset()
+    paths = [path for _, path in items[::max(1, len(items) // calib)][:calib]]
+    if not paths:
+        raise RuntimeError("app/dataset kosong: tidak ada gambar untuk kalibrasi int8")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepared = os.path.join(tmp, "prepared.onnx")
+        quant_pre_process(onnx_path, prepared, skip_symbolic_shape=True)
+        quantize_static(
+            prepared,
+            out,
+            _DatasetCalibration(paths, model_input.name, tuple(int(n) for n in model_input.shape[2:])),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=CalibrationMethod.MinMax,
+        )
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export detektor YOLO ke ONNX (fp32 / int8)")
+    parser.add_argument("--weights", default=YOLO_MODEL_PATH)
+    parser.add_argument("--out", default=ONNX_MODEL_PATH)
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[640], help="Input fixed: N (persegi) atau H W")
+    parser.add_argument("--int8", action="store_true", help="Juga buat model int8 (kalibrasi dari app/dataset)")
+    parser.add_argument("--calib", type=int, default=64, help="Jumlah gambar kalibrasi int8")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    out = export_onnx(args.weights, args.out, args.imgsz if len(args.imgsz) > 1 else args.imgsz[0])
+    print(f"fp32: {out} ({os.path.getsize(out) / 1e6:.1f} MB, {time.perf_counter() - start:.1f}s)")
+    if args.int8:
+        start = time.perf_counter()
+        quantized = quantize_int8(out, int8_path(out), args.calib)
+        print(f"int8: {quantized} ({os.path.getsize(quantized) / 1e6:.1f} MB, {time.perf_counter() - start:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,374 @@
+"""
+Backend deteksi wajah, dipilih per deployment lewat FACE_DETECTOR:
+
+- "yolo"  : yolov5su.pt (ultralytics), paling berat; YOLO_CLASSES / YOLO_CONF
+            untuk membuang kelas / box yang bukan wajah.
+- "onnx"  : model YOLO yang sama, diekspor ke ONNX (fp32 / int8) lewat
+            python -m app.detector_export, dijalankan onnxruntime tanpa torch.
+- "yunet" : cv2.FaceDetectorYN (model ONNX YuNet ~230 KB), khusus wajah, ringan di CPU.
+- "haar"  : cv2.CascadeClassifier frontal face, paling murah, recall paling rendah.
+
+Beberapa nama dipisah koma (mis. "haar,yunet,yolo") = mode cascade: backend
+pertama dijalankan untuk semua frame, frame yang tidak menghasilkan wajah
+saja yang diteruskan ke backend berikutnya. Urutan = pilihan eksplisit
+throughput vs recall.
+
+Perbandingan di app/dataset: python -m benchmarks.bench_detectors
+"""
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from . import metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FACE_DETECTOR = os.getenv("FACE_DETECTOR", "yolo")
+
+YOLO_MODEL_PATH = os.path.join(BASE_DIR, "model_files", "yolov5su.pt")
+# Kelas YOLO yang dipakai (mis. "0"); kosong = semua kelas (perilaku lama)
+YOLO_CLASSES = [int(c) for c in os.getenv("YOLO_CLASSES", "").split(",") if c.strip()]
+# Confidence minimum box YOLO; kosong = default ultralytics
+YOLO_CONF = float(os.getenv("YOLO_CONF")) if os.getenv("YOLO_CONF") else None
+
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", os.path.join(BASE_DIR, "model_files", "yolov5su.onnx"))
+# Thread intra-op onnxruntime per proses (worker pool: diset dari INFERENCE_TORCH_THREADS)
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", str(min(4, os.cpu_count() or 1))))
+# NMS backend onnx (di graph tidak ada NMS); default sama dengan ultralytics predict
+YOLO_IOU = float(os.getenv("YOLO_IOU", "0.7"))
+YOLO_MAX_DET = int(os.getenv("YOLO_MAX_DET", "300"))
+
+YUNET_MODEL_PATH = os.getenv(
+    "YUNET_MODEL_PATH", os.path.join(BASE_DIR, "model_files", "face_detection_yunet_2023mar.onnx")
+)
+YUNET_SCORE = float(os.getenv("YUNET_SCORE", "0.7"))
+
+HAAR_CASCADE_PATH = os.getenv(
+    "HAAR_CASCADE_PATH", os.path.join(getattr(cv2, "data", None) and cv2.data.haarcascades or "", "haarcascade_frontalface_default.xml")
+)
+HAAR_MIN_NEIGHBORS = int(os.getenv("HAAR_MIN_NEIGHBORS", "5"))
+
+# Sisi terpanjang gambar untuk YuNet / Haar (YOLO resize sendiri ke 640)
+DETECTOR_INPUT_SIDE = int(os.getenv("DETECTOR_INPUT_SIDE", "640"))
+# Wajah lebih kecil dari ini (px, di gambar input detektor) diabaikan
+DETECTOR_MIN_FACE = int(os.getenv("DETECTOR_MIN_FACE", "24"))
+
+RUNS = metrics.register(metrics.Counter(
+    "face_detector_frames_total", "Frame per backend deteksi (found / empty)", labels=("backend", "result")
+))
+
+
+def _clip_box(box, image):
+    """Box float (x1, y1, x2, y2) -> int di dalam gambar, None jika kosong"""
+    h, w = image.shape[:2]
+    x1, y1, x2, y2 = box
+    x1, y1 = max(0, int(x1)), max(0, int(y1))
+    x2, y2 = min(w, int(x2)), min(h, int(y2))
+    if x2 > x1 and y2 > y1:
+        return (x1, y1, x2, y2)
+    return None
+
+
+def _downscale(image, side: int):
+    """Perkecil supaya sisi terpanjang <= side; return (gambar, faktor skala balik)"""
+    h, w = image.shape[:2]
+    scale = max(h, w) / side
+    if scale <= 1:
+        return image, 1.0
+    small = cv2.resize(image, (round(w / scale), round(h / scale)), interpolation=cv2.INTER_AREA)
+    return small, scale
+
+
+class FaceDetector:
+    """detect_batch(list gambar BGR) -> list (per gambar) of list box (x1, y1, x2, y2)"""
+
+    name = "base"
+
+    def load(self):
+        pass
+
+    def detect_batch(self, images):
+        raise NotImplementedError
+
+
+class YoloDetector(FaceDetector):
+    name = "yolo"
+
+    def __init__(self, model_path: str = YOLO_MODEL_PATH, classes=YOLO_CLASSES, conf=YOLO_CONF):
+        self.model_path = model_path
+        self.classes = list(classes) or None
+        self.conf = conf
+        self.model = None
+
+    def load(self):
+        if self.model is None:
+            from ultralytics import YOLO
+
+            self.model = YOLO(self.model_path)
+
+    def detect_batch(self, images):
+        self.load()
+        options = {"verbose": False}
+        if self.classes:
+            options["classes"] = self.classes
+        if self.conf is not None:
+            options["conf"] = self.conf
+        results = self.model.predict(images, **options)
+        faces = []
+        for result, image in zip(results, images):
+            boxes = (_clip_box(box[:4], image) for box in result.boxes.xyxy.cpu().numpy())
+            faces.append([box for box in boxes if box is not None])
+        return faces
+
+
+def letterbox(image, shape):
+    """
+    Resize + padding abu-abu (114) ke shape (h, w) seperti LetterBox ultralytics.
+    Return (gambar, gain, pad_x, pad_y) untuk memetakan box kembali ke gambar asli.
+    """
+    side_h, side_w = shape
+    h, w = image.shape[:2]
+    gain = min(side_h / h, side_w / w)
+    nh, nw = round(h * gain), round(w * gain)
+    top, left = (side_h - nh) // 2, (side_w - nw) // 2
+    canvas = np.full((side_h, side_w, 3), 114, np.uint8)
+    canvas[top:top + nh, left:left + nw] = (
+        cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR) if (nh, nw) != (h, w) else image
+    )
+    return canvas, gain, left, top
+
+
+def _nms(boxes, scores, iou: float):
+    """NMS greedy (seperti torchvision.ops.nms); box digeser per kelas oleh pemanggil"""
+    order = np.argsort(-scores, kind="stable")
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0])
+        h = np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1])
+        inter = np.clip(w, 0, None) * np.clip(h, 0, None)
+        order = rest[inter / (areas[i] + areas[rest] - inter) <= iou]
+    return keep
+
+
+class OnnxDetector(FaceDetector):
+    """
+    YOLO hasil export ONNX di onnxruntime (CPU). Input fixed (letterbox ke shape
+    input model, mis. 640x384 untuk kamera portrait), output (1, 4 + n_kelas,
+    n_anchor) di-decode + NMS per kelas seperti ultralytics, jadi kontrak box
+    sama dengan YoloDetector.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: str = ONNX_MODEL_PATH, classes=YOLO_CLASSES, conf=YOLO_CONF, threads=None):
+        self.model_path = model_path
+        self.classes = list(classes) or None
+        self.conf = 0.25 if conf is None else conf
+        self.threads = threads
+        self.session = None
+
+    def load(self):
+        if self.session is not None:
+            return
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(
+                f"ONNX model not found: {self.model_path} (run python -m app.detector_export or set ONNX_MODEL_PATH)"
+            )
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = self.threads or ONNX_THREADS
+        options.inter_op_num_threads = 1
+        session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.shape = (int(model_input.shape[2]), int(model_input.shape[3]))
+        self.session = session
+
+    def detect_batch(self, images):
+        self.load()
+        faces = []
+        for image in images:
+            canvas, gain, pad_x, pad_y = letterbox(image, self.shape)
+            blob = cv2.dnn.blobFromImage(canvas, 1 / 255.0, swapRB=True)
+            output = self.session.run(None, {self.input_name: blob})[0][0]
+            faces.append(self._boxes(output, image, gain, pad_x, pad_y))
+        return faces
+
+    def _boxes(self, output, image, gain, pad_x, pad_y):
+        pred = output.T  # (n_anchor, 4 + n_kelas): cx, cy, w, h, skor per kelas
+        scores = pred[:, 4:]
+        class_ids = np.asarray(self.classes) if self.classes else np.arange(scores.shape[1])
+        scores = scores[:, class_ids]
+        best = scores.argmax(1)
+        conf = scores[np.arange(len(best)), best]
+        keep = conf > self.conf
+        if not keep.any():
+            return []
+        xywh, conf, cls = pred[keep, :4], conf[keep], class_ids[best[keep]]
+        xyxy = np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], axis=1)
+        boxes = []
+        for i in _nms(xyxy + cls[:, None] * 7680.0, conf, YOLO_IOU)[:YOLO_MAX_DET]:
+            x1, y1, x2, y2 = xyxy[i]
+            box = _clip_box(((x1 - pad_x) / gain, (y1 - pad_y) / gain, (x2 - pad_x) / gain, (y2 - pad_y) / gain), image)
+            if box is not None:
+                boxes.append(box)
+        return boxes
+
+
+class _PerThread(FaceDetector):
+    """Objek OpenCV (FaceDetectorYN / CascadeClassifier) tidak thread-safe: satu per thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _create(self):
+        raise NotImplementedError
+
+    def _get(self):
+        impl = getattr(self._local, "impl", None)
+        if impl is None:
+            impl = self._local.impl = self._create()
+        return impl
+
+    def load(self):
+        self._get()
+
+
+class YuNetDetector(_PerThread):
+    name = "yunet"
+
+    def __init__(self, model_path: str = YUNET_MODEL_PATH, score: float = YUNET_SCORE, side: int = DETECTOR_INPUT_SIDE):
+        super().__init__()
+        self.model_path = model_path
+        self.score = score
+        self.side = side
+
+    def _create(self):
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"YuNet model not found: {self.model_path} (set YUNET_MODEL_PATH)")
+        return cv2.FaceDetectorYN.create(self.model_path, "", (320, 320), self.score, 0.3, 5000)
+
+    def detect_batch(self, images):
+        yunet = self._get()
+        faces = []
+        for image in images:
+            small, scale = _downscale(image, self.side)
+            yunet.setInputSize((small.shape[1], small.shape[0]))
+            _, found = yunet.detect(small)
+            boxes = []
+            for x, y, w, h in (found[:, :4] if found is not None else ()):
+                if min(w, h) < DETECTOR_MIN_FACE:
+                    continue
+                box = _clip_box((x * scale, y * scale, (x + w) * scale, (y + h) * scale), image)
+                if box is not None:
+                    boxes.append(box)
+            faces.append(boxes)
+        return faces
+
+
+class HaarDetector(_PerThread):
+    name = "haar"
+
+    def __init__(self, cascade_path: str = HAAR_CASCADE_PATH, side: int = DETECTOR_INPUT_SIDE):
+        super().__init__()
+        self.cascade_path = cascade_path
+        self.side = side
+
+    def _create(self):
+        if not hasattr(cv2, "CascadeClassifier"):
+            # OpenCV 5 memindahkan cascade classifier ke modul contrib
+            raise RuntimeError("cv2.CascadeClassifier not available in this OpenCV build (install opencv-contrib-python)")
+        cascade = cv2.CascadeClassifier(self.cascade_path)
+        if cascade.empty():
+            raise FileNotFoundError(f"Haar cascade not found: {self.cascade_path} (set HAAR_CASCADE_PATH)")
+        return cascade
+
+    def detect_batch(self, images):
+        cascade = self._get()
+        faces = []
+        for image in images:
+            small, scale = _downscale(image, self.side)
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+            found = cascade.detectMultiScale(
+                gray,
+                scaleFactor=1.1,
+                minNeighbors=HAAR_MIN_NEIGHBORS,
+                minSize=(DETECTOR_MIN_FACE, DETECTOR_MIN_FACE),
+            )
+            boxes = []
+            for x, y, w, h in found:
+                box = _clip_box((x * scale, y * scale, (x + w) * scale, (y + h) * scale), image)
+                if box is not None:
+                    boxes.append(box)
+            faces.append(boxes)
+        return faces
+
+
+class CascadeDetector(FaceDetector):
+    """Backend murah dulu; hanya frame tanpa wajah yang naik ke backend berikutnya"""
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self.name = ",".join(stage.name for stage in self.stages)
+
+    def load(self):
+        for stage in self.stages:
+            stage.load()
+
+    def detect_batch(self, images):
+        faces = [[] for _ in images]
+        pending = list(range(len(images)))
+        for stage in self.stages:
+            if not pending:
+                break
+            found = stage.detect_batch([images[i] for i in pending])
+            still_empty = []
+            for i, boxes in zip(pending, found):
+                RUNS.inc(1, stage.name, "found" if boxes else "empty")
+                if boxes:
+                    faces[i] = boxes
+                else:
+                    still_empty.append(i)
+            pending = still_empty
+        return faces
+
+
+BACKENDS = {"yolo": YoloDetector, "onnx": OnnxDetector, "yunet": YuNetDetector, "haar": HaarDetector}
+
+
+def backend_names(spec: str = None):
+    """Nama backend di spesifikasi FACE_DETECTOR (default: yang dipakai proses ini), urut cascade"""
+    spec = FACE_DETECTOR if spec is None else spec
+    return [name.strip() for name in spec.split(",") if name.strip()]
+
+
+def set_num_threads(n: int):
+    """Batas thread per proses (worker pool): torch hanya di-import jika backend yolo dipakai"""
+    global ONNX_THREADS
+    ONNX_THREADS = n
+    if "yolo" in backend_names():
+        try:
+            import torch
+
+            torch.set_num_threads(n)
+        except ImportError:
+            pass
+
+
+def build_detector(spec: str = FACE_DETECTOR) -> FaceDetector:
+    """"yolo" / "onnx" / "yunet" / "haar", atau beberapa dipisah koma untuk mode cascade"""
+    names = backend_names(spec)
+    unknown = [name for name in names if name not in BACKENDS]
+    if not names or unknown:
+        raise ValueError(f"Unknown FACE_DETECTOR: {spec!r} (choose from {', '.join(BACKENDS)})")
+    return CascadeDetector([BACKENDS[name]() for name in names])
+
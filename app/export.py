@@ -0,0 +1,315 @@
+"""
+Export absensi satu semester (semua pertemuan x semua mahasiswa) ke CSV / PDF.
+
+Dikerjakan di thread background; baris dibaca dari DB lewat server-side
+cursor (yield_per) dan langsung ditulis ke file, jadi memori tidak tumbuh
+mengikuti jumlah pertemuan / mahasiswa. File disimpan dengan nama berisi
+fingerprint data attendance course, sehingga selama belum ada attendance
+baru export berikutnya langsung memakai file yang sama.
+"""
+import csv
+import hashlib
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+
+from sqlalchemy import and_, func
+
+from . import models
+from .database import SessionLocal
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(BASE_DIR, "exports"))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "1"))
+# Baris yang diambil per fetch dari cursor
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))
+# Job yang sudah selesai dilupakan setelah sekian detik (file tetap ada sebagai cache)
+EXPORT_JOB_TTL = int(os.getenv("EXPORT_JOB_TTL", "3600"))
+
+FORMATS = {"csv": "text/csv", "pdf": "application/pdf"}
+STATUS_CODES = {
+    models.AttendanceStatus.hadir: "H",
+    models.AttendanceStatus.sakit: "S",
+    models.AttendanceStatus.tanpa_keterangan: "TK",
+}
+
+
+class ExportJob:
+    __slots__ = (
+        "id", "course_id", "lecturer_id", "fmt", "fingerprint",
+        "status", "path", "error", "created_at", "finished_at",
+    )
+
+    def __init__(self, course_id: int, lecturer_id: int, fmt: str, fingerprint: str):
+        self.id = uuid.uuid4().hex
+        self.course_id = course_id
+        self.lecturer_id = lecturer_id
+        self.fmt = fmt
+        self.fingerprint = fingerprint
+        self.status = "pending"
+        self.path = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def filename(self) -> str:
+        return f"absensi_course{self.course_id}.{self.fmt}"
+
+
+# ---------------------------
+# Query
+# ---------------------------
+def course_fingerprint(db, course_id: int) -> str:
+    """
+    Versi data export course: jumlah + timestamp terakhir attendance, jumlah sesi
+    dan enrollment. Berubah setiap ada attendance baru / status dikoreksi.
+    """
+    att = (
+        db.query(func.count(models.Attendance.id), func.max(models.Attendance.timestamp))
+        .join(models.Session, models.Session.id == models.Attendance.session_id)
+        .filter(models.Session.course_id == course_id)
+        .one()
+    )
+    sessions = (
+        db.query(func.count(models.Session.id), func.max(models.Session.finished_at))
+        .filter(models.Session.course_id == course_id)
+        .one()
+    )
+    enrolled = (
+        db.query(func.count(models.CourseEnrollment.id))
+        .filter(models.CourseEnrollment.course_id == course_id)
+        .scalar()
+    )
+    raw = f"{att[0]}|{att[1]}|{sessions[0]}|{sessions[1]}|{enrolled}"
+    return hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()
+
+
+def _meetings(db, course_id: int):
+    """(meeting_no, session_id terbaru) per pertemuan, urut pertemuan"""
+    return (
+        db.query(models.Session.meeting_no, func.max(models.Session.id))
+        .filter(models.Session.course_id == course_id)
+        .group_by(models.Session.meeting_no)
+        .order_by(models.Session.meeting_no)
+        .all()
+    )
+
+
+def _iter_rows(db, course_id: int, session_ids):
+    """
+    Stream (student_id, nim, name, meeting_no, status) urut mahasiswa lalu pertemuan:
+    enrollment x sesi, LEFT JOIN attendances. Status None = belum absen.
+    """
+    if not session_ids:
+        return iter(())
+    q = (
+        db.query(
+            models.Student.id,
+            models.Student.nim,
+            models.Student.name,
+            models.Session.meeting_no,
+            models.Attendance.status,
+        )
+        .select_from(models.CourseEnrollment)
+        .join(models.Student, models.Student.id == models.CourseEnrollment.student_id)
+        .join(models.Session, models.Session.id.in_(session_ids))
+        .outerjoin(
+            models.Attendance,
+            and_(
+                models.Attendance.session_id == models.Session.id,
+                models.Attendance.student_id == models.Student.id,
+            ),
+        )
+        .filter(models.CourseEnrollment.course_id == course_id)
+        .order_by(models.Student.nim, models.Student.id, models.Session.meeting_no)
+        .execution_options(stream_results=True, yield_per=EXPORT_BATCH_ROWS)
+    )
+    return iter(q)
+
+
+# ---------------------------
+# Writer
+# ---------------------------
+def _write_csv(path: str, course, meetings, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["course_id", "course_name", "meeting_no", "nim", "name", "status"])
+        for _, nim, name, meeting_no, status in rows:
+            writer.writerow([
+                course.id,
+                course.name,
+                meeting_no,
+                nim,
+                name,
+                (status or models.AttendanceStatus.tanpa_keterangan).value,
+            ])
+
+
+def _write_pdf(path: str, course, meetings, rows):
+    """Rekap matriks: satu baris per mahasiswa, satu kolom per pertemuan (H / S / TK)"""
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.pdfgen import canvas
+
+    width, height = landscape(A4)
+    margin, line_h = 30, 14
+    meeting_nos = [meeting_no for meeting_no, _ in meetings]
+    fixed = [("No", 28), ("NIM", 80), ("Nama", 150)]
+    totals = ["H", "S", "TK"]
+    free = width - 2 * margin - sum(w for _, w in fixed)
+    col_w = max(free / (len(meeting_nos) + len(totals)), 14)
+
+    # pageCompression: halaman yang sudah selesai disimpan terkompresi, bukan teks mentah
+    pdf = canvas.Canvas(path, pagesize=(width, height), pageCompression=1)
+    pdf.setTitle(f"Rekap Absensi {course.name}")
+    state = {"y": 0, "page": 0}
+
+    def header():
+        state["page"] += 1
+        y = height - margin
+        pdf.setFont("Helvetica-Bold", 12)
+        pdf.drawString(margin, y, f"Rekap Absensi {course.name} (course {course.id})")
+        pdf.setFont("Helvetica", 8)
+        pdf.drawRightString(width - margin, y, f"Hal. {state['page']}")
+        y -= line_h * 1.5
+        pdf.setFont("Helvetica-Bold", 8)
+        x = margin
+        for title, w in fixed:
+            pdf.drawString(x, y, title)
+            x += w
+        for title in [str(m) for m in meeting_nos] + totals:
+            pdf.drawCentredString(x + col_w / 2, y, title)
+            x += col_w
+        pdf.line(margin, y - 3, width - margin, y - 3)
+        pdf.setFont("Helvetica", 8)
+        state["y"] = y - line_h
+
+    header()
+    for no, (_, student_rows) in enumerate(groupby(rows, key=lambda row: row[0]), start=1):
+        by_meeting = {}
+        nim = name = ""
+        for _, nim, name, meeting_no, status in student_rows:
+            by_meeting[meeting_no] = status or models.AttendanceStatus.tanpa_keterangan
+        if state["y"] < margin:
+            pdf.showPage()
+            header()
+        y = state["y"]
+        x = margin
+        for value, (_, w) in zip((str(no), nim, name[:32]), fixed):
+            pdf.drawString(x, y, value)
+            x += w
+        counts = dict.fromkeys(totals, 0)
+        for meeting_no in meeting_nos:
+            code = STATUS_CODES[by_meeting.get(meeting_no, models.AttendanceStatus.tanpa_keterangan)]
+            counts[code] += 1
+            pdf.drawCentredString(x + col_w / 2, y, code)
+            x += col_w
+        for code in totals:
+            pdf.drawCentredString(x + col_w / 2, y, str(counts[code]))
+            x += col_w
+        state["y"] = y - line_h
+    pdf.showPage()
+    pdf.save()
+
+
+_WRITERS = {"csv": _write_csv, "pdf": _write_pdf}
+
+
+# ---------------------------
+# Job manager
+# ---------------------------
+def export_path(course_id: int, fmt: str, fingerprint: str) -> str:
+    return os.path.join(EXPORT_DIR, f"course{course_id}-{fingerprint}.{fmt}")
+
+
+def generate(course_id: int, fmt: str, fingerprint: str) -> str:
+    """Tulis file export ke tmp lalu rename; file versi lama course ini dihapus"""
+    path = export_path(course_id, fmt, fingerprint)
+    if os.path.exists(path):
+        return path
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    db = SessionLocal()
+    try:
+        course = db.get(models.Course, course_id)
+        meetings = _meetings(db, course_id)
+        rows = _iter_rows(db, course_id, [session_id for _, session_id in meetings])
+        _WRITERS[fmt](tmp, course, meetings, rows)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        db.close()
+    os.replace(tmp, path)
+
+    prefix = f"course{course_id}-"
+    for name in os.listdir(EXPORT_DIR):
+        if name.startswith(prefix) and name.endswith(f".{fmt}") and os.path.join(EXPORT_DIR, name) != path:
+            try:
+                os.remove(os.path.join(EXPORT_DIR, name))
+            except FileNotFoundError:
+                pass
+    return path
+
+
+class ExportManager:
+    def __init__(self, workers: int = EXPORT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="export")
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def _prune(self):
+        cutoff = time.time() - EXPORT_JOB_TTL
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, db, course_id: int, lecturer_id: int, fmt: str) -> ExportJob:
+        """Buat job export; jika file untuk data terbaru sudah ada, job langsung selesai"""
+        fingerprint = course_fingerprint(db, course_id)
+        with self._lock:
+            self._prune()
+            for job in self._jobs.values():
+                if (
+                    job.course_id == course_id
+                    and job.fmt == fmt
+                    and job.fingerprint == fingerprint
+                    and job.lecturer_id == lecturer_id
+                    and job.status in ("pending", "running", "done")
+                ):
+                    return job
+
+            job = ExportJob(course_id, lecturer_id, fmt, fingerprint)
+            path = export_path(course_id, fmt, fingerprint)
+            if os.path.exists(path):
+                job.status, job.path, job.finished_at = "done", path, time.time()
+            else:
+                self._executor.submit(self._run, job)
+            self._jobs[job.id] = job
+            return job
+
+    def _run(self, job: ExportJob):
+        job.status = "running"
+        try:
+            job.path = generate(job.course_id, job.fmt, job.fingerprint)
+            job.status = "done"
+        except Exception as exc:
+            job.status = "error"
+            job.error = repr(exc)
+        job.finished_at = time.time()
+
+    def get(self, job_id: str):
+        job = self._jobs.get(job_id)
+        # File bisa sudah diganti versi yang lebih baru
+        if job is not None and job.status == "done" and not os.path.exists(job.path):
+            job.status, job.error = "expired", "Export file was replaced by a newer version"
+        return job
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+export_manager = ExportManager()
@@ -1,21 +1,138 @@
 import cv2
-import joblib
 import numpy as np
-from ultralytics import YOLO
-from skimage.feature import hog
 import os
+import threading
+import time
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+from . import detectors, metrics, model_registry
+from .features import HOG_SIZE, extract_hog_batch
+from .ingest import IngestedImage
+from .model_registry import SVM_MODEL_PATH, labels_path_for  # noqa: F401 (dipakai app/training.py)
 
-# Load YOLOv5su
-yolo_model = YOLO(os.path.join(BASE_DIR, "model_files", "yolov5su.pt"))
+# Model di-load lazy (load_models / warmup), bukan saat import,
+# supaya proses yang tidak butuh ML tidak ikut import torch/ultralytics
+detector = None  # backend deteksi wajah (app/detectors.py, FACE_DETECTOR)
+# Versi SVM aktif (app/model_registry.py). Dibaca sekali per pemanggilan, jadi
+# model + mapping label selalu dari versi yang sama walau di-swap di tengah request
+active_model = None
+svm_model = None  # alias active_model.svm
+svm_labels = None  # alias active_model.labels: label kelas SVM -> Student.id
+_load_lock = threading.Lock()
 
-# Load SVM
-svm_model = joblib.load(os.path.join(BASE_DIR, "model_files", "svm_face_recognition.pkl"))
+# Status load + warmup, dibaca oleh /health/ready
+model_state = {
+    "status": "not_loaded",  # not_loaded | loading | loaded | ready | error
+    "load_seconds": None,
+    "warmup_seconds": None,
+    "error": None,
+    "model_version": None,
+    "svm_scorer": None,
+}
 
 # Ukuran seragam untuk wajah
 FACE_SIZE = (128, 128)
-HOG_SIZE = (64, 64)
+WARMUP_FRAME_SIZE = (640, 640)
+
+# Backend klasifikasi: "svm" (svm_face_recognition.pkl) atau "gallery" (nearest neighbour, app/gallery.py)
+RECOGNITION_BACKEND = os.getenv("RECOGNITION_BACKEND", "svm")
+
+
+def label_to_student_id(label):
+    """Label kelas SVM -> Student.id dengan mapping versi model aktif"""
+    return active_model.student_id(label)
+
+
+def install_model(model):
+    """
+    Pasang versi SVM (model_registry.LoadedModel) dengan satu assignment.
+    Request yang sedang berjalan tetap memakai versi yang sudah dipegangnya.
+    """
+    global active_model, svm_model, svm_labels
+    active_model = model
+    svm_model, svm_labels = model.svm, model.labels
+    model_state["model_version"] = model.version
+    model_state["svm_scorer"] = model.scorer.name
+
+
+def load_models():
+    """Load detektor wajah (FACE_DETECTOR) + SVM versi aktif sekali saja (thread-safe)"""
+    global detector
+    if detector is not None and active_model is not None:
+        return
+    with _load_lock:
+        if detector is not None and active_model is not None:
+            return
+        model_state["status"] = "loading"
+        start = time.perf_counter()
+        try:
+            det = detectors.build_detector()
+            det.load()
+            model = active_model
+            if model is None:
+                model = model_registry.registry.load_active()
+                model_registry.smoke_test(model)
+        except Exception as exc:
+            model_state["status"] = "error"
+            model_state["error"] = repr(exc)
+            raise
+        detector = det
+        install_model(model)
+        model_state["detector"] = det.name
+        model_state["load_seconds"] = round(time.perf_counter() - start, 4)
+        model_state["status"] = "loaded"
+        model_state["error"] = None
+
+
+def get_detector():
+    load_models()
+    return detector
+
+
+def get_model():
+    """Versi SVM aktif; versi yang diaktifkan proses lain dipasang saat poll registry"""
+    load_models()
+    model_registry.registry.refresh(active_model.version, install_model)
+    return active_model
+
+
+def use_version(version: str):
+    """
+    Worker inference: pastikan versi SVM yang dipakai sama dengan versi aktif di
+    proses API (dikirim bersama batch). Gagal load -> tetap versi lama (dicatat).
+    """
+    load_models()
+    if version is None or active_model.version == version:
+        return
+    try:
+        model = model_registry.registry.load(version)
+        model_registry.smoke_test(model)
+    except Exception:
+        model_registry.logger.exception("Worker gagal load model %s, tetap %s", version, active_model.version)
+        return
+    install_model(model)
+
+
+def get_svm_model():
+    return get_model().svm
+
+
+def warmup():
+    """
+    Jalankan pipeline sekali di frame dummy supaya alokasi / inisialisasi
+    torch tidak dibebankan ke request pertama.
+    """
+    load_models()
+    if model_state["status"] == "ready":
+        return model_state
+    start = time.perf_counter()
+    dummy = np.zeros((WARMUP_FRAME_SIZE[1], WARMUP_FRAME_SIZE[0], 3), dtype=np.uint8)
+    # Frame kosong: pada mode cascade semua backend ikut terpanggil (tidak ada wajah)
+    detector.detect_batch([dummy])
+    features = extract_hog_features(cv2.resize(dummy, FACE_SIZE)).reshape(1, -1)
+    classify_features(features)
+    model_state["warmup_seconds"] = round(time.perf_counter() - start, 4)
+    model_state["status"] = "ready"
+    return model_state
 
 
 def select_largest_face(faces):
@@ -26,64 +143,249 @@ def select_largest_face(faces):
     return faces[np.argmax(face_sizes)]
 
 
+def _detection_image(frame):
+    """Frame bisa array BGR atau IngestedImage (upload yang di-decode di resolusi turun)"""
+    if isinstance(frame, IngestedImage):
+        return frame.detection_image
+    return frame
+
+
+def detect_faces_batch(images):
+    """Deteksi wajah untuk banyak frame sekaligus (YOLO: satu kali predict untuk semua frame)"""
+    images = [_detection_image(image) for image in images]
+    if not images:
+        return []
+    model = get_detector()
+    with metrics.stage("detect"):
+        return model.detect_batch(images)
+
+
+def detect_faces(image):
+    """Deteksi semua wajah (tanpa memilih yang terbesar)"""
+    return detect_faces_batch([image])[0]
+
+
 def detect_face(image):
-    """Deteksi wajah dengan YOLO"""
-    results = yolo_model.predict(image, verbose=False)
-    faces = []
-    for result in results:
-        for box in result.boxes.xyxy.cpu().numpy():
-            x1, y1, x2, y2 = map(int, box[:4])
-            # validasi bounding box
-            x1, y1 = max(0, x1), max(0, y1)
-            x2, y2 = min(image.shape[1], x2), min(image.shape[0], y2)
-            if x2 > x1 and y2 > y1:
-                faces.append((x1, y1, x2, y2))
+    """Deteksi wajah terbesar"""
+    faces = detect_faces(image)
     if faces:
         return [select_largest_face(faces)]
     return []
 
 
 def extract_hog_features(image):
-    """Ekstraksi fitur HOG"""
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    resized = cv2.resize(gray, HOG_SIZE)
-    features, _ = hog(
-        resized,
-        pixels_per_cell=(8, 8),
-        cells_per_block=(2, 2),
-        orientations=9,
-        visualize=True,
-        block_norm="L2-Hys"
-    )
-    return features
-
-
-def recognize_face(image):
+    """Ekstraksi fitur HOG satu crop wajah (backend: app/features.py)"""
+    return extract_hog_features_batch([image])[0]
+
+
+def extract_hog_features_batch(images):
+    """Fitur HOG banyak crop wajah sekaligus, return matriks (n x d)"""
+    with metrics.stage("hog"):
+        return extract_hog_batch(images)
+
+
+def crop_face(image, box):
+    """Crop + resize wajah ke FACE_SIZE, None jika terlalu kecil"""
+    x1, y1, x2, y2 = box
+    face_crop = image[y1:y2, x1:x2]
+
+    if face_crop.shape[0] < 10 or face_crop.shape[1] < 10:
+        return None
+
+    return cv2.resize(face_crop, FACE_SIZE, interpolation=cv2.INTER_CUBIC)
+
+
+def crop_faces(frame, faces):
+    """
+    Crop semua box hasil deteksi frame. Return list of (box, crop atau None),
+    box dalam koordinat gambar asli. Untuk IngestedImage, box dipetakan balik
+    dari gambar deteksi dan crop diambil dari decode yang resolusinya cukup.
+    """
+    if not isinstance(frame, IngestedImage):
+        with metrics.stage("crop"):
+            return [(box, crop_face(frame, box)) for box in faces]
+    full_boxes = [frame.to_full(box) for box in faces]
+    source, to_source = frame.crop_source(full_boxes)
+    with metrics.stage("crop"):
+        return [(box, crop_face(source, to_source(box))) for box in full_boxes]
+
+
+def extract_face_features(image):
+    """Fitur HOG dari wajah terbesar di frame (untuk enroll galeri), None jika tidak ada"""
+    faces = detect_face(image)
+    if not faces:
+        return None
+
+    _, resized_face = crop_faces(image, faces)[0]
+    if resized_face is None:
+        return None
+
+    return extract_hog_features(resized_face)
+
+
+def _group_rows(n: int, candidates):
+    """
+    candidates: None (semua kelas), satu set untuk semua baris, atau list per baris.
+    Return list of (frozenset atau None, indeks baris)
+    """
+    if candidates is None or isinstance(candidates, (set, frozenset)):
+        return [(None if candidates is None else frozenset(candidates), np.arange(n))]
+    groups = {}
+    for row, cand in enumerate(candidates):
+        groups.setdefault(None if cand is None else frozenset(cand), []).append(row)
+    return [(cand, np.array(rows)) for cand, rows in groups.items()]
+
+
+def classify_features(features, candidates=None):
+    """
+    Klasifikasi matriks fitur HOG (n x d) dengan backend aktif.
+    candidates: set student_id yang mungkin (mis. terdaftar di course sesi, lihat
+    app/candidates.py) untuk semua baris, atau list per baris; None = semua kelas.
+    SVM: probabilitas dibatasi ke kolom kandidat lalu dinormalisasi ulang.
+    Galeri: nearest neighbour hanya di vektor milik kandidat.
+    Return: list of (student_id atau None jika tidak dikenal, confidence)
+    """
+    if RECOGNITION_BACKEND == "gallery":
+        from .gallery import get_gallery
+
+        gallery = get_gallery()
+        results = [None] * len(features)
+        with metrics.stage("gallery"):
+            for cand, rows in _group_rows(len(features), candidates):
+                for row, result in zip(rows, gallery.search(features[rows], candidates=cand)):
+                    results[row] = result
+        return results
+
+    model = get_model()
+    model_registry.note_used(model.version)
+    with metrics.stage("svm"):
+        probs = model.scorer.predict_proba(features)
+    results = [None] * len(features)
+    for cand, rows in _group_rows(len(features), candidates):
+        columns = np.arange(probs.shape[1]) if cand is None else model.candidate_columns(cand)
+        if not len(columns):
+            for row in rows:
+                results[row] = (None, 0.0)
+            continue
+        sub = probs[np.ix_(rows, columns)]
+        if cand is not None:
+            sub = sub / np.maximum(sub.sum(axis=1, keepdims=True), 1e-12)
+        best = sub.argmax(axis=1)
+        labels = model.svm.classes_[columns[best]]
+        for row, label, prob in zip(rows, labels, sub[np.arange(len(best)), best]):
+            results[row] = (model.student_id(label), float(prob))
+    return results
+
+
+def classify_faces(image, boxes, candidates=None):
+    """
+    HOG + klasifikasi untuk box yang sudah diketahui (mis. dari tracker),
+    semua dalam satu matriks. Return list sejajar boxes: (student_id, confidence)
+    atau (None, None) jika crop terlalu kecil / tidak dikenal.
+    """
+    results = [(None, None)] * len(boxes)
+    positions, crops = [], []
+    for i, box in enumerate(boxes):
+        resized_face = crop_face(image, box)
+        if resized_face is None:
+            continue
+        positions.append(i)
+        crops.append(resized_face)
+
+    if crops:
+        predictions = classify_features(extract_hog_features_batch(crops), candidates)
+        for i, prediction in zip(positions, predictions):
+            results[i] = prediction
+    return results
+
+
+def recognize_face(image, candidates=None):
     """
     Pipeline deteksi wajah + ekstraksi HOG + prediksi SVM
+    candidates: set student_id yang mungkin (lihat classify_features), None = semua kelas
     Return: (id_prediksi, probabilitas) atau (None, None)
     """
     faces = detect_face(image)
     if not faces:
         return None, None
 
-    x1, y1, x2, y2 = faces[0]
-    face_crop = image[y1:y2, x1:x2]
-
-    if face_crop.shape[0] < 10 or face_crop.shape[1] < 10:
+    _, resized_face = crop_faces(image, faces)[0]
+    if resized_face is None:
         return None, None
 
-    resized_face = cv2.resize(face_crop, FACE_SIZE, interpolation=cv2.INTER_CUBIC)
     hog_features = extract_hog_features(resized_face).reshape(1, -1)
 
-    pred = svm_model.predict(hog_features)[0]
-    prob = svm_model.predict_proba(hog_features).max()
+    if RECOGNITION_BACKEND == "gallery" or candidates is not None:
+        student_id, confidence = classify_features(hog_features, candidates)[0]
+        if student_id is None:
+            return None, None
+        return student_id, confidence
+
+    model = get_model()
+    model_registry.note_used(model.version)
+    with metrics.stage("svm"):
+        # Label (vote one-vs-one, sama dengan SVC.predict) + probabilitas dari satu evaluasi kernel
+        labels, probs = model.scorer.score(hog_features)
+    pred, prob = labels[0], probs[0].max()
+
+    student_id = model.student_id(pred)
+    if student_id is None:
+        return None, None
+    return student_id, float(prob)
+
+
+def recognize_faces_batch(images, largest_only=False, candidates=None):
+    """
+    Pipeline untuk banyak frame: satu yolo predict untuk semua frame, lalu
+    fitur HOG semua wajah diekstrak dalam satu batch lalu diklasifikasi sekali.
+    largest_only=True hanya memakai wajah terbesar per frame (seperti detect_face);
+    bisa juga list bool per frame. candidates: None, satu set student_id untuk
+    semua frame, atau list per frame (frame dari sesi berbeda dalam satu batch).
+    Return: list (per frame) of list of (box, id_prediksi atau None, probabilitas)
+    """
+    images = list(images)
+    if isinstance(largest_only, bool):
+        largest_only = [largest_only] * len(images)
+    if candidates is None or isinstance(candidates, (set, frozenset)):
+        candidates = [candidates] * len(images)
+
+    owners, boxes, crops = [], [], []
+    for i, (image, faces) in enumerate(zip(images, detect_faces_batch(images))):
+        if largest_only[i] and faces:
+            faces = [select_largest_face(faces)]
+        for box, resized_face in crop_faces(image, faces):
+            if resized_face is None:
+                continue
+            owners.append(i)
+            boxes.append(box)
+            crops.append(resized_face)
+
+    results = [[] for _ in images]
+    if not crops:
+        return results
+
+    predictions = classify_features(extract_hog_features_batch(crops), [candidates[i] for i in owners])
+    for owner, box, (student_id, confidence) in zip(owners, boxes, predictions):
+        results[owner].append((box, student_id, confidence))
+    return results
 
-    return int(pred), float(prob)
+
+def recognize_faces(image, candidates=None):
+    """
+    Pipeline multi-wajah: semua wajah di frame di-crop, fitur HOG ditumpuk
+    jadi satu matriks lalu diprediksi dengan satu kali predict_proba / lookup galeri.
+    Return: list of (box, id_prediksi atau None, probabilitas)
+    """
+    return recognize_faces_batch([image], candidates=candidates)[0]
 
 
 # === Alias untuk attendance.py ===
-def recognize_bgr(frame_bgr):
+def recognize_bgr(frame_bgr, candidates=None):
     """Alias recognize_face untuk kesesuaian dengan attendance.py"""
-    return recognize_face(frame_bgr)
+    return recognize_face(frame_bgr, candidates)
+
+
+def recognize_bgr_multi(frame_bgr, candidates=None):
+    """Alias recognize_faces untuk endpoint batch di attendance.py"""
+    return recognize_faces(frame_bgr, candidates)
 
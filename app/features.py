@@ -0,0 +1,137 @@
+"""
+Ekstraksi fitur HOG wajah.
+
+Backend (HOG_BACKEND):
+- "numpy" (default): implementasi vektor untuk satu batch crop sekaligus.
+  Algoritmanya sama persis dengan skimage.feature.hog (gradien selisih pusat,
+  histogram 9 bin tanpa interpolasi, rata-rata per cell 8x8, blok 2x2 L2-Hys),
+  hanya urutan penjumlahan float yang berbeda (selisih < 1e-6), jadi model
+  SVM / galeri yang dilatih dengan skimage tetap bisa dipakai.
+- "skimage": skimage.feature.hog per crop (referensi, dipakai untuk cek paritas).
+
+Cek paritas + speedup: python -m benchmarks.bench_hog
+"""
+import os
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+HOG_BACKEND = os.getenv("HOG_BACKEND", "numpy")
+
+# Ukuran input HOG + parameter (harus sama dengan yang dipakai saat training)
+HOG_SIZE = (64, 64)
+ORIENTATIONS = 9
+PIXELS_PER_CELL = 8
+CELLS_PER_BLOCK = 2
+EPS = 1e-5
+# Crop per potongan batch backend numpy
+HOG_CHUNK = 32
+
+_CELLS = HOG_SIZE[0] // PIXELS_PER_CELL
+_BLOCKS = _CELLS - CELLS_PER_BLOCK + 1
+FEATURE_DIM = _BLOCKS * _BLOCKS * CELLS_PER_BLOCK * CELLS_PER_BLOCK * ORIENTATIONS
+
+# Indeks cell untuk tiap piksel 64x64 (dipakai bincount)
+_ROW_CELL = np.arange(HOG_SIZE[1]) // PIXELS_PER_CELL
+_COL_CELL = np.arange(HOG_SIZE[0]) // PIXELS_PER_CELL
+_PIXEL_CELL = (_ROW_CELL[:, None] * _CELLS + _COL_CELL[None, :]).ravel()
+
+
+def preprocess(crop):
+    """Crop BGR (atau grayscale) uint8 -> grayscale HOG_SIZE uint8"""
+    gray = crop if crop.ndim == 2 else cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    if gray.shape[1] != HOG_SIZE[0] or gray.shape[0] != HOG_SIZE[1]:
+        gray = cv2.resize(gray, HOG_SIZE)
+    return gray
+
+
+def _hog_skimage(grays):
+    from skimage.feature import hog
+
+    return np.vstack([
+        hog(
+            gray,
+            pixels_per_cell=(PIXELS_PER_CELL, PIXELS_PER_CELL),
+            cells_per_block=(CELLS_PER_BLOCK, CELLS_PER_BLOCK),
+            orientations=ORIENTATIONS,
+            block_norm="L2-Hys",
+        )
+        for gray in grays
+    ])
+
+
+@lru_cache(maxsize=1)
+def _gradient_tables():
+    """
+    Gradien piksel uint8 selalu bilangan bulat di [-255, 255], jadi magnitude
+    dan bin orientasi cukup dihitung sekali untuk semua pasangan (g_row, g_col)
+    dengan rumus skimage, lalu dipakai sebagai lookup table.
+    """
+    g = np.arange(-255, 256, dtype=np.float64)
+    g_row, g_col = np.meshgrid(g, g, indexing="ij")
+    magnitude = np.hypot(g_col, g_row)
+    orientation = np.rad2deg(np.arctan2(g_row, g_col)) % 180
+    # Bin i = [i*20, (i+1)*20), sama seperti hog_histograms skimage
+    edges = 180.0 / ORIENTATIONS * np.arange(1, ORIENTATIONS)
+    bins = (orientation[..., None] >= edges).sum(axis=-1)
+    return magnitude.ravel(), bins.ravel().astype(np.intp)
+
+
+def _hog_numpy_chunk(grays):
+    """grays: (n, 64, 64) uint8 -> (n, FEATURE_DIM)"""
+    n = grays.shape[0]
+    magnitude_table, bin_table = _gradient_tables()
+
+    # Gradien selisih pusat, baris/kolom tepi = 0 (seperti skimage), langsung jadi indeks tabel
+    images = grays.astype(np.int32)
+    lookup = np.full(images.shape, 255 * 511 + 255, dtype=np.intp)
+    lookup[:, 1:-1, :] += (images[:, 2:, :] - images[:, :-2, :]) * 511
+    lookup[:, :, 1:-1] += images[:, :, 2:] - images[:, :, :-2]
+    lookup = lookup.reshape(n, -1)
+    magnitude = np.take(magnitude_table, lookup)
+    index = np.take(bin_table, lookup)
+
+    # Histogram per cell: satu bincount untuk semua crop (indeks = crop, cell, bin)
+    cells = _CELLS * _CELLS * ORIENTATIONS
+    index += _PIXEL_CELL * ORIENTATIONS
+    index += (np.arange(n) * cells)[:, None]
+    hist = np.bincount(index.ravel(), weights=magnitude.ravel(), minlength=n * cells)
+    hist = hist.reshape(n, _CELLS, _CELLS, ORIENTATIONS) / (PIXELS_PER_CELL * PIXELS_PER_CELL)
+
+    # Blok 2x2 cell overlap, urutan cell dalam blok seperti skimage: (0,0) (0,1) (1,0) (1,1)
+    blocks = np.stack(
+        [
+            hist[:, r:r + _BLOCKS, c:c + _BLOCKS, :]
+            for r in range(CELLS_PER_BLOCK)
+            for c in range(CELLS_PER_BLOCK)
+        ],
+        axis=3,
+    )
+
+    # L2-Hys
+    blocks /= np.sqrt(np.einsum("nijkl,nijkl->nij", blocks, blocks) + EPS ** 2)[..., None, None]
+    np.minimum(blocks, 0.2, out=blocks)
+    blocks /= np.sqrt(np.einsum("nijkl,nijkl->nij", blocks, blocks) + EPS ** 2)[..., None, None]
+    return blocks.reshape(n, FEATURE_DIM)
+
+
+def _hog_numpy(grays):
+    # Dipotong per HOG_CHUNK crop supaya array sementara tetap muat di cache CPU
+    if len(grays) <= HOG_CHUNK:
+        return _hog_numpy_chunk(grays)
+    return np.vstack([_hog_numpy_chunk(grays[i:i + HOG_CHUNK]) for i in range(0, len(grays), HOG_CHUNK)])
+
+
+_BACKENDS = {"numpy": _hog_numpy, "skimage": _hog_skimage}
+
+
+def extract_hog_batch(crops, backend: str = None):
+    """List crop wajah (BGR / grayscale) -> matriks fitur HOG (n x FEATURE_DIM)"""
+    if len(crops) == 0:
+        return np.empty((0, FEATURE_DIM))
+    try:
+        fn = _BACKENDS[backend or HOG_BACKEND]
+    except KeyError:
+        raise ValueError(f"Unknown HOG backend: {backend or HOG_BACKEND}")
+    return fn(np.stack([preprocess(crop) for crop in crops]))
@@ -0,0 +1,189 @@
+"""
+Cache hasil recognition per frame, di depan recognize_bgr / recognize_bgr_multi.
+
+Kiosk yang timeout biasanya mengirim ulang frame yang sama (atau hampir sama).
+Frame di-hash dengan dHash 256 bit dari gambar deteksi yang sudah diperkecil;
+hash dengan jarak Hamming <= FRAME_CACHE_MAX_DISTANCE dianggap frame yang sama.
+Cache dibatasi per sesi (LRU + TTL), dan frame yang sedang diproses tidak
+dikirim ulang ke inference: request duplikat menunggu hasil request pertama.
+
+Entry juga mencatat mahasiswa yang sudah ditulis 'hadir' dari frame itu,
+jadi hit tidak perlu upsert attendance lagi selama statusnya tidak diubah
+(_apply_statuses memanggil forget_student saat status diganti), dan versi
+model SVM yang menghasilkan hasilnya (disimpan di baris attendance).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import cv2
+import numpy as np
+
+from . import metrics, model_registry
+from .inference import InferenceUnavailable
+from .ingest import IngestedImage
+
+FRAME_CACHE_ENABLED = os.getenv("FRAME_CACHE_ENABLED", "1") == "1"
+# Detik sebuah hasil boleh dipakai ulang
+FRAME_CACHE_TTL = float(os.getenv("FRAME_CACHE_TTL", "15"))
+# Entry per sesi, dan jumlah sesi yang disimpan (LRU)
+FRAME_CACHE_SIZE = int(os.getenv("FRAME_CACHE_SIZE", "32"))
+FRAME_CACHE_SESSIONS = int(os.getenv("FRAME_CACHE_SESSIONS", "256"))
+# Bit berbeda maksimum (dari 256) untuk dianggap frame yang sama
+FRAME_CACHE_MAX_DISTANCE = int(os.getenv("FRAME_CACHE_MAX_DISTANCE", "6"))
+# Batas tunggu hasil frame duplikat yang sedang diproses request lain
+FRAME_CACHE_WAIT = float(os.getenv("FRAME_CACHE_WAIT", os.getenv("INFERENCE_TIMEOUT", "30")))
+
+HASH_SIDE = 16
+
+LOOKUPS = metrics.register(metrics.Counter(
+    "frame_cache_lookups_total", "Lookup cache hasil frame (hit / miss / coalesced)", labels=("result",)
+))
+
+
+def frame_hash(frame) -> int:
+    """dHash 256 bit: tanda gradien horizontal gambar grayscale 17x16"""
+    image = frame.detection_image if isinstance(frame, IngestedImage) else frame
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (HASH_SIDE + 1, HASH_SIDE), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class FrameEntry:
+    __slots__ = ("hash", "result", "model_version", "marked", "expires_at")
+
+    def __init__(self, fhash: int, result, ttl: float):
+        self.hash = fhash
+        self.result = result
+        self.model_version = model_registry.used_version()
+        # set student_id yang sudah di-commit 'hadir' dari frame ini; None = belum ditulis
+        self.marked = None
+        self.expires_at = time.monotonic() + ttl
+
+
+class FrameCache:
+    def __init__(
+        self,
+        ttl: float = FRAME_CACHE_TTL,
+        size: int = FRAME_CACHE_SIZE,
+        max_sessions: int = FRAME_CACHE_SESSIONS,
+        max_distance: int = FRAME_CACHE_MAX_DISTANCE,
+    ):
+        self.ttl = ttl
+        self.size = size
+        self.max_sessions = max_sessions
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # (session_id, kind) -> OrderedDict hash -> FrameEntry
+        self._inflight = {}  # (session_id, kind) -> {hash: Future}
+
+    def _near(self, fhash: int, candidates):
+        for other in candidates:
+            if (fhash ^ other).bit_count() <= self.max_distance:
+                return other
+        return None
+
+    def _lookup(self, key, fhash: int):
+        entries = self._sessions.get(key)
+        if not entries:
+            return None
+        now = time.monotonic()
+        for stale in [h for h, e in entries.items() if e.expires_at <= now]:
+            del entries[stale]
+        match = fhash if fhash in entries else self._near(fhash, entries)
+        if match is None:
+            return None
+        entries.move_to_end(match)
+        self._sessions.move_to_end(key)
+        return entries[match]
+
+    def _store(self, key, entry: FrameEntry):
+        entries = self._sessions.get(key)
+        if entries is None:
+            entries = self._sessions[key] = OrderedDict()
+        entries[entry.hash] = entry
+        entries.move_to_end(entry.hash)
+        self._sessions.move_to_end(key)
+        while len(entries) > self.size:
+            entries.popitem(last=False)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def recognize(self, session_id: int, kind: str, frame, compute):
+        """
+        Return (FrameEntry, cached). compute(frame) hanya dipanggil jika belum ada
+        hasil untuk frame (hampir) sama di sesi ini dan tidak ada yang sedang memprosesnya.
+        Exception dari compute tidak di-cache; request yang menunggu mendapat
+        InferenceUnavailable (503 + Retry-After), begitu juga jika menunggu lebih
+        dari FRAME_CACHE_WAIT.
+        """
+        # Versi model dicatat oleh compute di thread ini (lihat model_registry.used_version)
+        model_registry.note_used(None)
+        if not FRAME_CACHE_ENABLED or self.ttl <= 0:
+            return FrameEntry(0, compute(frame), 0), False
+
+        fhash = frame_hash(frame)
+        key = (session_id, kind)
+        with self._lock:
+            entry = self._lookup(key, fhash)
+            if entry is not None:
+                LOOKUPS.inc(1, "hit")
+                return entry, True
+            inflight = self._inflight.setdefault(key, {})
+            match = fhash if fhash in inflight else self._near(fhash, inflight)
+            if match is not None:
+                future = inflight[match]
+            else:
+                future = inflight[fhash] = Future()
+        if match is not None:
+            LOOKUPS.inc(1, "coalesced")
+            try:
+                return future.result(timeout=FRAME_CACHE_WAIT), True
+            except FutureTimeout:
+                raise InferenceUnavailable("Inference timed out waiting for a duplicate frame")
+            except InferenceUnavailable:
+                raise
+            except Exception as exc:
+                raise InferenceUnavailable("Inference failed for a duplicate frame") from exc
+
+        LOOKUPS.inc(1, "miss")
+        try:
+            entry = FrameEntry(fhash, compute(frame), self.ttl)
+        except BaseException as exc:
+            with self._lock:
+                self._pop_inflight(key, fhash)
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._store(key, entry)
+            self._pop_inflight(key, fhash)
+        future.set_result(entry)
+        return entry, False
+
+    def _pop_inflight(self, key, fhash: int):
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            inflight.pop(fhash, None)
+            if not inflight:
+                del self._inflight[key]
+
+    def forget_student(self, session_id: int, student_id: int):
+        """Status mahasiswa di sesi ini diubah: entry yang menandainya hadir tidak berlaku lagi"""
+        with self._lock:
+            for (sid, _), entries in self._sessions.items():
+                if sid != session_id:
+                    continue
+                for fhash in [h for h, e in entries.items() if e.marked and student_id in e.marked]:
+                    del entries[fhash]
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._sessions.values())
+
+
+frame_cache = FrameCache()
+
+metrics.register(metrics.Gauge("frame_cache_entries", "Entry di cache hasil frame", lambda: {(): len(frame_cache)}))
@@ -0,0 +1,375 @@
+"""
+Galeri wajah (RECOGNITION_BACKEND=gallery): nearest neighbour kosinus di fitur HOG.
+
+Vektor HOG semuanya positif dan mirip satu sama lain (kosinus antar orang
+berbeda rata-rata ~0.6), jadi sebelum dibandingkan tiap vektor dikurangi
+vektor rata-rata dataset lalu dinormalisasi ulang (mean-centering). Rata-rata
++ batas jarak "unknown" disimpan di GALLERY_CALIBRATION. File ini tidak ikut
+repo: dibuat saat deploy, dengan detektor wajah yang sama seperti produksi,
+
+    python -m app.gallery calibrate
+
+dari app/dataset: hanya wajah hasil deteksi (detect_face + crop_face), foto
+tanpa wajah terdeteksi dilewati; batas = equal error rate nearest neighbour
+open-set (wajah dikenal: tetangga terdekat foto lain orang yang sama; wajah
+unknown: tetangga terdekat jika orang itu tidak ada di galeri). Kalibrasi harus
+diulang jika detektor (FACE_DETECTOR / bobot YOLO) atau fitur HOG berubah.
+Tanpa file kalibrasi fitur tidak di-center dan dipakai batas default
+UNCALIBRATED_MAX_DISTANCE.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import uuid
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GALLERY_DIR = os.getenv("GALLERY_DIR", os.path.join(BASE_DIR, "model_files", "gallery"))
+GALLERY_CALIBRATION = os.getenv(
+    "GALLERY_CALIBRATION", os.path.join(BASE_DIR, "model_files", "gallery_calibration.json")
+)
+# Jarak kosinus maksimum (1 - cosine similarity setelah centering); di atas ini wajah dianggap
+# "unknown". Kosong = nilai dari file kalibrasi
+GALLERY_MAX_DISTANCE = os.getenv("GALLERY_MAX_DISTANCE")
+# Batas EER tanpa centering (dipakai bila file kalibrasi tidak ada)
+UNCALIBRATED_MAX_DISTANCE = 0.18
+
+logger = logging.getLogger("absensi.gallery")
+
+FEATURES_FILE = "features.f32"  # float32 mentah, N x dim, append-only
+LABELS_FILE = "labels.i64"  # int64 student_id per baris (-1 = sudah dihapus)
+META_FILE = "gallery.json"
+# Compact file jika baris yang sudah dihapus melebihi rasio ini
+COMPACT_RATIO = 0.25
+
+
+def _normalize(features: np.ndarray) -> np.ndarray:
+    features = np.asarray(features, dtype=np.float32)
+    if features.ndim == 1:
+        features = features.reshape(1, -1)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return features / norms
+
+
+def load_calibration(path: str = GALLERY_CALIBRATION):
+    """(vektor rata-rata atau None, batas jarak) dari file kalibrasi"""
+    if path and os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+        return np.asarray(data["center"], dtype=np.float32), float(data["max_distance"])
+    logger.warning("File kalibrasi galeri %s tidak ada: tanpa centering", path)
+    return None, UNCALIBRATED_MAX_DISTANCE
+
+
+def nearest_neighbour_distances(features: np.ndarray, labels: np.ndarray):
+    """
+    Jarak kosinus ke tetangga terdekat per vektor (sudah diproyeksikan):
+    (genuine = ke vektor lain orang yang sama, impostor = ke orang lain saja)
+    """
+    sims = features @ features.T
+    np.fill_diagonal(sims, -np.inf)
+    same = labels[:, None] == labels[None, :]
+    genuine = 1.0 - np.where(same, sims, -np.inf).max(axis=1)
+    impostor = 1.0 - np.where(same, -np.inf, sims).max(axis=1)
+    return genuine[np.isfinite(genuine)], impostor
+
+
+def equal_error_threshold(genuine: np.ndarray, impostor: np.ndarray):
+    """(batas jarak, EER): wajah unknown diterima (<= batas) sama seringnya dengan wajah dikenal ditolak"""
+    thresholds = np.unique(np.concatenate([genuine, impostor]))
+    far = np.searchsorted(np.sort(impostor), thresholds, side="right") / len(impostor)
+    frr = 1.0 - np.searchsorted(np.sort(genuine), thresholds, side="right") / len(genuine)
+    best = int(np.argmin(np.abs(far - frr)))
+    return float(thresholds[best]), float((far[best] + frr[best]) / 2)
+
+
+def calibrate(features, labels) -> dict:
+    """Kalibrasi dari fitur HOG berlabel: vektor rata-rata + batas EER nearest neighbour"""
+    normalized = _normalize(features)
+    center = normalized.mean(axis=0)
+    genuine, impostor = nearest_neighbour_distances(_normalize(normalized - center), np.asarray(labels))
+    max_distance, eer = equal_error_threshold(genuine, impostor)
+    return {
+        "max_distance": round(max_distance, 4),
+        "eer": round(eer, 4),
+        "genuine_median": round(float(np.median(genuine)), 4),
+        "impostor_median": round(float(np.median(impostor)), 4),
+        "images": int(len(normalized)),
+        "persons": int(len(set(labels))),
+        "center": [round(float(v), 7) for v in center],
+    }
+
+
+class FaceGallery:
+    """
+    Galeri fitur wajah per mahasiswa: matriks float32 (N x D) yang sudah
+    dinormalisasi L2 + array label student_id. Lookup = nearest neighbour
+    kosinus (satu perkalian matriks) di vektor yang sudah di-center (lihat
+    docstring modul), enroll hanya append ke file dan hapus hanya menandai
+    label, jadi index berubah tanpa retrain.
+    calibration: path file kalibrasi, None = tanpa centering.
+    """
+
+    def __init__(self, directory: str = GALLERY_DIR, max_distance: float = None, calibration=GALLERY_CALIBRATION):
+        self.directory = directory
+        if calibration:
+            self.center, calibrated = load_calibration(calibration)
+        else:
+            self.center, calibrated = None, UNCALIBRATED_MAX_DISTANCE
+        if max_distance is None:
+            max_distance = float(GALLERY_MAX_DISTANCE) if GALLERY_MAX_DISTANCE else calibrated
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        # (features di file, labels, features yang di-center untuk lookup) diganti sekaligus,
+        # pembaca tidak perlu lock
+        empty = np.zeros((0, 0), dtype=np.float32)
+        self._index = (empty, np.zeros(0, dtype=np.int64), empty)
+        self.face_ids = {}  # student_id -> Student.face_id
+        # frozenset kandidat -> (labels asal, sub-index, sub-labels); berlaku selama _index tidak diganti
+        self._subsets = {}
+        self._version = None
+        self.load()
+
+    # ---------------------------
+    # Persistensi
+    # ---------------------------
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _project(self, rows: np.ndarray) -> np.ndarray:
+        """Vektor ternormalisasi -> ruang lookup (dikurangi rata-rata dataset, dinormalisasi ulang)"""
+        if self.center is None or not len(rows):
+            return rows
+        return _normalize(rows - self.center)
+
+    def _meta_version(self):
+        try:
+            return os.stat(self._path(META_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        with self._lock:
+            version = self._meta_version()
+            if version is None:
+                return
+            with open(self._path(META_FILE)) as f:
+                meta = json.load(f)
+            dim, size = meta["dim"], meta["size"]
+            # Baca hanya baris yang sudah tercatat di meta (append yang belum selesai diabaikan)
+            features = np.fromfile(self._path(FEATURES_FILE), dtype=np.float32, count=size * dim)
+            labels = np.fromfile(self._path(LABELS_FILE), dtype=np.int64, count=size)
+            rows = min(len(labels), features.size // dim) if dim else 0
+            features = features[: rows * dim].reshape(rows, dim)
+            self._index = (features, labels[:rows], self._project(features))
+            self.face_ids = {int(k): v for k, v in meta.get("face_ids", {}).items()}
+            self._version = version
+
+    def refresh_if_stale(self):
+        """Reload jika file galeri diubah proses lain (mis. worker inference)"""
+        if self._meta_version() != self._version:
+            self.load()
+
+    def _write_meta(self, features: np.ndarray, labels: np.ndarray):
+        # Meta ditulis terakhir: isinya menandai baris yang valid dan mtime-nya jadi versi galeri
+        tmp = self._path(META_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "dim": int(features.shape[1]),
+                    "size": int(len(labels)),
+                    "face_ids": {str(k): v for k, v in self.face_ids.items()},
+                },
+                f,
+            )
+        os.replace(tmp, self._path(META_FILE))
+        self._version = self._meta_version()
+
+    def _append(self, rows: np.ndarray, row_labels: np.ndarray, offset: int):
+        os.makedirs(self.directory, exist_ok=True)
+        for name, array, itemsize in (
+            (FEATURES_FILE, rows, rows.shape[1] * 4),
+            (LABELS_FILE, row_labels, 8),
+        ):
+            with open(self._path(name), "ab") as f:
+                # Buang sisa append yang gagal sebelumnya
+                f.truncate(offset * itemsize)
+                f.write(np.ascontiguousarray(array).tobytes())
+
+    def _rewrite(self, features: np.ndarray, labels: np.ndarray):
+        os.makedirs(self.directory, exist_ok=True)
+        for name, array in ((FEATURES_FILE, features), (LABELS_FILE, labels)):
+            tmp = self._path(name + ".tmp")
+            np.ascontiguousarray(array).tofile(tmp)
+            os.replace(tmp, self._path(name))
+
+    # ---------------------------
+    # Update incremental
+    # ---------------------------
+    def enroll(self, student_id: int, features, face_id: str = None) -> str:
+        """Tambah vektor fitur untuk satu mahasiswa, return face_id-nya"""
+        new_rows = _normalize(features)
+        new_labels = np.full(len(new_rows), student_id, dtype=np.int64)
+        with self._lock:
+            current, labels, projected = self._index
+            if len(labels) and current.shape[1] != new_rows.shape[1]:
+                raise ValueError(
+                    f"Feature dimension {new_rows.shape[1]} does not match gallery ({current.shape[1]})"
+                )
+            self._append(new_rows, new_labels, offset=len(labels))
+            new_projected = self._project(new_rows)
+            features = np.concatenate([current, new_rows]) if len(labels) else new_rows
+            projected = np.concatenate([projected, new_projected]) if len(labels) else new_projected
+            labels = np.concatenate([labels, new_labels])
+            face_id = face_id or self.face_ids.get(student_id) or uuid.uuid4().hex
+            self.face_ids[student_id] = face_id
+            self._write_meta(features, labels)
+            self._index = (features, labels, projected)
+        return face_id
+
+    def remove(self, student_id: int) -> int:
+        """Hapus semua vektor milik mahasiswa, return jumlah vektor yang dihapus"""
+        with self._lock:
+            features, labels, projected = self._index
+            mask = labels == student_id
+            removed = int(mask.sum())
+            self.face_ids.pop(student_id, None)
+            if not len(labels):
+                return removed
+
+            labels = np.where(mask, -1, labels)
+            if (labels < 0).mean() > COMPACT_RATIO:
+                keep = labels >= 0
+                features, labels = np.ascontiguousarray(features[keep]), labels[keep]
+                projected = np.ascontiguousarray(projected[keep])
+                self._rewrite(features, labels)
+            else:
+                # Cukup tandai label -1, file fitur tidak perlu ditulis ulang
+                self._rewrite_labels(labels)
+            self._write_meta(features, labels)
+            self._index = (features, labels, projected)
+        return removed
+
+    def _rewrite_labels(self, labels: np.ndarray):
+        tmp = self._path(LABELS_FILE + ".tmp")
+        labels.tofile(tmp)
+        os.replace(tmp, self._path(LABELS_FILE))
+
+    # ---------------------------
+    # Lookup
+    # ---------------------------
+    def __len__(self):
+        return int((self._index[1] >= 0).sum())
+
+    def student_ids(self):
+        return set(self.face_ids)
+
+    def _subset(self, candidates: frozenset):
+        """Baris galeri milik kandidat, disalin kontigu sekali per (versi index, set kandidat)"""
+        _, labels, index = self._index
+        cached = self._subsets.get(candidates)
+        if cached is not None and cached[0] is labels:
+            return cached[1], cached[2]
+        mask = np.isin(labels, np.fromiter(candidates, dtype=np.int64, count=len(candidates)))
+        subset = (np.ascontiguousarray(index[mask]), labels[mask])
+        if len(self._subsets) >= 64:
+            self._subsets.clear()
+        self._subsets[candidates] = (labels, *subset)
+        return subset
+
+    def search(self, features, candidates=None):
+        """
+        Nearest neighbour kosinus untuk satu / banyak vektor sekaligus.
+        candidates: set student_id yang boleh dicocokkan (None = semua).
+        Return: list of (student_id atau None jika unknown, similarity)
+        """
+        if candidates is None:
+            _, labels, index = self._index
+        else:
+            index, labels = self._subset(frozenset(candidates))
+        queries = self._project(_normalize(features))
+        if not len(labels):
+            return [(None, 0.0)] * len(queries)
+
+        similarities = queries @ index.T
+        similarities[:, labels < 0] = -np.inf
+        best = similarities.argmax(axis=1)
+        best_sim = similarities[np.arange(len(best)), best]
+
+        results = []
+        for row, sim in zip(best, best_sim):
+            if labels[row] < 0 or 1.0 - sim > self.max_distance:
+                results.append((None, float(max(sim, 0.0))))
+            else:
+                results.append((int(labels[row]), float(sim)))
+        return results
+
+
+_gallery = None
+_gallery_lock = threading.Lock()
+
+
+def get_gallery() -> FaceGallery:
+    global _gallery
+    if _gallery is None:
+        with _gallery_lock:
+            if _gallery is None:
+                _gallery = FaceGallery()
+    else:
+        _gallery.refresh_if_stale()
+    return _gallery
+
+
+def _dataset_features():
+    """
+    Fitur HOG wajah terbesar (detektor produksi) per foto app/dataset.
+    Return (features, labels, jumlah foto yang dilewati karena tidak ada wajah terdeteksi)
+    """
+    import cv2
+
+    from . import face_recognition
+    from .features import extract_hog_batch
+    from .training import scan_dataset
+
+    labels, crops, skipped = [], [], 0
+    for label, path in scan_dataset():
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        faces = face_recognition.detect_face(image) if image is not None else []
+        crop = None
+        if faces:
+            crop = face_recognition.crop_face(image, face_recognition.select_largest_face(faces))
+        if crop is None:
+            skipped += 1
+            continue
+        labels.append(label)
+        crops.append(crop)
+    features = extract_hog_batch(crops) if crops else np.empty((0, 0), dtype=np.float32)
+    return features, np.array(labels), skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Galeri wajah")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cal = sub.add_parser("calibrate", help="Hitung rata-rata fitur + batas unknown dari app/dataset")
+    cal.add_argument("--output", default=GALLERY_CALIBRATION)
+    args = parser.parse_args(argv)
+
+    features, labels, skipped = _dataset_features()
+    print(f"wajah terdeteksi: {len(labels)}, foto dilewati (tanpa deteksi): {skipped}")
+    if len(set(labels.tolist())) < 2:
+        print("kalibrasi butuh wajah terdeteksi dari minimal 2 orang; cek FACE_DETECTOR / bobot detektor", file=sys.stderr)
+        return 1
+    result = calibrate(features, labels)
+    with open(args.output, "w") as f:
+        json.dump(result, f)
+    print({k: v for k, v in result.items() if k != "center"})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,479 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from threading import BrokenBarrierError
+
+from . import metrics, model_registry
+
+# Konfigurasi worker pool (0 worker = inference inline di proses API, seperti sebelumnya)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "8"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "64"))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "30"))
+INFERENCE_RETRY_AFTER = int(os.getenv("INFERENCE_RETRY_AFTER", "1"))
+INFERENCE_TORCH_THREADS = int(os.getenv("INFERENCE_TORCH_THREADS", "1"))
+# Batas tunggu probe startup sampai semua worker selesai load (detik); lewat -> probe diulang
+INFERENCE_PROBE_TIMEOUT = float(os.getenv("INFERENCE_PROBE_TIMEOUT", "300"))
+# Load + warmup model di background saat startup (0 = lazy, saat request pertama)
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "1") == "1"
+
+
+class InferenceUnavailable(Exception):
+    """Antrian inference penuh / timeout -> dijawab 503 + Retry-After"""
+
+    def __init__(self, detail: str, retry_after: int = INFERENCE_RETRY_AFTER):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+# ---------------------------
+# Sisi worker process
+# ---------------------------
+# Barrier probe startup (lihat InferencePool._probe_workers), di-set oleh _init_worker
+_probe_barrier = None
+
+
+def _init_worker(torch_threads: int, probe_barrier=None):
+    """Dipanggil sekali per worker: batasi thread torch / onnxruntime lalu load + warmup detektor + SVM"""
+    global _probe_barrier
+    from . import detectors, face_recognition
+
+    _probe_barrier = probe_barrier
+
+    detectors.set_num_threads(torch_threads)
+    # Versi SVM mengikuti proses API (dikirim bersama tiap batch), bukan poll active.json sendiri
+    model_registry.registry.poll = 0
+
+    face_recognition.warmup()
+
+
+def _worker_state():
+    from . import face_recognition
+
+    return dict(face_recognition.model_state, pid=os.getpid())
+
+
+def _probe_worker_state():
+    """
+    Probe startup: tahan worker ini di barrier sampai semua worker memegang satu
+    probe, jadi tiap worker menjawab tepat satu (worker cepat tidak bisa mengambil dua)
+    """
+    _probe_barrier.wait(INFERENCE_PROBE_TIMEOUT)
+    return _worker_state()
+
+
+def _run_batch(frames, largest_only_flags, candidates, model_version=None, kinds=None, boxes=None):
+    """
+    Jalankan satu micro-batch: satu yolo predict + satu predict_proba dengan
+    versi SVM model_version. kinds per frame (default semua "recognize"):
+    "recognize" (deteksi + klasifikasi), "detect" (box saja), "classify"
+    (klasifikasi box yang sudah diketahui, mis. dari tracker) atau "features"
+    (fitur HOG wajah terbesar, enroll galeri).
+    Return (hasil, durasi tahap, versi yang dipakai)
+    """
+    from . import face_recognition
+
+    kinds = kinds or ["recognize"] * len(frames)
+    face_recognition.use_version(model_version)
+    model_registry.note_used(None)
+    results = [None] * len(frames)
+    # Request single-face & multi-face (dan jenis lain) bisa digabung dalam satu batch.
+    # Durasi tahap dikumpulkan di worker lalu dikirim balik bersama hasil
+    with metrics.capture_stages() as stages:
+        rows = [i for i, kind in enumerate(kinds) if kind == "recognize"]
+        if rows:
+            recognized = face_recognition.recognize_faces_batch(
+                [frames[i] for i in rows],
+                largest_only=[largest_only_flags[i] for i in rows],
+                candidates=[candidates[i] for i in rows],
+            )
+            for i, faces in zip(rows, recognized):
+                results[i] = faces
+        rows = [i for i, kind in enumerate(kinds) if kind == "detect"]
+        if rows:
+            for i, faces in zip(rows, face_recognition.detect_faces_batch([frames[i] for i in rows])):
+                results[i] = faces
+        for i, kind in enumerate(kinds):
+            if kind == "classify":
+                results[i] = face_recognition.classify_faces(frames[i], boxes[i], candidates[i])
+            elif kind == "features":
+                results[i] = face_recognition.extract_face_features(frames[i])
+    return results, stages, model_registry.used_version()
+
+
+# ---------------------------
+# Sisi proses API
+# ---------------------------
+class _Request:
+    __slots__ = ("frame", "largest_only", "candidates", "kind", "boxes", "future")
+
+    def __init__(self, frame, largest_only: bool, candidates=None, kind: str = "recognize", boxes=None):
+        self.frame = frame
+        self.largest_only = largest_only
+        self.candidates = candidates
+        self.kind = kind
+        self.boxes = boxes
+        self.future = Future()
+
+
+class InferencePool:
+    """
+    Worker process pemilik model YOLO + SVM di belakang antrian terbatas.
+    Request yang datang bersamaan dikumpulkan jadi micro-batch
+    (max_batch frame atau max_wait_ms), lalu dikirim ke worker yang bebas.
+    """
+
+    def __init__(
+        self,
+        workers: int = INFERENCE_WORKERS,
+        max_batch: int = INFERENCE_MAX_BATCH,
+        max_wait_ms: float = INFERENCE_MAX_WAIT_MS,
+        queue_size: int = INFERENCE_QUEUE_SIZE,
+        torch_threads: int = INFERENCE_TORCH_THREADS,
+    ):
+        self.workers = workers
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self.torch_threads = torch_threads
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._slots = threading.Semaphore(workers)
+        self._executor = None
+        self._dispatcher = None
+        self._running = False
+        self._probe_barrier = None
+        self.ready = False
+        self.worker_states = []
+
+    def start(self):
+        if self._running:
+            return
+        ctx = multiprocessing.get_context("spawn")
+        self._probe_barrier = ctx.Barrier(self.workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self.torch_threads, self._probe_barrier),
+        )
+        self._running = True
+        self._dispatcher = threading.Thread(
+            target=self._dispatch_loop, name="inference-dispatcher", daemon=True
+        )
+        self._dispatcher.start()
+        threading.Thread(target=self._probe_workers, name="inference-warmup", daemon=True).start()
+
+    def _probe_workers(self):
+        """
+        Tunggu semua worker selesai load + warmup, lalu tandai pool ready.
+        Ready hanya jika setiap worker (pid berbeda) menjawab dengan status ready;
+        worker yang belum selesai dalam INFERENCE_PROBE_TIMEOUT -> probe diulang.
+        """
+        while self._running:
+            try:
+                futures = [self._executor.submit(_probe_worker_state) for _ in range(self.workers)]
+            except RuntimeError as exc:  # pool rusak / sudah shutdown
+                self._mark_broken(exc)
+                return
+            states, retry = [], False
+            for fut in futures:
+                try:
+                    states.append(fut.result())
+                except BrokenBarrierError:
+                    retry = True
+                    states.append({"status": "loading", "error": "probe timed out waiting for other workers"})
+                except Exception as exc:
+                    states.append({"status": "error", "error": repr(exc)})
+            self._set_states(states)
+            if not retry:
+                return
+            self._probe_barrier.reset()
+
+    def _set_states(self, states):
+        self.worker_states = states
+        pids = {state.get("pid") for state in states}
+        self.ready = (
+            len(states) == self.workers
+            and len(pids) == self.workers
+            and all(state.get("status") == "ready" for state in states)
+        )
+
+    def _mark_broken(self, exc):
+        """Worker mati (BrokenProcessPool): pool tidak bisa dipakai lagi -> tidak ready"""
+        self.ready = False
+        self.worker_states = [{"status": "error", "error": repr(exc)}]
+
+    def shutdown(self):
+        if not self._running:
+            return
+        self._running = False
+        # Bangunkan dispatcher yang sedang menunggu antrian
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._dispatcher.join(timeout=5)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._fail_pending(InferenceUnavailable("Inference pool stopped"))
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, frame, largest_only: bool = True, candidates=None, kind: str = "recognize", boxes=None) -> Future:
+        req = _Request(frame, largest_only, candidates, kind, boxes)
+        try:
+            self._queue.put_nowait(req)
+        except queue.Full:
+            raise InferenceUnavailable("Inference queue is full")
+        return req.future
+
+    def _wait(self, future: Future, timeout: float):
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeout:
+            raise InferenceUnavailable("Inference timed out")
+        # Rincian tahap batch ini untuk request yang sedang berjalan (slow-request log)
+        metrics.record_stages(getattr(future, "stages", None), observe=False)
+        model_registry.note_used(getattr(future, "model_version", None))
+        return result
+
+    def recognize(self, frame, largest_only: bool = True, candidates=None, timeout: float = INFERENCE_TIMEOUT):
+        return self._wait(self.submit(frame, largest_only, candidates), timeout)
+
+    def detect(self, frame, timeout: float = INFERENCE_TIMEOUT):
+        """Box semua wajah di frame (tanpa klasifikasi)"""
+        return self._wait(self.submit(frame, kind="detect"), timeout)
+
+    def classify(self, frame, boxes, candidates=None, timeout: float = INFERENCE_TIMEOUT):
+        """(student_id, confidence) per box yang sudah diketahui"""
+        return self._wait(self.submit(frame, candidates=candidates, kind="classify", boxes=boxes), timeout)
+
+    def face_features(self, frame, timeout: float = INFERENCE_TIMEOUT):
+        """Fitur HOG wajah terbesar, None jika tidak ada wajah"""
+        return self._wait(self.submit(frame, kind="features"), timeout)
+
+    def _dispatch_loop(self):
+        while self._running:
+            # Tunggu worker bebas dulu, supaya selama worker sibuk
+            # request menumpuk di antrian dan batch berikutnya lebih penuh
+            self._slots.acquire()
+            batch = self._collect_batch()
+            if not batch:
+                self._slots.release()
+                continue
+            try:
+                fut = self._executor.submit(
+                    _run_batch,
+                    [req.frame for req in batch],
+                    [req.largest_only for req in batch],
+                    [req.candidates for req in batch],
+                    model_registry.registry.active_version(),
+                    [req.kind for req in batch],
+                    [req.boxes for req in batch],
+                )
+            except RuntimeError as exc:  # executor sudah shutdown / rusak
+                if isinstance(exc, BrokenProcessPool):
+                    self._mark_broken(exc)
+                self._slots.release()
+                for req in batch:
+                    req.future.set_exception(InferenceUnavailable(str(exc)))
+                continue
+            fut.add_done_callback(lambda f, batch=batch: self._on_batch_done(batch, f))
+
+    def _collect_batch(self):
+        req = self._queue.get()
+        if req is None:
+            return []
+        batch = [req]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                req = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if req is None:
+                self._running = False
+                break
+            batch.append(req)
+        return batch
+
+    def _on_batch_done(self, batch, fut):
+        self._slots.release()
+        try:
+            results, stages, model_version = fut.result()
+        except BrokenProcessPool as exc:
+            self._mark_broken(exc)
+            for req in batch:
+                req.future.set_exception(InferenceUnavailable("Inference worker died"))
+            return
+        except Exception as exc:
+            for req in batch:
+                req.future.set_exception(exc)
+            return
+        metrics.record_stages(stages, attach=False)
+        for req, faces in zip(batch, results):
+            req.future.stages = stages
+            req.future.model_version = model_version
+            req.future.set_result(faces)
+
+    def _fail_pending(self, exc):
+        while True:
+            try:
+                req = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if req is not None and not req.future.done():
+                req.future.set_exception(exc)
+
+
+_pool = None
+
+
+def _preload_inline():
+    from . import face_recognition
+
+    try:
+        face_recognition.warmup()
+    except Exception:
+        # Error sudah dicatat di model_state dan terlihat di /health/ready
+        pass
+
+
+def start_pool():
+    """
+    Dipanggil saat startup FastAPI. INFERENCE_WORKERS > 0: start worker pool
+    (tiap worker load + warmup sendiri). INFERENCE_WORKERS=0: load + warmup
+    inline di thread background bila MODEL_PRELOAD aktif.
+    """
+    global _pool
+    if INFERENCE_WORKERS > 0:
+        if _pool is None:
+            _pool = InferencePool()
+            _pool.start()
+    elif MODEL_PRELOAD:
+        threading.Thread(target=_preload_inline, name="model-preload", daemon=True).start()
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+def get_pool():
+    return _pool
+
+
+def model_status():
+    """Status model untuk /health/ready"""
+    if _pool is not None:
+        return {
+            "mode": "pool",
+            "ready": _pool.ready,
+            "workers": _pool.worker_states,
+            "queue_depth": _pool.queue_depth(),
+        }
+
+    from .face_recognition import model_state
+
+    return dict(model_state, mode="inline", ready=model_state["status"] == "ready")
+
+
+def recognize_bgr(frame_bgr, candidates=None):
+    """
+    Sama seperti face_recognition.recognize_bgr, lewat worker pool bila aktif.
+    frame_bgr: array BGR atau ingest.IngestedImage (yang dikirim ke worker hanya byte JPEG + gambar deteksi)
+    candidates: set student_id yang mungkin (app/candidates.py), None = semua kelas
+    """
+    if _pool is None:
+        from .face_recognition import recognize_bgr as _recognize_inline
+
+        return _recognize_inline(frame_bgr, candidates)
+
+    with metrics.stage("inference"):
+        faces = _pool.recognize(frame_bgr, largest_only=True, candidates=candidates)
+    if not faces or faces[0][1] is None:
+        return None, None
+    _, student_id, confidence = faces[0]
+    return student_id, confidence
+
+
+def recognize_bgr_multi(frame_bgr, candidates=None):
+    """Sama seperti face_recognition.recognize_bgr_multi, lewat worker pool bila aktif"""
+    if _pool is None:
+        from .face_recognition import recognize_bgr_multi as _recognize_inline
+
+        return _recognize_inline(frame_bgr, candidates)
+
+    with metrics.stage("inference"):
+        return _pool.recognize(frame_bgr, largest_only=False, candidates=candidates)
+
+
+def detect_faces(frame_bgr):
+    """Sama seperti face_recognition.detect_faces, lewat worker pool bila aktif"""
+    if _pool is None:
+        from .face_recognition import detect_faces as _detect_inline
+
+        return _detect_inline(frame_bgr)
+
+    with metrics.stage("inference"):
+        return _pool.detect(frame_bgr)
+
+
+def classify_faces(frame_bgr, boxes, candidates=None):
+    """Sama seperti face_recognition.classify_faces, lewat worker pool bila aktif"""
+    if _pool is None:
+        from .face_recognition import classify_faces as _classify_inline
+
+        return _classify_inline(frame_bgr, boxes, candidates)
+
+    with metrics.stage("inference"):
+        return _pool.classify(frame_bgr, boxes, candidates)
+
+
+def extract_face_features(frame_bgr):
+    """Sama seperti face_recognition.extract_face_features, lewat worker pool bila aktif"""
+    if _pool is None:
+        from .face_recognition import extract_face_features as _extract_inline
+
+        return _extract_inline(frame_bgr)
+
+    with metrics.stage("inference"):
+        return _pool.face_features(frame_bgr)
+
+
+# ---------------------------
+# Gauge /metrics
+# ---------------------------
+def _queue_depth_gauge():
+    return {(): _pool.queue_depth() if _pool is not None else 0}
+
+
+def _model_state_gauge():
+    """Jumlah model (inline: 1, pool: per worker) per status load"""
+    status = model_status()
+    states = status["workers"] if status["mode"] == "pool" else [status]
+    counts = {}
+    for state in states:
+        key = (status["mode"], state.get("status", "unknown"))
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+metrics.register(metrics.Gauge("inference_queue_depth", "Frame yang menunggu di antrian inference", _queue_depth_gauge))
+metrics.register(metrics.Gauge(
+    "inference_model_state", "Status load model (inline / per worker)", _model_state_gauge, labels=("mode", "status")
+))
+metrics.register(metrics.Gauge(
+    "inference_ready", "1 jika model siap menerima request", lambda: {(): int(bool(model_status()["ready"]))}
+))
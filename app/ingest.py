@@ -0,0 +1,201 @@
+"""
+Tahap ingest upload gambar: baca upload bertahap dengan batas ukuran, decode
+JPEG langsung di resolusi turun (IMREAD_REDUCED_COLOR_2/4/8) untuk deteksi,
+lalu crop wajah dari decode kedua yang resolusinya cukup untuk HOG.
+
+Foto HP 12MP tidak pernah di-decode penuh kecuali wajahnya memang kecil.
+"""
+import os
+import struct
+
+import cv2
+import numpy as np
+
+from . import metrics
+
+# Batas ukuran upload (byte)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Sisi terpanjang minimum untuk pass deteksi (YOLO tetap resize ke 640)
+INGEST_DETECT_SIDE = int(os.getenv("INGEST_DETECT_SIDE", "640"))
+# Sisi wajah minimum (px) di gambar sumber crop; HOG dihitung di 64x64 (HOG_SIZE),
+# jadi wajah >= 64 px tidak perlu di-decode ulang di resolusi lebih tinggi
+INGEST_CROP_SIDE = int(os.getenv("INGEST_CROP_SIDE", "64"))
+
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# Marker SOF JPEG (berisi dimensi); C4 = DHT, C8 = JPG, CC = DAC bukan SOF
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def read_upload(file, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """Baca file upload per chunk; berhenti begitu melewati max_bytes"""
+    buf = bytearray()
+    while True:
+        chunk = file.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return bytes(buf)
+        buf += chunk
+        if len(buf) > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+
+
+def image_size(data: bytes):
+    """(lebar, tinggi) dari header JPEG / PNG tanpa decode; None jika tidak dikenali"""
+    if data[:8] == _PNG_SIGNATURE and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+        return width, height
+    if data[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # padding
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        if marker in _JPEG_SOF and pos + 9 <= len(data):
+            height, width = struct.unpack(">HH", data[pos + 5:pos + 9])
+            return width, height
+        pos += 2 + length
+    return None
+
+
+def reduction_for(side: float, min_side: float, max_factor: int = 8) -> int:
+    """Faktor reduksi terbesar (1/2/4/8) yang masih menyisakan >= min_side piksel"""
+    factor = 1
+    for candidate in (2, 4, 8):
+        if candidate <= max_factor and side / candidate >= min_side:
+            factor = candidate
+    return factor
+
+
+def _decode(data: bytes, factor: int):
+    with metrics.stage("decode"):
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), REDUCED_FLAGS[factor])
+    if image is None:
+        raise InvalidImage("Invalid image")
+    return image
+
+
+class IngestedImage:
+    """
+    Upload terenkode + gambar resolusi turun untuk deteksi.
+    Box dari deteksi dipetakan balik ke koordinat asli (to_full), lalu crop
+    wajah diambil dari decode dengan faktor reduksi sekecil yang diperlukan.
+    Ke worker inference yang dikirim hanya byte terenkode + gambar deteksi,
+    bukan array BGR resolusi penuh.
+    """
+
+    def __init__(self, data: bytes, detect_side: int = INGEST_DETECT_SIDE, crop_side: int = INGEST_CROP_SIDE):
+        self.data = data
+        self.detect_side = detect_side
+        self.crop_side = crop_side
+        size = image_size(data)
+        if size is None:
+            # Format lain (bmp/webp/...): decode biasa
+            self.factor = 1
+        else:
+            self.factor = reduction_for(max(size), detect_side)
+        self.header_size = size
+        self._image = None
+        self._full_size = None
+
+    def __getstate__(self):
+        # Gambar deteksi (kecil) ikut dikirim; decode untuk crop dilakukan di worker
+        return {
+            "data": self.data,
+            "detect_side": self.detect_side,
+            "crop_side": self.crop_side,
+            "image": self._image,
+            "full_size": self._full_size,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state["data"], state["detect_side"], state["crop_side"])
+        self._image = state["image"]
+        self._full_size = state["full_size"]
+
+    @property
+    def detection_image(self) -> np.ndarray:
+        if self._image is None:
+            self._image = _decode(self.data, self.factor)
+            h, w = self._image.shape[:2]
+            if self.header_size is None:
+                self._full_size = (w, h)
+            else:
+                fw, fh = self.header_size
+                # imdecode menerapkan orientasi EXIF: header bisa tertukar lebar/tinggi
+                self._full_size = (fw, fh) if (w >= h) == (fw >= fh) else (fh, fw)
+        return self._image
+
+    @property
+    def full_size(self):
+        self.detection_image
+        return self._full_size
+
+    def _scale(self, image):
+        fw, fh = self.full_size
+        return fw / image.shape[1], fh / image.shape[0]
+
+    def to_full(self, box):
+        """Box di gambar deteksi -> box di koordinat gambar asli"""
+        sx, sy = self._scale(self.detection_image)
+        fw, fh = self.full_size
+        x1, y1, x2, y2 = box
+        return (
+            max(0, int(x1 * sx)),
+            max(0, int(y1 * sy)),
+            min(fw, int(np.ceil(x2 * sx))),
+            min(fh, int(np.ceil(y2 * sy))),
+        )
+
+    def crop_source(self, full_boxes):
+        """
+        Gambar untuk crop wajah: faktor reduksi terbesar yang masih memberi
+        >= crop_side piksel untuk wajah terkecil. Return (gambar, fungsi box asli -> box gambar)
+        """
+        if full_boxes:
+            smallest = min(min(x2 - x1, y2 - y1) for x1, y1, x2, y2 in full_boxes)
+            factor = reduction_for(smallest, self.crop_side, max_factor=self.factor)
+        else:
+            factor = self.factor
+        image = self.detection_image if factor == self.factor else _decode(self.data, factor)
+        sx, sy = self._scale(image)
+
+        def to_image(box):
+            x1, y1, x2, y2 = box
+            return (
+                int(x1 / sx),
+                int(y1 / sy),
+                min(image.shape[1], int(np.ceil(x2 / sx))),
+                min(image.shape[0], int(np.ceil(y2 / sy))),
+            )
+
+        return image, to_image
+
+
+def ingest_upload(file, max_bytes: int = MAX_UPLOAD_BYTES) -> IngestedImage:
+    """Baca + decode (resolusi deteksi) file upload; raise UploadTooLarge / InvalidImage"""
+    image = IngestedImage(read_upload(file, max_bytes))
+    image.detection_image  # decode sekarang supaya gambar rusak ditolak sebelum masuk antrian inference
+    return image
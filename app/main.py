@@ -1,12 +1,47 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .database import Base, engine
-from .routers import auth, attendance, report, session
+from fastapi.responses import JSONResponse
+from .database import DB_ASYNC, Base, SessionLocal, engine, get_async_engine
+from . import inference, metrics
+from .routers import auth, attendance, report, session, health, gallery, export, admin
+from .routers import metrics as metrics_router
+from .export import export_manager
+from .session_registry import session_registry
+from .write_behind import WRITE_BEHIND_ENABLED, write_behind
+
+
+def _rebuild_session_registry():
+    db = SessionLocal()
+    try:
+        session_registry.rebuild(db)
+    finally:
+        db.close()
+
 
-# Create tables on startup
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables on startup
+    Base.metadata.create_all(bind=engine)
+    # Write-behind attendance: replay journal (mark yang sudah dijawab sebelum crash) + thread flush
+    if WRITE_BEHIND_ENABLED:
+        write_behind.start(attendance.write_pending_marks)
+    # Sesi yang belum finish (mis. setelah restart di tengah kuliah) kembali ke registry memori
+    _rebuild_session_registry()
+    # Inference worker pool / preload + warmup model di background
+    inference.start_pool()
+    try:
+        yield
+    finally:
+        inference.shutdown_pool()
+        write_behind.shutdown()
+        export_manager.shutdown()
+        if DB_ASYNC:
+            await get_async_engine().dispose()
 
-app = FastAPI(title="Absensi Wajah – FastAPI")
+
+app = FastAPI(title="Absensi Wajah – FastAPI", lifespan=lifespan)
 
 # Middleware CORS
 app.add_middleware(
@@ -17,11 +52,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Metrics per request (durasi route, query DB, tahap recognition) -> /metrics
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument_engine(engine)
+    if DB_ASYNC:
+        metrics.instrument_engine(get_async_engine().sync_engine)
+
 # Register Routers
 app.include_router(auth.router)
 app.include_router(attendance.router)
 app.include_router(report.router)
 app.include_router(session.router)  
+app.include_router(health.router)
+app.include_router(gallery.router)
+app.include_router(export.router)
+app.include_router(admin.router)
+if metrics.METRICS_ENABLED:
+    app.include_router(metrics_router.router)
+
+
+@app.exception_handler(inference.InferenceUnavailable)
+def inference_unavailable_handler(request: Request, exc: inference.InferenceUnavailable):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 # Root endpoint
 @app.get("/")
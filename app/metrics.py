@@ -0,0 +1,297 @@
+"""
+Instrumentasi ringan tanpa dependency: histogram waktu per tahap recognition,
+per route HTTP, jumlah query + waktu DB per request (event SQLAlchemy), plus
+gauge antrian inference / status model. Diekspos dalam format teks
+Prometheus di /metrics.
+
+METRICS_ENABLED=0 mematikan semuanya: middleware tidak dipasang, event DB
+tidak didaftarkan dan stage() hanya mengembalikan context manager kosong.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Request yang lebih lama dari ini (ms) dicatat ke log beserta rincian tahapnya; 0 = mati
+METRICS_SLOW_REQUEST_MS = float(os.getenv("METRICS_SLOW_REQUEST_MS", "0"))
+
+logger = logging.getLogger("absensi.metrics")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+
+def _label_str(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(n, str(v).replace("\\", "\\\\").replace('"', '\\"')) for n, v in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for label_values, series in sorted(items):
+            for bound, count in zip(self.buckets, series):
+                labels = _label_str(self.labels + ("le",), label_values + (repr(float(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _label_str(self.labels + ("le",), label_values + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            base = _label_str(self.labels, label_values)
+            lines.append(f"{self.name}_sum{base} {series[-2]}")
+            lines.append(f"{self.name}_count{base} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount: float = 1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_label_str(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge:
+    """Gauge yang nilainya diambil saat /metrics dibaca: fn() -> {label values: nilai}"""
+
+    def __init__(self, name: str, help_text: str, fn, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.fn = fn
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.fn()
+        except Exception:
+            return lines
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{_label_str(self.labels, label_values)} {value}")
+        return lines
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+STAGE_SECONDS = register(Histogram(
+    "recognition_stage_seconds", "Waktu per tahap pipeline recognition", labels=("stage",)
+))
+HTTP_SECONDS = register(Histogram(
+    "http_request_duration_seconds", "Durasi request HTTP per route", labels=("method", "route", "status")
+))
+HTTP_DB_QUERIES = register(Histogram(
+    "http_request_db_queries", "Jumlah query SQL per request", labels=("route",), buckets=COUNT_BUCKETS
+))
+HTTP_DB_SECONDS = register(Histogram(
+    "http_request_db_seconds", "Total waktu query SQL per request", labels=("route",)
+))
+DB_QUERIES_TOTAL = register(Counter("db_queries_total", "Jumlah query SQL (termasuk di luar request)"))
+
+
+# ---------------------------
+# Konteks per request
+# ---------------------------
+class RequestStats:
+    __slots__ = ("stages", "queries", "db_seconds")
+
+    def __init__(self):
+        self.stages = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    def add_stage(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+# Pengumpul tahap di worker inference (dikirim balik ke proses API bersama hasil batch)
+_stage_sink = contextvars.ContextVar("stage_sink", default=None)
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_stage(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def stage(name: str):
+    """with metrics.stage("detect"): ... — catat durasi tahap ke histogram + request aktif"""
+    if not METRICS_ENABLED:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def record_stage(name: str, seconds: float):
+    sink = _stage_sink.get()
+    if sink is not None:
+        sink[name] = sink.get(name, 0.0) + seconds
+        return
+    STAGE_SECONDS.observe(seconds, name)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add_stage(name, seconds)
+
+
+def record_stages(stages, observe: bool = True, attach: bool = True):
+    """
+    Tahap yang diukur di worker inference. observe: masuk histogram (sekali per batch),
+    attach: tambahkan ke rincian request yang sedang berjalan (untuk slow log).
+    """
+    if not METRICS_ENABLED or not stages:
+        return
+    stats = _request_stats.get() if attach else None
+    for name, seconds in stages.items():
+        if observe:
+            STAGE_SECONDS.observe(seconds, name)
+        if stats is not None:
+            stats.add_stage(name, seconds)
+
+
+@contextmanager
+def capture_stages():
+    """Kumpulkan durasi tahap ke dict (dipakai di worker process), bukan ke histogram lokal"""
+    sink = {}
+    token = _stage_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _stage_sink.reset(token)
+
+
+# ---------------------------
+# Query DB (event SQLAlchemy)
+# ---------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    DB_QUERIES_TOTAL.inc()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engine(engine):
+    if not METRICS_ENABLED:
+        return
+    from sqlalchemy import event
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------------------------
+# Middleware ASGI
+# ---------------------------
+class MetricsMiddleware:
+    """Durasi per route + jumlah query/waktu DB per request, dan slow-request log"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_SECONDS.observe(elapsed, scope["method"], route, status_code[0])
+            HTTP_DB_QUERIES.observe(stats.queries, route)
+            HTTP_DB_SECONDS.observe(stats.db_seconds, route)
+            if METRICS_SLOW_REQUEST_MS and elapsed * 1000 >= METRICS_SLOW_REQUEST_MS:
+                breakdown = " ".join(f"{k}={v * 1000:.1f}ms" for k, v in stats.stages.items())
+                logger.warning(
+                    "slow request %s %s %d %.1fms queries=%d db=%.1fms %s",
+                    scope["method"], route, status_code[0], elapsed * 1000,
+                    stats.queries, stats.db_seconds * 1000, breakdown,
+                )
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
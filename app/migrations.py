@@ -0,0 +1,246 @@
+"""
+Migrasi skema attendance berbasis sesi + cek index.
+
+    python -m app.migrations upgrade   # backfill session_id, dedup, buat index
+    python -m app.migrations explain   # EXPLAIN query laporan / upsert, gagal jika ada full scan
+                                       # atau query tidak memakai index yang diharapkan
+
+Aman dijalankan berulang kali (idempotent).
+"""
+import argparse
+import re
+import sys
+
+from sqlalchemy import inspect, text
+
+from .database import Base, engine
+from . import models
+
+
+# ---------------------------
+# Upgrade
+# ---------------------------
+def _columns(conn, table: str):
+    return {col["name"] for col in inspect(conn).get_columns(table)}
+
+
+def _backfill_legacy_sessions(conn):
+    """
+    Baris attendance lama yang masih pakai (course_id, meeting_no) dipindah
+    ke sesi: buat sesi yang belum ada, lalu isi session_id.
+    """
+    if not {"course_id", "meeting_no"} <= _columns(conn, "attendances"):
+        return 0
+
+    conn.execute(text(
+        """
+        INSERT INTO sessions (course_id, meeting_no, started_at)
+        SELECT a.course_id, a.meeting_no, MIN(a.timestamp)
+        FROM attendances a
+        WHERE a.session_id IS NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM sessions s
+              WHERE s.course_id = a.course_id AND s.meeting_no = a.meeting_no
+          )
+        GROUP BY a.course_id, a.meeting_no
+        """
+    ))
+    result = conn.execute(text(
+        """
+        UPDATE attendances
+        SET session_id = (
+            SELECT MAX(s.id) FROM sessions s
+            WHERE s.course_id = attendances.course_id
+              AND s.meeting_no = attendances.meeting_no
+        )
+        WHERE session_id IS NULL
+        """
+    ))
+    return result.rowcount
+
+
+def _dedupe(conn, table: str, key_columns, keep: str = "MAX"):
+    """Hapus duplikat sebelum index unik dibuat; simpan baris id MAX (terbaru) / MIN"""
+    keys = ", ".join(key_columns)
+    result = conn.execute(text(
+        f"""
+        DELETE FROM {table}
+        WHERE id NOT IN (
+            SELECT keep_id FROM (
+                SELECT {keep}(id) AS keep_id FROM {table} GROUP BY {keys}
+            ) AS keepers
+        )
+        """
+    ))
+    return result.rowcount
+
+
+def _recount_reports(conn):
+    """Samakan counter report dengan isi attendances setelah data dipindah"""
+    for status_val, col in (
+        (models.AttendanceStatus.hadir, "hadir_count"),
+        (models.AttendanceStatus.sakit, "sakit_count"),
+        (models.AttendanceStatus.tanpa_keterangan, "tanpa_keterangan_count"),
+    ):
+        conn.execute(
+            text(
+                f"""
+                UPDATE reports SET {col} = (
+                    SELECT COUNT(*) FROM attendances a
+                    JOIN sessions s ON s.id = a.session_id
+                    WHERE s.course_id = reports.course_id
+                      AND s.meeting_no = reports.meeting_no
+                      AND a.status = :status
+                )
+                """
+            ),
+            {"status": status_val.name},
+        )
+
+
+def _add_model_version(conn):
+    """Kolom attendances.model_version (create_all tidak menambah kolom ke tabel yang sudah ada)"""
+    if "model_version" in _columns(conn, "attendances"):
+        return False
+    conn.execute(text("ALTER TABLE attendances ADD COLUMN model_version VARCHAR(64)"))
+    return True
+
+
+def _add_report_version(conn):
+    """Kolom reports.version (versi lintas worker untuk report_cache)"""
+    if "version" in _columns(conn, "reports"):
+        return False
+    conn.execute(text("ALTER TABLE reports ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+    return True
+
+
+def upgrade():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        print(f"attendances.model_version added: {_add_model_version(conn)}")
+        print(f"reports.version added: {_add_report_version(conn)}")
+        moved = _backfill_legacy_sessions(conn)
+        print(f"attendances moved to sessions: {moved}")
+        for table, keys, keep in (
+            ("attendances", ("session_id", "student_id"), "MAX"),
+            ("course_enrollments", ("course_id", "student_id"), "MIN"),
+            ("reports", ("course_id", "meeting_no"), "MIN"),
+        ):
+            print(f"duplicates removed from {table}: {_dedupe(conn, table, keys, keep)}")
+
+        for table in (
+            models.Attendance.__table__,
+            models.CourseEnrollment.__table__,
+            models.Session.__table__,
+            models.Report.__table__,
+        ):
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+        _recount_reports(conn)
+    print("upgrade done")
+
+
+# ---------------------------
+# EXPLAIN
+# ---------------------------
+# Query panas di jalur mark / laporan: (sql, index yang wajib dipakai). Index
+# primary key ditulis <tabel>_pkey (nama PostgreSQL; di SQLite = INTEGER PRIMARY KEY)
+HOT_QUERIES = {
+    "resolve_session": (
+        "SELECT c.id, s.id FROM courses c "
+        "LEFT JOIN sessions s ON s.course_id = c.id AND s.meeting_no = :meeting_no "
+        "WHERE c.id = :course_id AND c.lecturer_id = :lecturer_id",
+        ("courses_pkey", "ix_sessions_course_meeting"),
+    ),
+    "enrollment_and_status": (
+        "SELECT e.student_id, a.status FROM course_enrollments e "
+        "LEFT JOIN attendances a ON a.session_id = :session_id AND a.student_id = e.student_id "
+        "WHERE e.course_id = :course_id AND e.student_id = :student_id",
+        ("ix_course_enrollments_course_student", "uq_attendances_session_student"),
+    ),
+    "status_counts": (
+        "SELECT a.status, COUNT(*) FROM attendances a JOIN sessions s ON s.id = a.session_id "
+        "WHERE s.course_id = :course_id AND s.meeting_no = :meeting_no GROUP BY a.status",
+        ("ix_sessions_course_meeting", "ix_attendances_session_status"),
+    ),
+    "report_lookup": (
+        "SELECT * FROM reports WHERE course_id = :course_id AND meeting_no = :meeting_no",
+        ("uq_reports_course_meeting",),
+    ),
+    "report_absentees": (
+        "SELECT e.student_id, a.status FROM course_enrollments e "
+        "LEFT JOIN attendances a ON a.session_id = :session_id AND a.student_id = e.student_id "
+        "WHERE e.course_id = :course_id",
+        ("ix_course_enrollments_course_student", "uq_attendances_session_student"),
+    ),
+}
+_PARAMS = {"course_id": 1, "meeting_no": 1, "lecturer_id": 1, "session_id": 1, "student_id": 1}
+
+
+def _plan(conn, sql: str):
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql), _PARAMS).fetchall()
+        return [row[-1] for row in rows]
+    rows = conn.execute(text("EXPLAIN " + sql), _PARAMS).fetchall()
+    return [row[0] for row in rows]
+
+
+def _full_scans(plan_lines):
+    """
+    Baris plan yang membaca seluruh tabel / index, apa pun alias tabelnya.
+    SQLite: "SCAN a" / "SCAN a USING COVERING INDEX ..." (SEARCH = lewat index);
+    PostgreSQL: "Seq Scan on attendances a"
+    """
+    return [
+        line.strip() for line in plan_lines
+        if line.strip().startswith("SCAN ") or "Seq Scan on " in line
+    ]
+
+
+def _uses_index(plan_lines, index: str) -> bool:
+    plan = "\n".join(plan_lines)
+    if index.endswith("_pkey") and "USING INTEGER PRIMARY KEY" in plan:
+        return True
+    # SQLite: "USING INDEX ix" / "USING COVERING INDEX ix";
+    # PostgreSQL: "Index Scan using ix on", "Index Only Scan using ix", "Bitmap Index Scan on ix"
+    return re.search(rf"(INDEX|using|Index Scan on) {re.escape(index)}\b", plan) is not None
+
+
+def check_plan(plan_lines, indexes):
+    """Masalah di plan satu query: full scan, atau index yang diharapkan tidak dipakai"""
+    problems = [f"full scan: {line}" for line in _full_scans(plan_lines)]
+    problems += [f"index not used: {index}" for index in indexes if not _uses_index(plan_lines, index)]
+    return problems
+
+
+def explain(bind=None) -> bool:
+    ok = True
+    with (bind or engine).connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # Tabel kecil di dev -> planner pilih seq scan; paksa supaya yang dicek ketersediaan index
+            conn.execute(text("SET enable_seqscan = off"))
+        for name, (sql, indexes) in HOT_QUERIES.items():
+            plan = _plan(conn, sql)
+            problems = check_plan(plan, indexes)
+            print(f"[{'FAIL' if problems else 'ok'}] {name}")
+            for line in plan:
+                print(f"    {line}")
+            for problem in problems:
+                print(f"  ! {problem}")
+            ok = ok and not problems
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrasi skema attendance berbasis sesi")
+    parser.add_argument("command", choices=["upgrade", "explain"])
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        upgrade()
+        return 0
+    return 0 if explain() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
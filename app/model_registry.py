@@ -0,0 +1,394 @@
+"""
+Registry model SVM berversi + hot swap tanpa restart.
+
+Layout MODEL_REGISTRY_DIR (default model_files/registry):
+    <versi>/svm.joblib     model (joblib tanpa kompresi: array di-memory-map saat load)
+    <versi>/labels.json    label kelas SVM -> Student.id (opsional, lihat app/training.py)
+    <versi>/meta.json      sumber, sha256, kelas, waktu publish
+    active.json            {"version": versi aktif, "history": versi sebelumnya (rollback)}
+
+    python -m app.model_registry publish model_files/svm_face_recognition.pkl [--version v] [--activate]
+    python -m app.model_registry list | activate <versi> | rollback
+
+Tanpa versi aktif di registry dipakai model_files/svm_face_recognition.pkl
+seperti sebelumnya, dengan versi "legacy-<sha256[:12]>".
+
+Aktivasi: load versi baru (mmap copy-on-write: halaman array dibagi antar
+proses selama tidak ditulis), smoke inference, lalu model aktif di
+face_recognition diganti dengan satu assignment. Request yang sedang berjalan
+selesai dengan model yang sudah dipegangnya, tidak ada yang menunggu load.
+Worker inference menerima versi aktif bersama tiap batch dan load versi itu
+bila berbeda; proses API lain (uvicorn --workers) membaca active.json
+paling lambat MODEL_REGISTRY_POLL detik kemudian.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from .svm_scorer import SklearnScorer, build_scorer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SVM_MODEL_PATH = os.path.join(BASE_DIR, "model_files", "svm_face_recognition.pkl")
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(BASE_DIR, "model_files", "registry"))
+# Detik antar cek active.json (versi diganti proses lain); 0 = tidak dicek
+MODEL_REGISTRY_POLL = float(os.getenv("MODEL_REGISTRY_POLL", "5"))
+MODEL_REGISTRY_HISTORY = int(os.getenv("MODEL_REGISTRY_HISTORY", "20"))
+# Selisih probabilitas maksimum scorer compact vs sklearn di smoke test (lebih -> pakai sklearn)
+SVM_SCORER_TOLERANCE = float(os.getenv("SVM_SCORER_TOLERANCE", "5e-3"))
+
+LEGACY_PREFIX = "legacy-"
+MODEL_FILE = "svm.joblib"
+
+logger = logging.getLogger("absensi.model_registry")
+
+
+class ModelValidationError(Exception):
+    """Versi model gagal smoke test; model aktif tidak diganti"""
+
+
+class UnknownModelVersion(Exception):
+    pass
+
+
+def labels_path_for(model_path):
+    """File mapping label -> Student.id yang ditulis di samping file .pkl"""
+    return os.path.splitext(model_path)[0] + ".labels.json"
+
+
+def read_labels(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return {str(label): int(student_id) for label, student_id in json.load(f).items()}
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LoadedModel:
+    """Satu versi SVM yang sudah di-load: model, scorer, mapping label dan cache kolom kandidat"""
+
+    def __init__(self, version: str, svm, labels, path: str):
+        self.version = version
+        self.svm = svm
+        self.scorer = build_scorer(svm)  # app/svm_scorer.py: label + probabilitas sekali jalan
+        self.labels = labels  # label kelas -> Student.id, None = label dianggap id
+        self.path = path
+        self.loaded_at = datetime.utcnow()
+        self._columns = {}
+
+    def student_id(self, label):
+        """Label kelas SVM -> Student.id; tanpa file mapping, label dianggap id (perilaku lama)"""
+        if self.labels is not None:
+            return self.labels.get(str(label))
+        try:
+            return int(label)
+        except (TypeError, ValueError):
+            return None
+
+    def candidate_columns(self, candidates: frozenset):
+        """Indeks kolom predict_proba milik student_id di candidates (cache per versi)"""
+        columns = self._columns.get(candidates)
+        if columns is None:
+            if len(self._columns) >= 256:
+                self._columns.clear()
+            columns = self._columns[candidates] = np.array(
+                [i for i, label in enumerate(self.svm.classes_) if self.student_id(label) in candidates],
+                dtype=np.intp,
+            )
+        return columns
+
+
+def smoke_test(model: LoadedModel) -> dict:
+    """
+    Inference di input dummy: dimensi fitur, bentuk + validitas probabilitas,
+    mapping label. Scorer compact yang hasilnya menyimpang dari sklearn diganti sklearn.
+    """
+    from .features import FEATURE_DIM
+
+    start = time.perf_counter()
+    svm = model.svm
+    n_features = getattr(svm, "n_features_in_", FEATURE_DIM)
+    if n_features != FEATURE_DIM:
+        raise ModelValidationError(f"Model mengharapkan {n_features} fitur, HOG menghasilkan {FEATURE_DIM}")
+    if len(svm.classes_) < 2:
+        raise ModelValidationError("Model punya kurang dari 2 kelas")
+    features = np.vstack([
+        np.zeros(FEATURE_DIM),
+        np.random.default_rng(0).random(FEATURE_DIM),
+    ])
+    try:
+        probs = svm.predict_proba(features)
+    except Exception as exc:
+        raise ModelValidationError(f"predict_proba gagal: {exc!r}") from exc
+    if probs.shape != (len(features), len(svm.classes_)):
+        raise ModelValidationError(f"Bentuk predict_proba {probs.shape} tidak sesuai jumlah kelas")
+    if not np.all(np.isfinite(probs)) or not np.allclose(probs.sum(axis=1), 1.0, atol=1e-3):
+        raise ModelValidationError("predict_proba menghasilkan probabilitas tidak valid")
+    unmapped = [str(label) for label in svm.classes_ if model.student_id(label) is None]
+    if model.labels is not None and unmapped:
+        raise ModelValidationError(f"Label tanpa Student.id: {', '.join(unmapped)}")
+    if not isinstance(model.scorer, SklearnScorer):
+        deviation = float(np.abs(model.scorer.predict_proba(features) - probs).max())
+        if deviation > SVM_SCORER_TOLERANCE:
+            logger.warning(
+                "Scorer %s model %s menyimpang %.2e dari sklearn, pakai sklearn",
+                model.scorer.name, model.version, deviation,
+            )
+            model.scorer = SklearnScorer(svm)
+    return {
+        "classes": len(svm.classes_),
+        "scorer": model.scorer.name,
+        "smoke_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+# Versi model yang dipakai recognition terakhir di thread ini (lihat used_version)
+_used = threading.local()
+
+
+def note_used(version):
+    _used.version = version
+
+
+def used_version():
+    """Versi model yang menghasilkan recognition terakhir di thread ini (None = belum ada / galeri)"""
+    return getattr(_used, "version", None)
+
+
+class ModelRegistry:
+    def __init__(self, directory: str = MODEL_REGISTRY_DIR, legacy_path: str = SVM_MODEL_PATH, poll: float = MODEL_REGISTRY_POLL):
+        self.directory = directory
+        self.legacy_path = legacy_path
+        self.poll = poll
+        self._lock = threading.Lock()  # satu aktivasi / rollback pada satu waktu
+        self._active = None  # cache versi aktif (active.json / legacy)
+        self._next_poll = 0.0
+        self._legacy = (None, None)  # (mtime, versi)
+
+    # ---------------------------
+    # Versi
+    # ---------------------------
+    def _state_path(self) -> str:
+        return os.path.join(self.directory, "active.json")
+
+    def _read_state(self) -> dict:
+        try:
+            with open(self._state_path()) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"version": None, "history": []}
+
+    def _write_state(self, state: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._state_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._state_path())
+
+    def legacy_version(self) -> str:
+        mtime = os.path.getmtime(self.legacy_path)
+        if self._legacy[0] != mtime:
+            self._legacy = (mtime, LEGACY_PREFIX + file_sha256(self.legacy_path)[:12])
+        return self._legacy[1]
+
+    def active_version(self) -> str:
+        """Versi yang seharusnya aktif (active.json, dicek ulang tiap MODEL_REGISTRY_POLL detik)"""
+        now = time.monotonic()
+        if self._active is None or (self.poll > 0 and now >= self._next_poll):
+            self._next_poll = now + self.poll
+            self._active = self._read_state().get("version") or self.legacy_version()
+        return self._active
+
+    def versions(self):
+        """Metadata semua versi yang sudah di-publish, terlama dulu"""
+        if not os.path.isdir(self.directory):
+            return []
+        metas = []
+        for name in os.listdir(self.directory):
+            meta_path = os.path.join(self.directory, name, "meta.json")
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    metas.append(json.load(f))
+        return sorted(metas, key=lambda meta: meta["published_at"])
+
+    def publish(self, model_path: str, version: str = None) -> str:
+        """
+        Salin model (.pkl joblib/pickle) + labels.json-nya ke registry sebagai versi baru.
+        Model ditulis ulang tanpa kompresi supaya array-nya bisa di-memory-map.
+        """
+        sha = file_sha256(model_path)
+        version = version or f"{datetime.utcnow():%Y%m%d%H%M%S}-{sha[:8]}"
+        if version.startswith(LEGACY_PREFIX) or os.sep in version or version in (".", ".."):
+            raise ValueError(f"Nama versi tidak valid: {version}")
+        target = os.path.join(self.directory, version)
+        if os.path.exists(target):
+            raise ValueError(f"Versi {version} sudah ada")
+
+        svm = joblib.load(model_path)
+        tmp = target + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        joblib.dump(svm, os.path.join(tmp, MODEL_FILE))
+        labels_src = labels_path_for(model_path)
+        if os.path.exists(labels_src):
+            shutil.copyfile(labels_src, os.path.join(tmp, "labels.json"))
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({
+                "version": version,
+                "source": os.path.abspath(model_path),
+                "sha256": sha,
+                "classes": [str(label) for label in svm.classes_],
+                "published_at": datetime.utcnow().isoformat(),
+            }, f)
+        os.replace(tmp, target)
+        return version
+
+    def load(self, version: str) -> LoadedModel:
+        """Load satu versi (tanpa mengaktifkan); versi legacy-* = model_files/svm_face_recognition.pkl"""
+        if version.startswith(LEGACY_PREFIX):
+            return LoadedModel(
+                self.legacy_version(),
+                joblib.load(self.legacy_path),
+                read_labels(labels_path_for(self.legacy_path)),
+                self.legacy_path,
+            )
+        path = os.path.join(self.directory, version, MODEL_FILE)
+        if os.sep in version or not os.path.exists(path):
+            raise UnknownModelVersion(version)
+        return LoadedModel(
+            version,
+            joblib.load(path, mmap_mode="c"),
+            read_labels(os.path.join(self.directory, version, "labels.json")),
+            path,
+        )
+
+    def load_active(self) -> LoadedModel:
+        return self.load(self.active_version())
+
+    # ---------------------------
+    # Aktivasi
+    # ---------------------------
+    def activate(self, version: str = None, install=None, _rollback: bool = False) -> dict:
+        """
+        Load + smoke test versi (default: yang terakhir di-publish), catat di active.json
+        lalu pasang lewat install(model) (default: face_recognition.install_model).
+        ModelValidationError / UnknownModelVersion -> model aktif tidak berubah.
+        """
+        if install is None:
+            from .face_recognition import install_model as install
+
+        with self._lock:
+            state = self._read_state()
+            current = state.get("version") or self.legacy_version()
+            if version is None:
+                published = self.versions()
+                if not published:
+                    raise UnknownModelVersion("registry kosong")
+                version = published[-1]["version"]
+
+            start = time.perf_counter()
+            model = self.load(version)
+            smoke = smoke_test(model)
+            load_seconds = round(time.perf_counter() - start, 4)
+
+            history = list(state.get("history", []))
+            if _rollback:
+                history.pop()
+            elif version != current:
+                history = (history + [current])[-MODEL_REGISTRY_HISTORY:]
+            self._write_state({"version": model.version, "history": history})
+            self._active = model.version
+            install(model)
+        logger.info("Model %s aktif (sebelumnya %s)", model.version, current)
+        return {"version": model.version, "previous": current, "load_seconds": load_seconds, **smoke}
+
+    def rollback(self, install=None) -> dict:
+        """Aktifkan lagi versi sebelum versi aktif"""
+        history = self._read_state().get("history", [])
+        if not history:
+            raise UnknownModelVersion("tidak ada versi sebelumnya")
+        return self.activate(history[-1], install=install, _rollback=True)
+
+    def refresh(self, current_version: str, install):
+        """
+        Versi aktif diganti proses lain (active.json): load + smoke test + pasang.
+        Non-blocking: jika aktivasi lain sedang berjalan, request tetap memakai model lama.
+        """
+        version = self.active_version()
+        if version == current_version or not self._lock.acquire(blocking=False):
+            return
+        try:
+            model = self.load(version)
+            smoke_test(model)
+            install(model)
+        except Exception:
+            logger.exception("Gagal memasang model versi %s, tetap memakai %s", version, current_version)
+            self._active = current_version
+        finally:
+            self._lock.release()
+
+    def state(self) -> dict:
+        state = self._read_state()
+        return {
+            "active": state.get("version") or self.legacy_version(),
+            "history": state.get("history", []),
+            "versions": self.versions(),
+        }
+
+
+registry = ModelRegistry()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Registry model SVM berversi")
+    sub = parser.add_subparsers(dest="command", required=True)
+    publish = sub.add_parser("publish", help="Tambah versi dari file .pkl hasil training")
+    publish.add_argument("model", nargs="?", default=SVM_MODEL_PATH)
+    publish.add_argument("--version")
+    publish.add_argument("--activate", action="store_true")
+    sub.add_parser("list")
+    activate = sub.add_parser("activate")
+    activate.add_argument("version")
+    sub.add_parser("rollback")
+    args = parser.parse_args(argv)
+
+    # CLI hanya mencatat di active.json; proses API memasangnya saat poll berikutnya
+    noop = lambda model: None  # noqa: E731
+    if args.command == "publish":
+        version = registry.publish(args.model, args.version)
+        print(f"published: {version}")
+        if args.activate:
+            print(registry.activate(version, install=noop))
+    elif args.command == "list":
+        state = registry.state()
+        for meta in state["versions"]:
+            marker = "*" if meta["version"] == state["active"] else " "
+            print(f"{marker} {meta['version']}  {meta['published_at']}  {len(meta['classes'])} kelas  {meta['source']}")
+        print(f"active: {state['active']}  history: {state['history']}")
+    elif args.command == "activate":
+        print(registry.activate(args.version, install=noop))
+    else:
+        print(registry.rollback(install=noop))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 from datetime import datetime
 import enum
 from sqlalchemy import (
-    Column, Integer, String, ForeignKey, DateTime, Enum
+    Column, Integer, String, ForeignKey, DateTime, Enum, Index
 )
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -53,7 +53,14 @@ class Course(Base):
     lecturer_id = Column(Integer, ForeignKey("lecturers.id"))
 
     lecturer = relationship("Lecturer", back_populates="courses")
-    attendances = relationship("Attendance", back_populates="course")
+    attendances = relationship(
+        "Attendance",
+        secondary="sessions",
+        primaryjoin="Course.id == Session.course_id",
+        secondaryjoin="Session.id == Attendance.session_id",
+        back_populates="course",
+        viewonly=True,
+    )
     reports = relationship("Report", back_populates="course")
     enrollments = relationship("CourseEnrollment", back_populates="course")
     sessions = relationship("Session", back_populates="course")
@@ -63,6 +70,10 @@ class Course(Base):
 # =========================
 class CourseEnrollment(Base):
     __tablename__ = "course_enrollments"
+    __table_args__ = (
+        # Cek enrollment (course, student) & daftar mahasiswa per course
+        Index("ix_course_enrollments_course_student", "course_id", "student_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"))
@@ -76,6 +87,10 @@ class CourseEnrollment(Base):
 # =========================
 class Session(Base):
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Cari sesi dari (course, pertemuan)
+        Index("ix_sessions_course_meeting", "course_id", "meeting_no"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     course_id = Column(Integer, ForeignKey("courses.id"))
@@ -91,6 +106,12 @@ class Session(Base):
 # =========================
 class Attendance(Base):
     __tablename__ = "attendances"
+    __table_args__ = (
+        # Satu baris per mahasiswa per sesi; target INSERT ... ON CONFLICT
+        Index("uq_attendances_session_student", "session_id", "student_id", unique=True),
+        # Hitung status per sesi (GROUP BY status) cukup dari index
+        Index("ix_attendances_session_status", "session_id", "status", "student_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("sessions.id"))
@@ -98,16 +119,30 @@ class Attendance(Base):
     status = Column(Enum(AttendanceStatus), default=AttendanceStatus.hadir)
     confidence = Column(Integer, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    # Versi model SVM (app/model_registry.py) yang mengenali wajah; NULL = mark manual
+    model_version = Column(String(64), nullable=True)
 
     session = relationship("Session", back_populates="attendances")
     student = relationship("Student")
-    course = relationship("Course", back_populates="attendances", viewonly=True)
+    # Attendance tidak punya course_id sendiri: course diambil lewat sesi
+    course = relationship(
+        "Course",
+        secondary="sessions",
+        primaryjoin="Attendance.session_id == Session.id",
+        secondaryjoin="Session.course_id == Course.id",
+        back_populates="attendances",
+        viewonly=True,
+        uselist=False,
+    )
 
 # =========================
 # Laporan
 # =========================
 class Report(Base):
     __tablename__ = "reports"
+    __table_args__ = (
+        Index("uq_reports_course_meeting", "course_id", "meeting_no", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     course_id = Column(Integer, ForeignKey("courses.id"))
@@ -118,5 +153,8 @@ class Report(Base):
     hadir_count = Column(Integer, default=0)
     sakit_count = Column(Integer, default=0)
     tanpa_keterangan_count = Column(Integer, default=0)
+    # Naik di setiap transaksi yang mengubah report (report_cache.py): cache di
+    # worker lain membandingkannya untuk tahu entry-nya masih berlaku
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     course = relationship("Course", back_populates="reports")
@@ -0,0 +1,118 @@
+import hashlib
+import itertools
+import os
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import event, update
+
+from . import models
+from .database import SessionLocal
+
+# Jumlah report (course, pertemuan) yang disimpan di memori
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "512"))
+
+# Kunci di Session.info: report yang berubah di transaksi yang sedang berjalan
+_DIRTY_KEY = "report_cache_dirty"
+
+
+def report_etag(key, payload) -> str:
+    """ETag dari isi report, jadi sama di semua worker untuk isi yang sama"""
+    course_id, meeting_no = key
+    digest = hashlib.blake2b(payload.model_dump_json().encode(), digest_size=8).hexdigest()
+    return f'W/"r{course_id}-{meeting_no}-{digest}"'
+
+
+def report_version(db, course_id: int, meeting_no: int):
+    """reports.version (satu lookup index unik), None jika report belum ada"""
+    return (
+        db.query(models.Report.version)
+        .filter(models.Report.course_id == course_id, models.Report.meeting_no == meeting_no)
+        .scalar()
+    )
+
+
+class ReportCache:
+    """
+    Cache report per (course_id, meeting_no) di memori proses.
+    Dua versi per entry:
+    - versi lokal, naik saat write di proses ini commit (after_commit) atau
+      mark masuk buffer write-behind; entry dengan versi lama tidak dipakai,
+    - reports.version di DB saat report dibangun. Setiap transaksi yang
+      memanggil mark_dirty menaikkan kolom itu sebelum commit, jadi caller
+      membandingkannya (report_version, satu lookup index) sebelum memakai
+      entry: write yang commit di worker uvicorn lain langsung terlihat.
+    ETag = hash isi report (report_etag), sama di semua worker; dashboard yang
+    polling dijawab 304 dengan satu query versi, tanpa membangun report.
+    """
+
+    def __init__(self, max_entries: int = REPORT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (versi lokal, owner lecturer_id, payload, versi DB, etag)
+        self._versions = {}
+        self._counter = itertools.count(1)
+
+    def version(self, key) -> int:
+        with self._lock:
+            if key not in self._versions:
+                self._versions[key] = next(self._counter)
+            return self._versions[key]
+
+    def get(self, key):
+        """Return (versi, owner_id, payload, versi DB, etag) atau None jika tidak ada / basi di proses ini"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self._versions.get(key):
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version: int, owner_id: int, payload, db_version) -> str:
+        """Simpan report yang dibangun dengan versi lokal `version` / reports.version `db_version`; return ETag"""
+        etag = report_etag(key, payload)
+        with self._lock:
+            # Ada write yang commit selagi report dibangun -> jangan simpan data lama
+            if self._versions.get(key) != version:
+                return etag
+            self._entries[key] = (version, owner_id, payload, db_version, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._versions.pop(old_key, None)
+        return etag
+
+    def invalidate(self, key):
+        with self._lock:
+            self._versions[key] = next(self._counter)
+            self._entries.pop(key, None)
+
+
+report_cache = ReportCache()
+
+
+def mark_dirty(db, course_id: int, meeting_no: int):
+    """Catat bahwa transaksi ini mengubah report; cache baru di-invalidate setelah commit"""
+    db.info.setdefault(_DIRTY_KEY, set()).add((course_id, meeting_no))
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _bump_report_versions(db):
+    """reports.version naik di transaksi yang sama dengan perubahan report-nya"""
+    for course_id, meeting_no in sorted(db.info.get(_DIRTY_KEY, ())):
+        db.execute(
+            update(models.Report)
+            .where(models.Report.course_id == course_id, models.Report.meeting_no == meeting_no)
+            .values(version=models.Report.version + 1)
+        )
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_after_commit(db):
+    for key in db.info.pop(_DIRTY_KEY, ()):
+        report_cache.invalidate(key)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_after_rollback(db):
+    db.info.pop(_DIRTY_KEY, None)
@@ -0,0 +1,41 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from .. import face_recognition, schemas
+from ..model_registry import ModelValidationError, UnknownModelVersion, registry
+from ..security import get_current_admin
+
+router = APIRouter(prefix="/admin/models", tags=["Admin"])
+
+
+@router.get("/", response_model=schemas.ModelRegistryStatus)
+def model_status(admin=Depends(get_current_admin)):
+    """Versi aktif, riwayat rollback, semua versi di registry dan versi yang terpasang di proses ini"""
+    loaded = face_recognition.active_model
+    return schemas.ModelRegistryStatus(**registry.state(), loaded=loaded.version if loaded else None)
+
+
+@router.post("/reload", response_model=schemas.ModelActivateResponse)
+def reload_model(version: Optional[str] = None, admin=Depends(get_current_admin)):
+    """
+    Aktifkan versi model (default: versi terakhir di-publish) tanpa restart.
+    Load + smoke test dulu; jika gagal model aktif tidak berubah.
+    """
+    try:
+        return registry.activate(version)
+    except UnknownModelVersion as exc:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {exc}")
+    except ModelValidationError as exc:
+        raise HTTPException(status_code=422, detail=f"Model validation failed: {exc}")
+
+
+@router.post("/rollback", response_model=schemas.ModelActivateResponse)
+def rollback_model(admin=Depends(get_current_admin)):
+    """Aktifkan lagi versi sebelum versi aktif"""
+    try:
+        return registry.rollback()
+    except UnknownModelVersion as exc:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {exc}")
+    except ModelValidationError as exc:
+        raise HTTPException(status_code=422, detail=f"Model validation failed: {exc}")
@@ -1,18 +1,42 @@
 # app/routers/attendance.py
 
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, case, exists, func, literal, null, update
 from sqlalchemy.orm import Session
 from datetime import datetime
+from functools import partial
+import os
+import time
 import numpy as np
 import cv2
 
-from .. import models, schemas, database
-from ..database import get_db
-from ..security import get_current_lecturer
-from ..face_recognition import recognize_bgr  # <- YOLOv5su + HOG + SVM
+from .. import models, schemas, database, model_registry
+from ..candidates import candidate_cache
+from ..database import get_async_db
+from ..frame_cache import frame_cache
+from ..report_cache import mark_dirty, report_cache
+from ..session_registry import session_registry
+from ..write_behind import write_behind
+from ..security import get_current_lecturer, lecturer_from_token
+from ..inference import (  # <- YOLOv5su + HOG + SVM (worker pool)
+    InferenceUnavailable,
+    classify_faces,
+    detect_faces,
+    recognize_bgr,
+    recognize_bgr_multi,
+)
+from ..ingest import IngestedImage, InvalidImage, UploadTooLarge, ingest_upload
+from ..tracking import FaceTracker
 
 router = APIRouter(prefix="/attendance", tags=["Attendance"])
 
+# Live stream: berapa frame per detik yang diproses & confidence minimum untuk ditandai hadir
+STREAM_SAMPLE_FPS = float(os.getenv("STREAM_SAMPLE_FPS", "2"))
+STREAM_MIN_CONFIDENCE = float(os.getenv("STREAM_MIN_CONFIDENCE", "0.6"))
+# Baris per statement upsert saat flush buffer write-behind
+WRITE_BEHIND_CHUNK = int(os.getenv("WRITE_BEHIND_CHUNK", "1000"))
+
 
 # ---------------------------
 # Helpers
@@ -24,45 +48,347 @@ def _ensure_course_owned(db: Session, course_id: int, lecturer_id: int) -> model
     return course
 
 
-def _upsert_attendance(
+def _read_upload_image(file: UploadFile) -> IngestedImage:
+    """Upload -> IngestedImage (decode resolusi turun untuk deteksi, crop wajah resolusi cukup)"""
+    try:
+        return ingest_upload(file.file)
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except InvalidImage:
+        raise HTTPException(status_code=400, detail="Invalid image")
+
+
+def _active_session(course_id: int, meeting_no: int, lecturer_id: int):
+    """Sesi aktif dari registry (tanpa query), None jika tidak ada; 404 jika course bukan milik dosen"""
+    active = session_registry.find(course_id, meeting_no)
+    if active is not None and active.lecturer_id != lecturer_id:
+        raise HTTPException(status_code=404, detail="Course not found or unauthorized")
+    return active
+
+
+def _resolve_session(db: Session, course_id: int, meeting_no: int, lecturer_id: int) -> int:
+    """
+    Sesi aktif di registry: tanpa query. Selain itu satu query: cek course milik
+    dosen sekaligus ambil sesi pertemuan (sesi yang belum finish lalu di-load ke registry).
+    Jika sesi belum ada (dosen lupa start session), dibuat di transaksi yang sama.
+    Sesi pertemuan yang sudah finish -> 409 (satu sesi per pertemuan, lihat
+    routers/session._create_session).
+    """
+    active = _active_session(course_id, meeting_no, lecturer_id)
+    if active is not None:
+        return active.session_id
+
+    row = (
+        db.query(
+            models.Course.id,
+            models.Session.id.label("session_id"),
+            models.Session.finished_at,
+        )
+        .outerjoin(
+            models.Session,
+            and_(
+                models.Session.course_id == models.Course.id,
+                models.Session.meeting_no == meeting_no,
+            ),
+        )
+        .filter(models.Course.id == course_id, models.Course.lecturer_id == lecturer_id)
+        .order_by(models.Session.id.desc())
+        .first()
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail="Course not found or unauthorized")
+    if row.session_id is not None:
+        if row.finished_at is not None:
+            raise HTTPException(status_code=409, detail="Session already finished")
+        session_registry.load(db, row.session_id)
+        return row.session_id
+
+    sess = models.Session(course_id=course_id, meeting_no=meeting_no)
+    db.add(sess)
+    db.flush()
+    return sess.id
+
+
+_COUNTER_COLUMNS = {
+    models.AttendanceStatus.hadir: "hadir_count",
+    models.AttendanceStatus.sakit: "sakit_count",
+    models.AttendanceStatus.tanpa_keterangan: "tanpa_keterangan_count",
+}
+
+
+def _apply_statuses(
     db: Session,
-    student_id: int,
+    session_id: int,
     course_id: int,
     meeting_no: int,
-    status_val: models.AttendanceStatus,
-) -> models.Attendance:
-    """Insert/update attendance row untuk (student, course, meeting)."""
-    att = (
-        db.query(models.Attendance)
-        .filter_by(student_id=student_id, course_id=course_id, meeting_no=meeting_no)
-        .first()
-    )
-    now = datetime.utcnow()
-    if att:
-        att.status = status_val
-        att.timestamp = now
+    statuses: dict,
+    use_registry: bool = True,
+    model_version: str = None,
+):
+    """
+    Upsert status attendance {student_id: status} untuk satu sesi, tanpa commit:
+    1) cek enrollment + status lama: dari registry sesi aktif (tanpa query),
+       atau satu query (LEFT JOIN attendances) jika sesi tidak ada di registry,
+    2) satu INSERT ... ON CONFLICT (session_id, student_id) DO UPDATE multi-row,
+    3) satu UPDATE counter report berdasarkan delta perubahan status.
+    model_version: versi SVM yang mengenali wajah (None = mark manual), ikut ditulis.
+    Mode write-behind + sesi di registry: 2) dan 3) diganti journal + buffer
+    (write_behind.submit), ditulis ke DB oleh write_pending_marks.
+    Return: (dict student_id -> record, list student_id yang tidak terdaftar)
+    """
+    active = session_registry.get(session_id) if use_registry else None
+    if active is None and write_behind.enabled and write_behind.has_pending(session_id):
+        # Status lama dibaca dari DB: mark sesi ini di buffer harus sudah tertulis
+        write_behind.flush()
+    if active is not None:
+        records = {
+            student_id: {
+                "student_id": student_id,
+                "student_name": active.names[student_id],
+                "old_status": active.statuses.get(student_id, (None, None))[0],
+                "status": status_val,
+                "timestamp": active.statuses.get(student_id, (None, None))[1],
+                "changed": False,
+            }
+            for student_id, status_val in statuses.items()
+            if student_id in active.names
+        }
     else:
-        att = models.Attendance(
-            student_id=student_id,
-            course_id=course_id,
-            meeting_no=meeting_no,
-            status=status_val,
-            timestamp=now,
+        rows = (
+            db.query(
+                models.CourseEnrollment.student_id,
+                models.Student.name,
+                models.Attendance.status,
+                models.Attendance.timestamp,
+            )
+            .join(models.Student, models.Student.id == models.CourseEnrollment.student_id)
+            .outerjoin(
+                models.Attendance,
+                and_(
+                    models.Attendance.session_id == session_id,
+                    models.Attendance.student_id == models.CourseEnrollment.student_id,
+                ),
+            )
+            .filter(
+                models.CourseEnrollment.course_id == course_id,
+                models.CourseEnrollment.student_id.in_(list(statuses)),
+            )
+            .all()
+        )
+        records = {
+            row.student_id: {
+                "student_id": row.student_id,
+                "student_name": row.name,
+                "old_status": row.status,
+                "status": statuses[row.student_id],
+                "timestamp": row.timestamp,
+                "changed": False,
+            }
+            for row in rows
+        }
+    not_enrolled = [student_id for student_id in statuses if student_id not in records]
+
+    changed = [rec for rec in records.values() if rec["old_status"] != rec["status"]]
+    if not changed:
+        return records, not_enrolled
+
+    now = datetime.utcnow()
+    if active is not None and write_behind.enabled:
+        write_behind.submit(
+            session_id,
+            course_id,
+            meeting_no,
+            {rec["student_id"]: rec["status"] for rec in changed},
+            now,
+            model_version,
+        )
+        for rec in changed:
+            rec["timestamp"] = now
+            rec["changed"] = True
+            if rec["status"] != models.AttendanceStatus.hadir:
+                frame_cache.forget_student(session_id, rec["student_id"])
+            active.statuses[rec["student_id"]] = (rec["status"], now)
+        # Report membaca lewat buffer: versi cache langsung dinaikkan
+        report_cache.invalidate((course_id, meeting_no))
+        return records, not_enrolled
+
+    insert = database.insert_for(db)
+    stmt = insert(models.Attendance).values(
+        [
+            {
+                "session_id": session_id,
+                "student_id": rec["student_id"],
+                "status": rec["status"],
+                "timestamp": now,
+                "model_version": model_version,
+            }
+            for rec in changed
+        ]
+    )
+    # Request lain yang menulis status sama duluan -> tidak dihitung dua kali
+    guard = models.Attendance.status.is_distinct_from(stmt.excluded.status)
+    if active is not None:
+        # Status lama dari registry harus masih sama dengan di DB, jika tidak baris dilewati
+        status_type = models.Attendance.__table__.c.status.type
+        expected = case(
+            *[
+                (stmt.excluded.student_id == rec["student_id"], literal(rec["old_status"], status_type))
+                for rec in changed
+            ],
+            else_=null(),
+        )
+        guard = and_(guard, models.Attendance.status.is_not_distinct_from(expected))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.Attendance.session_id, models.Attendance.student_id],
+        set_={
+            "status": stmt.excluded.status,
+            "timestamp": stmt.excluded.timestamp,
+            "model_version": stmt.excluded.model_version,
+        },
+        where=guard,
+    ).returning(models.Attendance.student_id)
+    written = {row.student_id for row in db.execute(stmt)}
+
+    # Delta counter: status lama -1, status baru +1
+    deltas = {}
+    for rec in changed:
+        if rec["student_id"] not in written:
+            continue
+        rec["timestamp"] = now
+        rec["changed"] = True
+        if rec["status"] != models.AttendanceStatus.hadir:
+            frame_cache.forget_student(session_id, rec["student_id"])
+        new_col = _COUNTER_COLUMNS[rec["status"]]
+        deltas[new_col] = deltas.get(new_col, 0) + 1
+        if rec["old_status"] is not None:
+            old_col = _COUNTER_COLUMNS[rec["old_status"]]
+            deltas[old_col] = deltas.get(old_col, 0) - 1
+    _apply_report_deltas(db, session_id, course_id, meeting_no, deltas)
+
+    if active is not None:
+        stale = {rec["student_id"]: rec["status"] for rec in changed if not rec["changed"]}
+        retried = {}
+        if stale:
+            # Registry tertinggal dari DB (request paralel / proses lain): proses ulang
+            # mahasiswa ini lewat query, status DB-nya lalu dipakai registry
+            retried, _ = _apply_statuses(
+                db, session_id, course_id, meeting_no, stale, use_registry=False, model_version=model_version
+            )
+            records.update(retried)
+        session_registry.record(
+            db,
+            session_id,
+            {
+                rec["student_id"]: (rec["status"], rec["timestamp"])
+                for rec in records.values()
+                if rec["changed"] or rec["student_id"] in retried
+            },
+        )
+    return records, not_enrolled
+
+
+def _apply_report_deltas(db: Session, session_id: int, course_id: int, meeting_no: int, deltas: dict):
+    deltas = {col: delta for col, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    mark_dirty(db, course_id, meeting_no)
+    result = db.execute(
+        update(models.Report)
+        .where(models.Report.course_id == course_id, models.Report.meeting_no == meeting_no)
+        .values({col: getattr(models.Report, col) + delta for col, delta in deltas.items()})
+    )
+    # Jika report belum ada (mis. dosen lupa start session), buat dengan hitungan penuh
+    if result.rowcount == 0:
+        _recount_report(db, course_id, meeting_no)
+
+
+def mark_remaining_absent(db: Session, session_id: int, course_id: int, meeting_no: int) -> int:
+    """
+    Semua mahasiswa terdaftar yang belum punya baris attendance di sesi ini
+    -> 'tanpa_keterangan'. Satu INSERT ... SELECT di database + satu UPDATE counter,
+    tanpa commit. Return jumlah baris yang ditambahkan.
+    """
+    # Mahasiswa yang mark-nya masih di buffer write-behind bukan "belum absen"
+    if write_behind.enabled and write_behind.has_pending(session_id):
+        write_behind.flush()
+    absent = literal(models.AttendanceStatus.tanpa_keterangan, models.Attendance.__table__.c.status.type)
+    remaining = (
+        db.query(
+            literal(session_id),
+            models.CourseEnrollment.student_id,
+            absent,
+            literal(datetime.utcnow()),
+        )
+        .filter(
+            models.CourseEnrollment.course_id == course_id,
+            ~exists().where(
+                models.Attendance.session_id == session_id,
+                models.Attendance.student_id == models.CourseEnrollment.student_id,
+            ),
+        )
+    )
+    insert = database.insert_for(db)
+    stmt = insert(models.Attendance).from_select(
+        ["session_id", "student_id", "status", "timestamp"], remaining
+    ).on_conflict_do_nothing(
+        index_elements=[models.Attendance.session_id, models.Attendance.student_id]
+    )
+    inserted = db.execute(stmt).rowcount
+    if inserted:
+        session_registry.evict_after_commit(db, session_id)
+    _apply_report_deltas(
+        db, session_id, course_id, meeting_no, {"tanpa_keterangan_count": inserted}
+    )
+    return inserted
+
+
+def write_pending_marks(db: Session, marks):
+    """
+    Writer write-behind: semua mark di buffer (banyak sesi sekaligus) -> upsert
+    multi-row per WRITE_BEHIND_CHUNK baris, counter report pertemuan yang tersentuh
+    dihitung ulang (GROUP BY), lalu satu commit.
+    """
+    insert = database.insert_for(db)
+    for start in range(0, len(marks), WRITE_BEHIND_CHUNK):
+        stmt = insert(models.Attendance).values(
+            [
+                {
+                    "session_id": mark.session_id,
+                    "student_id": mark.student_id,
+                    "status": mark.status,
+                    "timestamp": mark.timestamp,
+                    "model_version": mark.model_version,
+                }
+                for mark in marks[start:start + WRITE_BEHIND_CHUNK]
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.Attendance.session_id, models.Attendance.student_id],
+            set_={
+                "status": stmt.excluded.status,
+                "timestamp": stmt.excluded.timestamp,
+                "model_version": stmt.excluded.model_version,
+            },
+            where=models.Attendance.status.is_distinct_from(stmt.excluded.status),
         )
-        db.add(att)
+        db.execute(stmt)
+    for course_id, meeting_no in {(m.course_id, m.meeting_no) for m in marks}:
+        _recount_report(db, course_id, meeting_no)
     db.commit()
-    db.refresh(att)
-    return att
 
 
 def _recount_report(db: Session, course_id: int, meeting_no: int) -> models.Report:
-    """Hitung ulang agregat report (hadir/sakit/tanpa_keterangan) dan simpan."""
+    """
+    Hitung ulang agregat report (hadir/sakit/tanpa_keterangan) dengan satu GROUP BY, tanpa commit.
+    Report per (course, pertemuan), jadi yang dihitung semua sesi pertemuan itu, sama
+    seperti delta di _apply_report_deltas dan migrations._recount_reports (data lama
+    bisa punya lebih dari satu sesi per pertemuan).
+    """
     report = (
         db.query(models.Report)
         .filter(models.Report.course_id == course_id, models.Report.meeting_no == meeting_no)
         .first()
     )
-    # Jika report belum ada (mis. dosen lupa start session), buat minimal entry
     if report is None:
         total = (
             db.query(models.CourseEnrollment)
@@ -76,66 +402,86 @@ def _recount_report(db: Session, course_id: int, meeting_no: int) -> models.Repo
             total_students=total,
         )
         db.add(report)
-        db.commit()
-        db.refresh(report)
-
-    hadir = (
-        db.query(models.Attendance)
-        .filter_by(course_id=course_id, meeting_no=meeting_no, status=models.AttendanceStatus.hadir)
-        .count()
-    )
-    sakit = (
-        db.query(models.Attendance)
-        .filter_by(course_id=course_id, meeting_no=meeting_no, status=models.AttendanceStatus.sakit)
-        .count()
-    )
-    tanpa = (
-        db.query(models.Attendance)
-        .filter_by(
-            course_id=course_id,
-            meeting_no=meeting_no,
-            status=models.AttendanceStatus.tanpa_keterangan,
-        )
-        .count()
-    )
-
-    report.hadir_count = hadir
-    report.sakit_count = sakit
-    report.tanpa_keterangan_count = tanpa
 
-    db.commit()
-    db.refresh(report)
+    counts = dict(
+        db.query(models.Attendance.status, func.count())
+        .join(models.Session, models.Session.id == models.Attendance.session_id)
+        .filter(models.Session.course_id == course_id, models.Session.meeting_no == meeting_no)
+        .group_by(models.Attendance.status)
+        .all()
+    )
+    for status_val, col in _COUNTER_COLUMNS.items():
+        setattr(report, col, counts.get(status_val, 0))
+    mark_dirty(db, course_id, meeting_no)
+    db.flush()
     return report
 
 
 # ---------------------------
 # 1) Face-based mark (YOLOv5su + HOG + SVM)
 # ---------------------------
+def _resolve_session_released(db: Session, course_id: int, meeting_no: int, lecturer_id: int):
+    """
+    _resolve_session + kandidat recognition (mahasiswa terdaftar, dari cache) lalu commit,
+    supaya koneksi DB tidak ditahan selama decode / inference. Return (session_id, kandidat)
+    """
+    session_id = _resolve_session(db, course_id, meeting_no, lecturer_id)
+    active = session_registry.get(session_id)
+    candidates = active.candidates if active is not None else candidate_cache.get(db, course_id)
+    db.commit()
+    return session_id, candidates
+
+
+async def _session_for_recognition(db, course_id: int, meeting_no: int, lecturer_id: int):
+    """(session_id, kandidat recognition): dari registry sesi aktif tanpa DB, selain itu lewat run_sync"""
+    active = _active_session(course_id, meeting_no, lecturer_id)
+    if active is not None:
+        return active.session_id, active.candidates
+    return await db.run_sync(_resolve_session_released, course_id, meeting_no, lecturer_id)
+
+
+def _mark_face_present(
+    db: Session, session_id: int, course_id: int, meeting_no: int, student_id: int, model_version: str = None
+):
+    # Cek enrollment + upsert hadir + delta report, satu transaksi
+    _, not_enrolled = _apply_statuses(
+        db,
+        session_id,
+        course_id,
+        meeting_no,
+        {student_id: models.AttendanceStatus.hadir},
+        model_version=model_version,
+    )
+    if not_enrolled:
+        raise HTTPException(status_code=400, detail="Student is not enrolled in this course")
+    db.commit()
+
+
 @router.post("/mark/face", response_model=schemas.AttendanceMarkResponse)
-def mark_attendance_by_face(
+async def mark_attendance_by_face(
     course_id: int,
     meeting_no: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
     lecturer=Depends(get_current_lecturer),
 ):
     """
     Dosen upload 1 frame (jpg/png) dari kamera depan kelas.
-    Sistem: YOLOv5su -> crop -> HOG -> SVM -> dapat student_id + confidence.
-    Lalu upsert attendance = 'hadir' untuk student tsb.
+    Sistem: YOLOv5su -> crop -> HOG -> SVM (hanya kelas mahasiswa terdaftar)
+    -> dapat student_id + confidence. Lalu upsert attendance = 'hadir' untuk student tsb.
     """
-    # Validasi course
-    _ = _ensure_course_owned(db, course_id, lecturer.id)
+    # Validasi course + ambil sesi + kandidat recognition (registry sesi aktif / satu query)
+    session_id, candidates = await _session_for_recognition(db, course_id, meeting_no, lecturer.id)
 
-    # Baca gambar
-    content = file.file.read()
-    npimg = np.frombuffer(content, np.uint8)
-    img_bgr = cv2.imdecode(npimg, cv2.IMREAD_COLOR)
-    if img_bgr is None:
-        raise HTTPException(status_code=400, detail="Invalid image")
+    # Baca + decode gambar (CPU) di threadpool
+    image = await run_in_threadpool(_read_upload_image, file)
 
-    # Recognize (pakai pipeline YOLOv5su+HOG+SVM di face_recognition.py)
-    student_id, confidence = recognize_bgr(img_bgr)
+    # Recognize (pakai pipeline YOLOv5su+HOG+SVM di face_recognition.py) di threadpool;
+    # frame kiriman ulang / hampir sama di sesi ini diambil dari cache
+    entry, _ = await run_in_threadpool(
+        frame_cache.recognize, session_id, "face", image, partial(recognize_bgr, candidates=candidates)
+    )
+    student_id, confidence = entry.result
 
     if student_id is None:
         # Tidak ada wajah / tidak dikenal
@@ -144,45 +490,287 @@ def mark_attendance_by_face(
             detail="Face not detected / not recognized",
         )
 
-    # Pastikan student ada & terdaftar di kelas (opsional tapi disarankan)
-    student = db.get(models.Student, student_id)
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
+    # Frame ini sudah pernah ditulis hadir dan statusnya belum diubah -> tanpa write
+    if entry.marked is None:
+        await db.run_sync(
+            _mark_face_present, session_id, course_id, meeting_no, student_id, entry.model_version
+        )
+        entry.marked = {student_id}
 
-    enrolled = (
-        db.query(models.CourseEnrollment)
-        .filter_by(course_id=course_id, student_id=student_id)
-        .first()
+    return schemas.AttendanceMarkResponse(
+        status="hadir",
+        student_id=student_id,
+        confidence=confidence,
+        model_version=entry.model_version,
     )
-    if not enrolled:
-        raise HTTPException(status_code=400, detail="Student is not enrolled in this course")
 
-    # Upsert hadir
-    att = _upsert_attendance(
-        db,
-        student_id=student_id,
-        course_id=course_id,
-        meeting_no=meeting_no,
-        status_val=models.AttendanceStatus.hadir,
+
+# ---------------------------
+# 1b) Face-based mark, semua wajah dalam satu frame kelas
+# ---------------------------
+def _best_faces(detections, enrolled_ids) -> dict:
+    """
+    Wajah yang sama bisa muncul > 1 kali: {student_id: indeks wajah 'hadir'}.
+    Confidence tertinggi; seri -> box terbesar, lalu indeks pertama, jadi tiap
+    mahasiswa tepat satu wajah 'hadir' per frame.
+    """
+    best = {}
+    for i, ((x1, y1, x2, y2), student_id, confidence) in enumerate(detections):
+        if student_id not in enrolled_ids:
+            continue
+        key = (confidence, (x2 - x1) * (y2 - y1))
+        if student_id not in best or key > best[student_id][0]:
+            best[student_id] = (key, i)
+    return {student_id: i for student_id, (_, i) in best.items()}
+
+
+@router.post("/mark/face/batch", response_model=schemas.AttendanceBatchMarkResponse)
+async def mark_attendance_by_face_batch(
+    course_id: int,
+    meeting_no: int,
+    file: UploadFile = File(...),
+    db=Depends(get_async_db),
+    lecturer=Depends(get_current_lecturer),
+):
+    """
+    Dosen upload 1 frame berisi banyak mahasiswa.
+    Sistem: YOLOv5su sekali -> crop semua wajah -> HOG (matriks) -> satu predict_proba.
+    Semua mahasiswa yang dikenali & terdaftar di-upsert 'hadir' dalam satu transaksi.
+    """
+    # Validasi course + ambil sesi + kandidat recognition (registry sesi aktif / satu query)
+    session_id, candidates = await _session_for_recognition(db, course_id, meeting_no, lecturer.id)
+
+    # Baca gambar
+    image = await run_in_threadpool(_read_upload_image, file)
+
+    entry, _ = await run_in_threadpool(
+        frame_cache.recognize, session_id, "face_batch", image, partial(recognize_bgr_multi, candidates=candidates)
     )
+    detections = entry.result
 
-    # Update agregat report
-    _recount_report(db, course_id, meeting_no)
+    # Satu query cek enrollment semua kandidat, satu upsert multi-row, satu commit
+    # (dilewati jika frame yang sama sudah pernah ditulis)
+    candidate_ids = {student_id for _, student_id, _ in detections if student_id is not None}
+    enrolled_ids = entry.marked
+    if enrolled_ids is None:
+        enrolled_ids = set()
+        if candidate_ids:
+            records = await db.run_sync(
+                _mark_present_many, session_id, course_id, meeting_no, candidate_ids, entry.model_version
+            )
+            enrolled_ids = set(records)
+        entry.marked = enrolled_ids
 
-    return schemas.AttendanceMarkResponse(
-        status="hadir",
-        student_id=att.student_id,
-        confidence=confidence,
+    best = _best_faces(detections, enrolled_ids)
+
+    faces = []
+    for i, ((x1, y1, x2, y2), student_id, confidence) in enumerate(detections):
+        if student_id is None:
+            face_status = "unknown"
+        elif student_id not in enrolled_ids:
+            face_status = "not_enrolled"
+        elif best[student_id] == i:
+            face_status = "hadir"
+        else:
+            face_status = "duplicate"
+        faces.append(
+            schemas.FaceMarkResult(
+                box=[x1, y1, x2, y2],
+                status=face_status,
+                student_id=student_id,
+                confidence=confidence,
+            )
+        )
+
+    return schemas.AttendanceBatchMarkResponse(
+        faces_detected=len(detections),
+        marked=sorted(best),
+        faces=faces,
+        model_version=entry.model_version,
     )
 
 
+# ---------------------------
+# 1c) Live stream per sesi (WebSocket) + face tracking
+# ---------------------------
+def _load_stream_context(db: Session, session_id: int, token: str):
+    lecturer = lecturer_from_token(db, token)
+    active = session_registry.get(session_id) or session_registry.load(db, session_id)
+    if active is not None:
+        if active.lecturer_id != lecturer.id:
+            raise HTTPException(status_code=404, detail="Course not found or unauthorized")
+        present = {
+            student_id
+            for student_id, (status_val, _) in active.statuses.items()
+            if status_val == models.AttendanceStatus.hadir
+        }
+        return active.course_id, active.meeting_no, active.candidates, present
+
+    sess = db.get(models.Session, session_id)
+    if sess is None or sess.finished_at is not None:
+        raise HTTPException(status_code=404, detail="Session not found or finished")
+    _ensure_course_owned(db, sess.course_id, lecturer.id)
+
+    enrolled = candidate_cache.get(db, sess.course_id)
+    already_present = {
+        row.student_id
+        for row in db.query(models.Attendance.student_id)
+        .filter_by(session_id=sess.id, status=models.AttendanceStatus.hadir)
+        .all()
+    }
+    return sess.course_id, sess.meeting_no, enrolled, already_present
+
+
+def _track_frame(img_bgr: np.ndarray, tracker: FaceTracker, candidates=None):
+    """
+    YOLO tiap frame, HOG+SVM (hanya kelas kandidat) untuk track baru / yang belum yakin.
+    Return (track terlihat, jumlah yang diklasifikasi, versi SVM atau None jika tidak ada klasifikasi)
+    """
+    visible = tracker.update(detect_faces(img_bgr))
+    todo = [track for track in visible if tracker.needs_classification(track)]
+    model_registry.note_used(None)
+    if todo:
+        predictions = classify_faces(img_bgr, [track.box for track in todo], candidates)
+        for track, (student_id, confidence) in zip(todo, predictions):
+            tracker.record(track, student_id, confidence)
+    return visible, len(todo), model_registry.used_version()
+
+
+def _mark_present_many(
+    db: Session, session_id: int, course_id: int, meeting_no: int, student_ids, model_version: str = None
+):
+    """Upsert 'hadir' banyak mahasiswa + commit; return record mahasiswa yang terdaftar"""
+    records, _ = _apply_statuses(
+        db,
+        session_id,
+        course_id,
+        meeting_no,
+        {student_id: models.AttendanceStatus.hadir for student_id in student_ids},
+        model_version=model_version,
+    )
+    db.commit()
+    return records
+
+
+@router.websocket("/stream/{session_id}")
+async def stream_attendance(
+    websocket: WebSocket,
+    session_id: int,
+    token: str,
+    sample_fps: float = STREAM_SAMPLE_FPS,
+    db=Depends(get_async_db),
+):
+    """
+    Kamera kelas mengirim frame JPEG (pesan binary) terus-menerus.
+    Frame di-sample sesuai sample_fps -> YOLOv5su -> tracker IoU.
+    HOG+SVM hanya dijalankan untuk track baru / yang confidence-nya masih rendah,
+    dan tiap mahasiswa ditandai 'hadir' sekali saja per sesi.
+    """
+    try:
+        course_id, meeting_no, enrolled, marked = await db.run_sync(
+            _load_stream_context, session_id, token
+        )
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    tracker = FaceTracker(min_confidence=STREAM_MIN_CONFIDENCE)
+    min_interval = 1.0 / sample_fps if sample_fps > 0 else 0.0
+    last_processed = 0.0
+    # Versi SVM klasifikasi terakhir stream ini (track yang di-mark bisa dikenali di frame sebelumnya)
+    model_version = None
+
+    try:
+        while True:
+            data = await websocket.receive_bytes()
+            now = time.monotonic()
+            if now - last_processed < min_interval:
+                continue  # frame di-skip (sampling)
+            last_processed = now
+
+            img_bgr = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            if img_bgr is None:
+                await websocket.send_json({"error": "Invalid image"})
+                continue
+
+            try:
+                visible, classified, used = await run_in_threadpool(_track_frame, img_bgr, tracker, enrolled)
+            except InferenceUnavailable as exc:
+                # Antrian inference penuh / timeout: frame ini dibuang, kamera mengirim frame berikutnya
+                await websocket.send_json({"error": exc.detail, "retry_after": exc.retry_after})
+                continue
+            model_version = used or model_version
+
+            newly_marked = sorted(
+                {
+                    track.student_id
+                    for track in visible
+                    if track.student_id is not None
+                    and track.confidence >= STREAM_MIN_CONFIDENCE
+                    and track.student_id in enrolled
+                    and track.student_id not in marked
+                }
+            )
+            if newly_marked:
+                await db.run_sync(
+                    _mark_present_many, session_id, course_id, meeting_no, newly_marked, model_version
+                )
+                marked.update(newly_marked)
+
+            await websocket.send_json(
+                {
+                    "tracks": [
+                        {
+                            "track_id": track.track_id,
+                            "box": list(track.box),
+                            "student_id": track.student_id,
+                            "confidence": track.confidence,
+                        }
+                        for track in visible
+                    ],
+                    "classified": classified,
+                    "marked": newly_marked,
+                    "present_count": len(marked),
+                }
+            )
+    except WebSocketDisconnect:
+        return
+
+
 # ---------------------------
 # 2) Manual mark (sakit / tanpa_keterangan / koreksi)
 # ---------------------------
+def _mark_manual(db: Session, payload: schemas.AttendanceStatusUpdate, lecturer_id: int):
+    # Validasi course + ambil sesi (satu query)
+    session_id = _resolve_session(db, payload.course_id, payload.meeting_no, lecturer_id)
+
+    # Cek enrollment + upsert sesuai status kiriman + delta report, satu transaksi
+    records, not_enrolled = _apply_statuses(
+        db,
+        session_id,
+        payload.course_id,
+        payload.meeting_no,
+        {payload.student_id: models.AttendanceStatus(payload.status.value)},
+    )
+    if not_enrolled:
+        raise HTTPException(status_code=400, detail="Student is not enrolled in this course")
+    db.commit()
+
+    # Bentuk response
+    rec = records[payload.student_id]
+    return schemas.AttendanceRecord(
+        student_id=rec["student_id"],
+        student_name=rec["student_name"],
+        status=rec["status"].value,
+        timestamp=rec["timestamp"],
+    )
+
+
 @router.post("/mark/manual", response_model=schemas.AttendanceRecord)
-def mark_attendance_manual(
+async def mark_attendance_manual(
     payload: schemas.AttendanceStatusUpdate,
-    db: Session = Depends(database.get_db),
+    db=Depends(database.get_async_db),
     lecturer=Depends(get_current_lecturer),
 ):
     """
@@ -191,39 +779,68 @@ def mark_attendance_manual(
     - tanpa_keterangan
     (atau koreksi status bila perlu)
     """
-    # Validasi course
-    _ = _ensure_course_owned(db, payload.course_id, lecturer.id)
+    return await db.run_sync(_mark_manual, payload, lecturer.id)
 
-    # Validasi student
-    st = db.get(models.Student, payload.student_id)
-    if not st:
-        raise HTTPException(status_code=404, detail="Student not found")
 
-    # Optional: pastikan terdaftar di mata kuliah
-    enrolled = (
-        db.query(models.CourseEnrollment)
-        .filter_by(course_id=payload.course_id, student_id=payload.student_id)
-        .first()
-    )
-    if not enrolled:
-        raise HTTPException(status_code=400, detail="Student is not enrolled in this course")
+# ---------------------------
+# 2b) Manual mark banyak mahasiswa sekaligus
+# ---------------------------
+def _mark_manual_bulk(db: Session, payload: schemas.AttendanceBulkStatusUpdate, lecturer_id: int):
+    # Validasi course + ambil sesi (satu query)
+    session_id = _resolve_session(db, payload.course_id, payload.meeting_no, lecturer_id)
 
-    # Upsert sesuai status kiriman
-    att = _upsert_attendance(
-        db,
-        student_id=payload.student_id,
-        course_id=payload.course_id,
-        meeting_no=payload.meeting_no,
-        status_val=models.AttendanceStatus(payload.status.value if hasattr(payload.status, "value") else payload.status),  # handle enum/string
-    )
+    # Student yang dikirim lebih dari sekali: status terakhir yang dipakai
+    statuses = {
+        item.student_id: models.AttendanceStatus(item.status.value) for item in payload.items
+    }
+    records, not_enrolled = ({}, [])
+    if statuses:
+        records, not_enrolled = _apply_statuses(
+            db, session_id, payload.course_id, payload.meeting_no, statuses
+        )
+    remaining = 0
+    if payload.mark_remaining_absent:
+        remaining = mark_remaining_absent(db, session_id, payload.course_id, payload.meeting_no)
+    db.commit()
 
-    # Update agregat report
-    _recount_report(db, payload.course_id, payload.meeting_no)
+    results = []
+    for student_id, status_val in statuses.items():
+        rec = records.get(student_id)
+        if rec is None:
+            results.append(
+                schemas.AttendanceBulkResult(
+                    student_id=student_id, result="not_enrolled", status=status_val.value
+                )
+            )
+            continue
+        results.append(
+            schemas.AttendanceBulkResult(
+                student_id=student_id,
+                result="updated" if rec["changed"] else "unchanged",
+                status=rec["status"].value,
+                student_name=rec["student_name"],
+                timestamp=rec["timestamp"],
+            )
+        )
 
-    # Bentuk response
-    return schemas.AttendanceRecord(
-        student_id=att.student_id,
-        student_name=st.name,
-        status=att.status.value if hasattr(att.status, "value") else str(att.status),
-        timestamp=att.timestamp,
+    return schemas.AttendanceBulkMarkResponse(
+        updated=sum(1 for r in results if r.result == "updated"),
+        unchanged=sum(1 for r in results if r.result == "unchanged"),
+        not_enrolled=len(not_enrolled),
+        marked_remaining_absent=remaining,
+        results=results,
     )
+
+
+@router.post("/mark/manual/bulk", response_model=schemas.AttendanceBulkMarkResponse)
+async def mark_attendance_manual_bulk(
+    payload: schemas.AttendanceBulkStatusUpdate,
+    db=Depends(database.get_async_db),
+    lecturer=Depends(get_current_lecturer),
+):
+    """
+    Dosen menandai status banyak mahasiswa (mis. sisa kelas setelah kamera) dalam satu request:
+    satu cek enrollment, satu upsert multi-row, satu update counter report, satu commit.
+    Opsi mark_remaining_absent: mahasiswa lain yang belum absen -> 'tanpa_keterangan'.
+    """
+    return await db.run_sync(_mark_manual_bulk, payload, lecturer.id)
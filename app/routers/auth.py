@@ -1,47 +1,56 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Form
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
-from ..database import get_db
+from ..database import get_async_db
 from .. import models, schemas
-from ..security import create_access_token, hash_password, verify_password
+from ..security import create_access_token, hash_password_async, verify_password_async
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
+def _find_lecturer(db: Session, email: str):
+    return db.query(models.Lecturer).filter(models.Lecturer.email == email).first()
+
+
+def _save_lecturer(db: Session, lec: models.Lecturer) -> int:
+    db.add(lec)
+    db.commit()
+    return lec.id
+
+
+# Handler async: query DB lewat get_async_db (AsyncSession / threadpool), bcrypt di executor khusus (security.py)
 @router.post("/register", response_model=schemas.Token)
-def register_lecturer(
+async def register_lecturer(
     name: str = Form(...),
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
 ):
     # Cek apakah email sudah dipakai
-    if db.query(models.Lecturer).filter(models.Lecturer.email == email).first():
+    if await db.run_sync(_find_lecturer, email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Simpan dosen baru
     lec = models.Lecturer(
         name=name,
         email=email,
-        password_hash=hash_password(password),
+        password_hash=await hash_password_async(password),
     )
-    db.add(lec)
-    db.commit()
-    db.refresh(lec)
+    lecturer_id = await db.run_sync(_save_lecturer, lec)
 
     # Generate token setelah registrasi
-    token = create_access_token({"sub": str(lec.id)})
+    token = create_access_token({"sub": str(lecturer_id)})
     return {"access_token": token, "token_type": "bearer"}
 
 @router.post("/login", response_model=schemas.Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
 ):
     # Cari lecturer berdasarkan email
-    lec = db.query(models.Lecturer).filter(models.Lecturer.email == form_data.username).first()
+    lec = await db.run_sync(_find_lecturer, form_data.username)
 
     # Validasi password
-    if not lec or not verify_password(form_data.password, lec.password_hash):
+    if not lec or not await verify_password_async(form_data.password, lec.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
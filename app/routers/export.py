@@ -0,0 +1,63 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..database import get_db
+from ..export import FORMATS, export_manager
+from ..security import get_current_lecturer
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+
+def _job_response(job) -> schemas.ExportJobResponse:
+    return schemas.ExportJobResponse(
+        job_id=job.id,
+        course_id=job.course_id,
+        format=job.fmt,
+        status=job.status,
+        error=job.error,
+        download_url=f"/export/jobs/{job.id}/download" if job.status == "done" else None,
+    )
+
+
+def _get_owned_job(job_id: str, lecturer_id: int):
+    job = export_manager.get(job_id)
+    if job is None or job.lecturer_id != lecturer_id:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.post("/{course_id}", response_model=schemas.ExportJobResponse, status_code=202)
+def create_export(
+    course_id: int,
+    format: Literal["csv", "pdf"] = "csv",
+    db: Session = Depends(get_db),
+    lecturer=Depends(get_current_lecturer),
+):
+    """
+    Mulai export rekap semester (semua pertemuan x semua mahasiswa) di background.
+    Jika belum ada attendance baru sejak export terakhir, file lama langsung dipakai.
+    """
+    course = db.get(models.Course, course_id)
+    if not course or course.lecturer_id != lecturer.id:
+        raise HTTPException(status_code=404, detail="Course not found or unauthorized")
+
+    job = export_manager.submit(db, course_id, lecturer.id, format)
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.ExportJobResponse)
+def get_export_job(job_id: str, lecturer=Depends(get_current_lecturer)):
+    return _job_response(_get_owned_job(job_id, lecturer.id))
+
+
+@router.get("/jobs/{job_id}/download")
+def download_export(job_id: str, lecturer=Depends(get_current_lecturer)):
+    """File dikirim bertahap (chunk) dari disk, tidak dibaca utuh ke memori"""
+    job = _get_owned_job(job_id, lecturer.id)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Export is {job.status}")
+    return FileResponse(job.path, media_type=FORMATS[job.fmt], filename=job.filename)
@@ -0,0 +1,110 @@
+from typing import List
+import time
+
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from sqlalchemy.orm import Session
+import numpy as np
+
+from .. import models, schemas
+from ..database import get_db
+from .. import security
+from ..security import get_current_lecturer
+from ..inference import extract_face_features  # <- worker pool bila aktif
+from ..gallery import get_gallery
+from ..ingest import InvalidImage, UploadTooLarge, ingest_upload
+
+router = APIRouter(prefix="/gallery", tags=["Gallery"])
+
+
+def _get_managed_student(db: Session, student_id: int, lecturer_id: int) -> models.Student:
+    """
+    Galeri wajah hanya boleh diubah admin (ADMIN_LECTURER_IDS) atau dosen yang
+    mahasiswanya terdaftar di salah satu course miliknya; selain itu 404.
+    """
+    query = db.query(models.Student).filter(models.Student.id == student_id)
+    if lecturer_id not in security.ADMIN_LECTURER_IDS:
+        query = query.filter(
+            db.query(models.CourseEnrollment)
+            .join(models.Course, models.Course.id == models.CourseEnrollment.course_id)
+            .filter(
+                models.CourseEnrollment.student_id == models.Student.id,
+                models.Course.lecturer_id == lecturer_id,
+            )
+            .exists()
+        )
+    student = query.first()
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return student
+
+
+@router.post("/{student_id}/enroll", response_model=schemas.GalleryEnrollResponse)
+def enroll_student_face(
+    student_id: int,
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    lecturer=Depends(get_current_lecturer),
+):
+    """
+    Tambah foto wajah mahasiswa ke galeri (tanpa retrain SVM).
+    Tiap foto: YOLOv5su -> wajah terbesar -> HOG -> disimpan sebagai vektor galeri.
+    """
+    student = _get_managed_student(db, student_id, lecturer.id)
+
+    features = []
+    for file in files:
+        try:
+            image = ingest_upload(file.file)
+        except UploadTooLarge as exc:
+            raise HTTPException(status_code=413, detail=f"{file.filename}: {exc}")
+        except InvalidImage:
+            raise HTTPException(status_code=400, detail=f"Invalid image: {file.filename}")
+        feat = extract_face_features(image)
+        if feat is not None:
+            features.append(feat)
+
+    if not features:
+        raise HTTPException(status_code=422, detail="Face not detected in any image")
+
+    start = time.perf_counter()
+    gallery = get_gallery()
+    face_id = gallery.enroll(student.id, np.vstack(features), face_id=student.face_id)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if student.face_id != face_id:
+        student.face_id = face_id
+        db.commit()
+
+    return schemas.GalleryEnrollResponse(
+        student_id=student.id,
+        face_id=face_id,
+        vectors_added=len(features),
+        gallery_size=len(gallery),
+        elapsed_ms=elapsed_ms,
+    )
+
+
+@router.delete("/{student_id}", response_model=schemas.GalleryRemoveResponse)
+def remove_student_face(
+    student_id: int,
+    db: Session = Depends(get_db),
+    lecturer=Depends(get_current_lecturer),
+):
+    """Hapus semua vektor wajah mahasiswa dari galeri"""
+    student = _get_managed_student(db, student_id, lecturer.id)
+
+    start = time.perf_counter()
+    gallery = get_gallery()
+    removed = gallery.remove(student.id)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if student.face_id is not None:
+        student.face_id = None
+        db.commit()
+
+    return schemas.GalleryRemoveResponse(
+        student_id=student.id,
+        vectors_removed=removed,
+        gallery_size=len(gallery),
+        elapsed_ms=elapsed_ms,
+    )
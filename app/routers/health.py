@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from .. import inference
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live")
+def live():
+    # Proses hidup & event loop jalan; tidak menyentuh model / database
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+def ready():
+    # Ready jika model sudah di-load dan warmup selesai (inline / semua worker)
+    models_state = inference.model_status()
+    is_ready = models_state["ready"]
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"status": "ready" if is_ready else "not_ready", "models": models_state},
+    )
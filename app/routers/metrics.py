@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from .. import metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Format teks Prometheus (exposition format 0.0.4)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import get_async_db
 from .. import models, schemas
+from ..report_cache import report_cache, report_version
 from ..security import get_current_lecturer
+from ..session_registry import session_registry
+from ..write_behind import write_behind
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from io import BytesIO
@@ -10,52 +16,67 @@ from io import BytesIO
 router = APIRouter(prefix="/report", tags=["Report"])
 
 
-@router.get("/{course_id}/{meeting_no}", response_model=schemas.ReportDetail)
-def get_report(
-    course_id: int,
-    meeting_no: int,
-    db: Session = Depends(get_db),
-    lecturer=Depends(get_current_lecturer),
-):
-    # Pastikan course milik dosen yang login
-    course = db.get(models.Course, course_id)
-    if not course or course.lecturer_id != lecturer.id:
-        raise HTTPException(status_code=404, detail="Course not found or unauthorized")
-
-    # Ambil report berdasarkan course dan pertemuan
-    report = (
-        db.query(models.Report)
+def _build_report(db: Session, course_id: int, meeting_no: int):
+    """Report + daftar absen dengan dua query (tanpa N+1 per mahasiswa)"""
+    # Report + sesi terbaru pertemuan ini (attendance disimpan per sesi)
+    row = (
+        db.query(models.Report, models.Session.id, models.Session.finished_at)
+        .outerjoin(
+            models.Session,
+            and_(
+                models.Session.course_id == models.Report.course_id,
+                models.Session.meeting_no == models.Report.meeting_no,
+            ),
+        )
         .filter(
             models.Report.course_id == course_id,
             models.Report.meeting_no == meeting_no,
         )
+        .order_by(models.Session.id.desc())
         .first()
     )
-    if report is None:
-        raise HTTPException(status_code=404, detail="Report not found")
+    if row is None:
+        # Write-behind: report baru dibuat saat flush pertama, mark sesi aktif masih di buffer
+        active = session_registry.find(course_id, meeting_no)
+        if active is None or not write_behind.has_pending(active.session_id):
+            return None
+        row = (None, active.session_id, None)
+    report, session_id, finished_at = row
 
-    # Cari mahasiswa yang absen
-    absents = []
-    q = (
-        db.query(models.Student)
+    pending = write_behind.pending(session_id)
+    if pending:
+        return _build_report_pending(db, course_id, meeting_no, report, session_id, finished_at, pending)
+
+    # Mahasiswa yang absen: satu LEFT JOIN enrollment -> student -> attendance
+    rows = (
+        db.query(models.Student.id, models.Student.name, models.Student.nim, models.Attendance.status)
         .join(models.CourseEnrollment, models.CourseEnrollment.student_id == models.Student.id)
-        .filter(models.CourseEnrollment.course_id == course_id)
+        .outerjoin(
+            models.Attendance,
+            and_(
+                models.Attendance.session_id == session_id,
+                models.Attendance.student_id == models.Student.id,
+            ),
+        )
+        .filter(
+            models.CourseEnrollment.course_id == course_id,
+            or_(
+                models.Attendance.status.is_(None),
+                models.Attendance.status != models.AttendanceStatus.hadir,
+            ),
+        )
+        .order_by(models.Student.nim)
+        .all()
     )
-    for st in q.all():
-        att = (
-            db.query(models.Attendance)
-            .filter_by(student_id=st.id, course_id=course_id, meeting_no=meeting_no)
-            .first()
+    absents = [
+        schemas.AbsentItem(
+            student_id=st_id,
+            name=name,
+            nim=nim,
+            status=(att_status.value if att_status else "tanpa_keterangan"),
         )
-        if att is None or att.status != models.AttendanceStatus.hadir:
-            absents.append(
-                schemas.AbsentItem(
-                    student_id=st.id,
-                    name=st.name,
-                    nim=st.nim,
-                    status=(att.status.value if att else "tanpa_keterangan"),
-                )
-            )
+        for st_id, name, nim, att_status in rows
+    ]
 
     # Buat summary
     summary = schemas.ReportSummary(
@@ -66,7 +87,119 @@ def get_report(
         sakit_count=report.sakit_count,
         tanpa_keterangan_count=report.tanpa_keterangan_count,
         started_at=report.started_at,
-        finished_at=report.finished_at,
+        finished_at=finished_at,
+    )
+
+    return schemas.ReportDetail(summary=summary, absents=absents)
+
+
+def _build_report_pending(db: Session, course_id: int, meeting_no: int, report, session_id: int, finished_at, pending):
+    """
+    Report sesi yang punya mark di buffer write-behind: status semua mahasiswa
+    terdaftar dibaca dalam satu query (satu snapshot, walau flush commit di
+    tengah request), ditimpa status di buffer, lalu counter dihitung dari situ.
+    """
+    rows = (
+        db.query(models.Student.id, models.Student.name, models.Student.nim, models.Attendance.status)
+        .join(models.CourseEnrollment, models.CourseEnrollment.student_id == models.Student.id)
+        .outerjoin(
+            models.Attendance,
+            and_(
+                models.Attendance.session_id == session_id,
+                models.Attendance.student_id == models.Student.id,
+            ),
+        )
+        .filter(models.CourseEnrollment.course_id == course_id)
+        .order_by(models.Student.nim)
+        .all()
     )
+    statuses = [
+        (st_id, name, nim, pending[st_id][0] if st_id in pending else att_status)
+        for st_id, name, nim, att_status in rows
+    ]
+    counts = {}
+    for _, _, _, att_status in statuses:
+        counts[att_status] = counts.get(att_status, 0) + 1
+    absents = [
+        schemas.AbsentItem(
+            student_id=st_id,
+            name=name,
+            nim=nim,
+            status=(att_status.value if att_status else "tanpa_keterangan"),
+        )
+        for st_id, name, nim, att_status in statuses
+        if att_status != models.AttendanceStatus.hadir
+    ]
+    if report is not None:
+        total, started_at = report.total_students, report.started_at
+    else:
+        total, started_at = len(rows), db.get(models.Session, session_id).started_at
 
+    summary = schemas.ReportSummary(
+        course_id=course_id,
+        meeting_no=meeting_no,
+        total_students=total,
+        hadir_count=counts.get(models.AttendanceStatus.hadir, 0),
+        sakit_count=counts.get(models.AttendanceStatus.sakit, 0),
+        tanpa_keterangan_count=counts.get(models.AttendanceStatus.tanpa_keterangan, 0),
+        started_at=started_at,
+        finished_at=finished_at,
+    )
     return schemas.ReportDetail(summary=summary, absents=absents)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+def _load_report(db: Session, course_id: int, meeting_no: int, lecturer_id: int):
+    """Return (report, reports.version); versi dibaca dulu, jadi paling lama sama tua dengan isinya"""
+    # Pastikan course milik dosen yang login
+    course = db.get(models.Course, course_id)
+    if not course or course.lecturer_id != lecturer_id:
+        raise HTTPException(status_code=404, detail="Course not found or unauthorized")
+
+    db_version = report_version(db, course_id, meeting_no)
+    detail = _build_report(db, course_id, meeting_no)
+    if detail is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return detail, db_version
+
+
+@router.get("/{course_id}/{meeting_no}", response_model=schemas.ReportDetail)
+async def get_report(
+    course_id: int,
+    meeting_no: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db=Depends(get_async_db),
+    lecturer=Depends(get_current_lecturer),
+):
+    """
+    Report pertemuan + daftar mahasiswa yang belum hadir.
+    Hasil di-cache per (course, pertemuan); entry dipakai selama tidak ada write
+    yang commit sejak dibangun, di worker mana pun (versi lokal + reports.version,
+    lihat report_cache.py). If-None-Match dengan ETag isi report yang sama -> 304.
+    Cache hit hanya butuh satu query versi, tanpa membangun report.
+    """
+    key = (course_id, meeting_no)
+    version = report_cache.version(key)
+
+    cached = report_cache.get(key)
+    if (
+        cached is not None
+        and cached[1] == lecturer.id
+        and await db.run_sync(report_version, course_id, meeting_no) == cached[3]
+    ):
+        detail, etag = cached[2], cached[4]
+    else:
+        detail, db_version = await db.run_sync(_load_report, course_id, meeting_no, lecturer.id)
+        etag = report_cache.put(key, version, lecturer.id, detail, db_version)
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return detail
@@ -1,6 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from .. import models, schemas, database
+from ..candidates import candidate_cache
+from ..report_cache import mark_dirty
+from ..security import get_current_lecturer
+from ..session_registry import session_registry
+from ..write_behind import write_behind
+from .attendance import _ensure_course_owned, mark_remaining_absent as mark_remaining_absent_sql
 from datetime import datetime
 
 router = APIRouter(
@@ -8,17 +14,70 @@ router = APIRouter(
     tags=["sessions"]
 )
 
-@router.post("/", response_model=schemas.SessionResponse)
-def create_session(session: schemas.SessionCreate, db: Session = Depends(database.get_db)):
-    new_session = models.Session(**session.dict())
-    db.add(new_session)
-    db.commit()
-    db.refresh(new_session)
+def _create_session(db: Session, session: schemas.SessionCreate, lecturer_id: int):
+    # Hanya dosen pemilik course yang boleh membuka sesi
+    _ensure_course_owned(db, session.course_id, lecturer_id)
+    # Satu sesi per pertemuan: report (course, pertemuan) dihitung dari sesi itu.
+    # Sesi yang sudah ada (mis. dibuat otomatis oleh mark pertama) dipakai lagi
+    existing = (
+        db.query(models.Session)
+        .filter(models.Session.course_id == session.course_id, models.Session.meeting_no == session.meeting_no)
+        .order_by(models.Session.id.desc())
+        .first()
+    )
+    if existing is not None:
+        if existing.finished_at is not None:
+            raise HTTPException(status_code=409, detail="Session already finished")
+        new_session = existing
+    else:
+        new_session = models.Session(**session.dict())
+        db.add(new_session)
+        db.commit()
+        db.refresh(new_session)
+    # Pemilik course, mahasiswa terdaftar (= kandidat recognition) dan status
+    # attendance sesi di-load sekali ke memori di awal sesi
+    if session_registry.load(db, new_session.id) is None:
+        candidate_cache.load(db, new_session.course_id)
     return new_session
 
-@router.post("/{session_id}/finish")
-def finish_session(session_id: int, db: Session = Depends(database.get_db)):
+
+def _finish_session(db: Session, session_id: int, mark_remaining_absent: bool, lecturer_id: int):
     db_session = db.query(models.Session).filter(models.Session.id == session_id).first()
+    if db_session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    # Hanya dosen pemilik course yang boleh menutup sesi (dan menandai sisa mahasiswa absen)
+    _ensure_course_owned(db, db_session.course_id, lecturer_id)
+    # Sesi ditutup: mark yang masih di buffer write-behind ditulis dulu
+    if write_behind.enabled and write_behind.has_pending(session_id):
+        write_behind.flush()
+    remaining = 0
+    if mark_remaining_absent:
+        remaining = mark_remaining_absent_sql(
+            db, db_session.id, db_session.course_id, db_session.meeting_no
+        )
     db_session.finished_at = datetime.utcnow()
+    # finished_at ikut tampil di report pertemuan ini
+    mark_dirty(db, db_session.course_id, db_session.meeting_no)
     db.commit()
-    return {"message": "Session finished"}
+    session_registry.evict(session_id)
+    return {"message": "Session finished", "marked_remaining_absent": remaining}
+
+
+@router.post("/", response_model=schemas.SessionResponse)
+async def create_session(
+    session: schemas.SessionCreate,
+    db=Depends(database.get_async_db),
+    lecturer=Depends(get_current_lecturer),
+):
+    return await db.run_sync(_create_session, session, lecturer.id)
+
+
+@router.post("/{session_id}/finish")
+async def finish_session(
+    session_id: int,
+    mark_remaining_absent: bool = False,
+    db=Depends(database.get_async_db),
+    lecturer=Depends(get_current_lecturer),
+):
+    """mark_remaining_absent=true: mahasiswa yang belum absen ditandai 'tanpa_keterangan' (di SQL)"""
+    return await db.run_sync(_finish_session, session_id, mark_remaining_absent, lecturer.id)
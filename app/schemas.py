@@ -39,6 +39,32 @@ class AttendanceMarkResponse(BaseModel):
     status: str
     student_id: Optional[int] = None
     confidence: Optional[float] = None
+    model_version: Optional[str] = None
+
+class FaceMarkResult(BaseModel):
+    box: List[int]
+    status: str
+    student_id: Optional[int] = None
+    confidence: Optional[float] = None
+
+class AttendanceBatchMarkResponse(BaseModel):
+    faces_detected: int
+    marked: List[int]
+    faces: List[FaceMarkResult]
+    model_version: Optional[str] = None
+
+class GalleryEnrollResponse(BaseModel):
+    student_id: int
+    face_id: Optional[str] = None
+    vectors_added: int
+    gallery_size: int
+    elapsed_ms: float
+
+class GalleryRemoveResponse(BaseModel):
+    student_id: int
+    vectors_removed: int
+    gallery_size: int
+    elapsed_ms: float
 
 class AttendanceStatus(str, Enum):
     hadir = "hadir"
@@ -51,6 +77,31 @@ class AttendanceStatusUpdate(BaseModel):
     meeting_no: int
     status: AttendanceStatus
 
+class AttendanceStatusItem(BaseModel):
+    student_id: int
+    status: AttendanceStatus
+
+class AttendanceBulkStatusUpdate(BaseModel):
+    course_id: int
+    meeting_no: int
+    items: List[AttendanceStatusItem] = []
+    # Mahasiswa terdaftar lain yang belum absen -> tanpa_keterangan
+    mark_remaining_absent: bool = False
+
+class AttendanceBulkResult(BaseModel):
+    student_id: int
+    result: Literal["updated", "unchanged", "not_enrolled"]
+    status: str
+    student_name: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
+class AttendanceBulkMarkResponse(BaseModel):
+    updated: int
+    unchanged: int
+    not_enrolled: int
+    marked_remaining_absent: int = 0
+    results: List[AttendanceBulkResult]
+
 class SessionStart(BaseModel):
     course_id: int
     meeting_no: int
@@ -79,16 +130,44 @@ class AttendanceRecord(BaseModel):
     class Config:
         orm_mode = True
 
+class AbsentItem(BaseModel):
+    student_id: int
+    name: str
+    nim: str
+    status: str
+
 class ReportDetail(BaseModel):
+    summary: ReportSummary
+    absents: List[AbsentItem]
+
+class ModelVersionInfo(BaseModel):
+    version: str
+    source: str
+    sha256: str
+    classes: List[str]
+    published_at: datetime
+
+class ModelRegistryStatus(BaseModel):
+    active: str
+    history: List[str]
+    versions: List[ModelVersionInfo]
+    loaded: Optional[str] = None  # versi yang terpasang di proses ini (None = belum di-load)
+
+class ModelActivateResponse(BaseModel):
+    version: str
+    previous: str
+    load_seconds: float
+    classes: int
+    scorer: str  # backend scoring SVM (app/svm_scorer.py)
+    smoke_ms: float
+
+class ExportJobResponse(BaseModel):
+    job_id: str
     course_id: int
-    meeting_no: int
-    total_students: int
-    records: List[AttendanceRecord]
-    started_at: Optional[datetime]
-    finished_at: Optional[datetime]
-
-    class Config:
-        orm_mode = True
+    format: str
+    status: str
+    error: Optional[str] = None
+    download_url: Optional[str] = None
 
 # ----------------------
 # Session Schemas
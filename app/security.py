@@ -1,12 +1,18 @@
+import asyncio
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt, JWTError
 from fastapi import HTTPException, Depends, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
+from sqlalchemy import event
 from sqlalchemy.orm import Session
-from .database import get_db
+from .database import async_session
 from . import models
 
 # JWT Config
@@ -18,23 +24,130 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 8
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")  # tanpa leading slash
 
+# bcrypt dijalankan di executor sendiri (bukan threadpool FastAPI yang dipakai recognition)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+# Job bcrypt yang boleh menunggu di executor (di luar yang sedang jalan); penuh -> 503 + Retry-After
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+# Cache token -> principal lecturer (detik / jumlah token)
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+
+# Lecturer.id yang boleh memakai /admin (dipisah koma); kosong = endpoint admin tertutup.
+# /auth/register terbuka, jadi login saja tidak cukup untuk mengganti model produksi
+ADMIN_LECTURER_IDS = frozenset(int(i) for i in os.getenv("ADMIN_LECTURER_IDS", "").split(",") if i.strip())
+
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 def hash_password(plain: str) -> str:
     return pwd_context.hash(plain)
 
+async def _run_password_job(fn, *args):
+    """bcrypt di executor khusus; antrian dibatasi supaya lonjakan login tidak menumpuk tanpa batas"""
+    if not _password_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent password checks",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+        )
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, fn, *args)
+    finally:
+        _password_slots.release()
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _run_password_job(verify_password, plain, hashed)
+
+async def hash_password_async(plain: str) -> str:
+    return await _run_password_job(hash_password, plain)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-# Dependency to get current lecturer from JWT
-def get_current_lecturer(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> models.Lecturer:
+class LecturerPrincipal:
+    """Data lecturer yang dibutuhkan endpoint terproteksi; aman di-cache lintas request"""
+
+    __slots__ = ("id", "name", "email")
+
+    def __init__(self, id: int, name: str, email: str):
+        self.id = id
+        self.name = name
+        self.email = email
+
+
+class PrincipalCache:
+    """
+    LRU + TTL token JWT -> LecturerPrincipal. Entri tidak pernah hidup melewati
+    exp token-nya, dan bisa di-invalidate per lecturer saat data lecturer berubah.
+    """
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL, max_entries: int = AUTH_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # token -> (principal, expires_at)
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[0]
+
+    def put(self, token: str, principal: LecturerPrincipal, token_exp: float):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (principal, min(time.time() + self.ttl, token_exp))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_lecturer(self, lecturer_id: int):
+        with self._lock:
+            for token in [t for t, (p, _) in self._entries.items() if p.id == lecturer_id]:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def invalidate_lecturer(lecturer_id: int):
+    """Panggil setelah data lecturer berubah / dihapus supaya token lama dicek ulang ke DB"""
+    principal_cache.invalidate_lecturer(lecturer_id)
+
+
+@event.listens_for(models.Lecturer, "after_update")
+@event.listens_for(models.Lecturer, "after_delete")
+def _invalidate_changed_lecturer(mapper, connection, target):
+    invalidate_lecturer(target.id)
+
+
+def lecturer_from_token(db: Session, token: str) -> LecturerPrincipal:
+    """
+    Decode JWT lalu ambil lecturer; dipakai juga oleh endpoint WebSocket (token via query).
+    Token yang sudah pernah divalidasi diambil dari cache tanpa query DB.
+    """
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -46,10 +159,31 @@ def get_current_lecturer(
         if lecturer_id is None:
             raise credentials_exception
         lecturer_id = int(lecturer_id)  # pastikan int
-    except (JWTError, ValueError):
+        token_exp = float(payload["exp"])
+    except (JWTError, ValueError, KeyError):
         raise credentials_exception
 
     lecturer = db.get(models.Lecturer, lecturer_id)
     if lecturer is None:
         raise credentials_exception
+    principal = LecturerPrincipal(lecturer.id, lecturer.name, lecturer.email)
+    principal_cache.put(token, principal, token_exp)
+    return principal
+
+
+# Dependency to get current lecturer from JWT
+async def get_current_lecturer(token: str = Depends(oauth2_scheme)) -> LecturerPrincipal:
+    # Token yang sudah di-cache tidak perlu thread / session DB sama sekali;
+    # session hanya dibuka saat cache miss
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    async with async_session() as db:
+        return await db.run_sync(lecturer_from_token, token)
+
+
+async def get_current_admin(lecturer: LecturerPrincipal = Depends(get_current_lecturer)) -> LecturerPrincipal:
+    """Lecturer yang terdaftar di ADMIN_LECTURER_IDS, selain itu 403"""
+    if lecturer.id not in ADMIN_LECTURER_IDS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
     return lecturer
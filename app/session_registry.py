@@ -0,0 +1,231 @@
+"""
+Registry sesi aktif (belum finish) di memori proses.
+
+Selama kuliah berlangsung pemilik course, mahasiswa terdaftar dan status
+attendance sesi hanya berubah lewat endpoint attendance sendiri, jadi
+semuanya disimpan per sesi saat POST /sessions/ (atau saat sesi pertama
+kali dipakai setelah restart) dan handler attendance memvalidasi di memori:
+mark cukup satu upsert (+ update counter report) tanpa SELECT.
+
+Status di registry hanya diperbarui setelah commit. Upsert dari registry
+menyertakan status lama yang diharapkan (lihat routers/attendance._apply_statuses);
+jika baris di DB ternyata berbeda (ditulis proses lain / SQL langsung),
+registry sesi itu dibuang dan mahasiswa tersebut diproses lewat jalur DB biasa.
+Sesi dibuang saat finish, saat enrollment course berubah, dan setelah
+SESSION_REGISTRY_IDLE detik tanpa aktivitas.
+
+Finish dan perubahan enrollment di worker lain tidak terlihat oleh proses ini,
+jadi entry hanya dipakai SESSION_REGISTRY_TTL detik sejak di-load; setelah itu
+request berikutnya lewat jalur DB dan sesi di-load ulang (3 query), atau tidak
+di-load lagi jika sudah finish.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from . import metrics, models
+from .candidates import candidate_cache
+from .database import SessionLocal
+from .write_behind import write_behind
+
+SESSION_REGISTRY_ENABLED = os.getenv("SESSION_REGISTRY_ENABLED", "1") == "1"
+# Sesi tanpa request selama ini (detik) dibuang dari memori
+SESSION_REGISTRY_IDLE = float(os.getenv("SESSION_REGISTRY_IDLE", "10800"))
+SESSION_REGISTRY_SIZE = int(os.getenv("SESSION_REGISTRY_SIZE", "512"))
+# Umur maksimum entry (detik) sebelum divalidasi ulang ke DB (finish / enrollment dari worker lain)
+SESSION_REGISTRY_TTL = float(os.getenv("SESSION_REGISTRY_TTL", "5"))
+
+# Kunci di Session.info: perubahan registry yang menunggu commit
+_PENDING_KEY = "session_registry_pending"
+_EVICT_KEY = "session_registry_evict"
+
+LOOKUPS = metrics.register(metrics.Counter(
+    "session_registry_lookups_total", "Lookup registry sesi aktif (hit / miss / expired / load)", labels=("result",)
+))
+
+
+class ActiveSession:
+    __slots__ = (
+        "session_id", "course_id", "meeting_no", "lecturer_id", "names", "candidates", "statuses", "loaded_at", "last_used",
+    )
+
+    def __init__(self, session_id: int, course_id: int, meeting_no: int, lecturer_id: int, names: dict, statuses: dict):
+        self.session_id = session_id
+        self.course_id = course_id
+        self.meeting_no = meeting_no
+        self.lecturer_id = lecturer_id
+        self.names = names  # student_id terdaftar -> nama
+        self.candidates = frozenset(names)
+        self.statuses = statuses  # student_id -> (AttendanceStatus, timestamp)
+        self.loaded_at = self.last_used = time.monotonic()
+
+
+class SessionRegistry:
+    def __init__(
+        self,
+        idle: float = SESSION_REGISTRY_IDLE,
+        max_sessions: int = SESSION_REGISTRY_SIZE,
+        ttl: float = SESSION_REGISTRY_TTL,
+    ):
+        self.idle = idle
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = {}  # session_id -> ActiveSession
+        self._by_meeting = {}  # (course_id, meeting_no) -> session_id
+        self._next_sweep = 0.0
+
+    # ---------------------------
+    # Lookup (tanpa I/O)
+    # ---------------------------
+    def get(self, session_id: int):
+        if not SESSION_REGISTRY_ENABLED:
+            return None
+        self._sweep()
+        active = self._sessions.get(session_id)
+        if active is None:
+            LOOKUPS.inc(1, "miss")
+            return None
+        now = time.monotonic()
+        if now - active.loaded_at > self.ttl:
+            # Bisa sudah finish / enrollment berubah di worker lain: caller load ulang dari DB
+            with self._lock:
+                if self._sessions.get(session_id) is active:
+                    self._drop(session_id)
+            LOOKUPS.inc(1, "expired")
+            return None
+        active.last_used = now
+        LOOKUPS.inc(1, "hit")
+        return active
+
+    def find(self, course_id: int, meeting_no: int):
+        """Sesi aktif untuk (course, pertemuan), None jika belum di-load"""
+        session_id = self._by_meeting.get((course_id, meeting_no))
+        if session_id is None:
+            LOOKUPS.inc(1, "miss")
+            return None
+        return self.get(session_id)
+
+    # ---------------------------
+    # Load dari DB
+    # ---------------------------
+    def load(self, db, session_id: int):
+        """Load sesi yang belum finish (3 query); None jika tidak ada / sudah finish"""
+        if not SESSION_REGISTRY_ENABLED:
+            return None
+        row = (
+            db.query(models.Session.course_id, models.Session.meeting_no, models.Session.finished_at, models.Course.lecturer_id)
+            .join(models.Course, models.Course.id == models.Session.course_id)
+            .filter(models.Session.id == session_id)
+            .first()
+        )
+        if row is None or row.finished_at is not None:
+            return None
+        names = dict(
+            db.query(models.Student.id, models.Student.name)
+            .join(models.CourseEnrollment, models.CourseEnrollment.student_id == models.Student.id)
+            .filter(models.CourseEnrollment.course_id == row.course_id)
+            .all()
+        )
+        statuses = {
+            r.student_id: (r.status, r.timestamp)
+            for r in db.query(models.Attendance.student_id, models.Attendance.status, models.Attendance.timestamp)
+            .filter(models.Attendance.session_id == session_id)
+        }
+        # Mark write-behind yang belum di-flush sudah dijawab ke client: ikut dihitung
+        statuses.update(write_behind.pending(session_id))
+        active = ActiveSession(session_id, row.course_id, row.meeting_no, row.lecturer_id, names, statuses)
+        LOOKUPS.inc(1, "load")
+        with self._lock:
+            self._sessions[session_id] = active
+            # Sesi terbaru untuk (course, pertemuan) yang dipakai, sama seperti _resolve_session
+            current = self._by_meeting.get((active.course_id, active.meeting_no))
+            if current is None or current <= session_id:
+                self._by_meeting[(active.course_id, active.meeting_no)] = session_id
+            while len(self._sessions) > self.max_sessions:
+                oldest = min(self._sessions.values(), key=lambda s: s.last_used)
+                self._drop(oldest.session_id)
+        return active
+
+    def rebuild(self, db) -> int:
+        """Startup: load ulang sesi yang belum finish dan dimulai dalam jendela idle"""
+        if not SESSION_REGISTRY_ENABLED:
+            return 0
+        since = datetime.utcnow() - timedelta(seconds=self.idle)
+        rows = (
+            db.query(models.Session.id)
+            .filter(models.Session.finished_at.is_(None), models.Session.started_at >= since)
+            .order_by(models.Session.started_at.desc())
+            .limit(self.max_sessions)
+            .all()
+        )
+        return sum(1 for row in reversed(rows) if self.load(db, row.id) is not None)
+
+    # ---------------------------
+    # Update / evict
+    # ---------------------------
+    def record(self, db, session_id: int, updates: dict):
+        """Status {student_id: (status, timestamp)} diterapkan ke registry setelah commit"""
+        db.info.setdefault(_PENDING_KEY, []).append((session_id, updates))
+
+    def evict_after_commit(self, db, session_id: int):
+        """Sesi berubah di luar jalur registry (mis. INSERT ... SELECT): load ulang setelah commit"""
+        db.info.setdefault(_EVICT_KEY, set()).add(session_id)
+
+    def _apply(self, session_id: int, updates: dict):
+        active = self._sessions.get(session_id)
+        if active is not None:
+            active.statuses.update(updates)
+
+    def evict(self, session_id: int):
+        with self._lock:
+            self._drop(session_id)
+
+    def evict_course(self, course_id: int):
+        with self._lock:
+            for session_id in [s.session_id for s in self._sessions.values() if s.course_id == course_id]:
+                self._drop(session_id)
+
+    def _drop(self, session_id: int):
+        active = self._sessions.pop(session_id, None)
+        if active is not None and self._by_meeting.get((active.course_id, active.meeting_no)) == session_id:
+            del self._by_meeting[(active.course_id, active.meeting_no)]
+
+    def _sweep(self):
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + min(60.0, self.idle)
+        with self._lock:
+            for session_id in [s.session_id for s in self._sessions.values() if now - s.last_used > self.idle]:
+                self._drop(session_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+session_registry = SessionRegistry()
+
+metrics.register(metrics.Gauge(
+    "session_registry_sessions", "Sesi aktif di registry memori", lambda: {(): len(session_registry)}
+))
+
+# Enrollment course berubah -> sesi course itu di-load ulang saat dipakai lagi
+candidate_cache.listeners.append(session_registry.evict_course)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_after_commit(db):
+    for session_id, updates in db.info.pop(_PENDING_KEY, ()):
+        session_registry._apply(session_id, updates)
+    for session_id in db.info.pop(_EVICT_KEY, ()):
+        session_registry.evict(session_id)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_after_rollback(db):
+    db.info.pop(_PENDING_KEY, None)
+    db.info.pop(_EVICT_KEY, None)
@@ -0,0 +1,174 @@
+"""
+Scoring SVC (probability=True) tanpa libsvm: label + probabilitas sekali jalan.
+
+sklearn SVC.predict lalu predict_proba = dua kali evaluasi kernel ke semua
+support vector per wajah, plus Platt + pairwise coupling per baris di libsvm.
+Backend (SVM_SCORER):
+- "compact" (default): support vector, koefisien dual per pasangan kelas
+  (one-vs-one), intercept dan parameter Platt diekspor ke array float32
+  contiguous saat model di-load. Satu batch fitur -> nilai keputusan semua
+  pasangan dalam satu perkalian matriks -> vote (sama dengan SVC.predict) dan
+  probabilitas (sigmoid Platt + pairwise coupling). Kernel linear diringkas
+  jadi satu matriks bobot d x pasangan bila lebih kecil dari support vector.
+  Coupling (metode 2 Wu-Lin-Weng, sama dengan libsvm) diselesaikan langsung
+  sebagai sistem linear untuk seluruh batch; libsvm mengiterasi sampai
+  toleransi 0.005/k, jadi probabilitas berbeda paling banyak ~1e-3, label sama.
+- "sklearn": svm.predict + svm.predict_proba (referensi, dipakai untuk cek paritas).
+
+Model yang tidak didukung (kernel callable / precomputed, dilatih dengan
+matriks sparse, bukan SVC) otomatis memakai backend sklearn.
+Cek paritas + speedup: python -m benchmarks.bench_svm_scorer
+"""
+import os
+
+import numpy as np
+
+SVM_SCORER = os.getenv("SVM_SCORER", "compact")
+
+# Batas probabilitas pasangan (min_prob di libsvm svm_predict_probability)
+MIN_PROB = 1e-7
+KERNELS = ("linear", "rbf", "poly", "sigmoid")
+
+
+class SklearnScorer:
+    """Backend referensi: libsvm lewat sklearn"""
+
+    name = "sklearn"
+
+    def __init__(self, svm):
+        self.svm = svm
+        self.classes_ = svm.classes_
+
+    def predict_proba(self, features):
+        return self.svm.predict_proba(features)
+
+    def score(self, features):
+        """(label hasil vote one-vs-one, probabilitas n x kelas)"""
+        return self.svm.predict(features), self.svm.predict_proba(features)
+
+
+class CompactSVC:
+    """SVC probability=True yang diekspor ke array float32 (lihat docstring modul)"""
+
+    name = "compact"
+
+    def __init__(self, svm):
+        classes = len(svm.classes_)
+        pairs = [(i, j) for i in range(classes) for j in range(i + 1, classes)]
+        support_vectors = np.asarray(svm.support_vectors_, dtype=np.float64)
+        dual_coef = np.asarray(svm._dual_coef_, dtype=np.float64)
+        starts = np.concatenate([[0], np.cumsum(svm.n_support_)])
+
+        # Koefisien per pasangan (i, j): SV kelas i memakai baris j-1, SV kelas j baris i
+        # (layout dual_coef_ libsvm), SV kelas lain 0
+        coef = np.zeros((len(support_vectors), len(pairs)))
+        for p, (i, j) in enumerate(pairs):
+            coef[starts[i]:starts[i + 1], p] = dual_coef[j - 1, starts[i]:starts[i + 1]]
+            coef[starts[j]:starts[j + 1], p] = dual_coef[i, starts[j]:starts[j + 1]]
+
+        self.classes_ = svm.classes_
+        self.kernel = svm.kernel
+        self.gamma = float(svm._gamma)
+        self.coef0 = float(svm.coef0)
+        self.degree = int(svm.degree)
+        self.pair_i = np.array([i for i, _ in pairs], dtype=np.intp)
+        self.pair_j = np.array([j for _, j in pairs], dtype=np.intp)
+        self.intercept = np.ascontiguousarray(svm._intercept_, dtype=np.float32)
+        self.prob_a = np.ascontiguousarray(svm.probA_, dtype=np.float32)
+        self.prob_b = np.ascontiguousarray(svm.probB_, dtype=np.float32)
+        if self.kernel == "linear" and len(pairs) <= len(support_vectors):
+            # sum_sv coef * <x, sv> = <x, sum_sv coef * sv>
+            self.weights = np.ascontiguousarray(support_vectors.T @ coef, dtype=np.float32)
+            self.support_vectors = None
+        else:
+            self.weights = np.ascontiguousarray(coef, dtype=np.float32)
+            self.support_vectors = np.ascontiguousarray(support_vectors, dtype=np.float32)
+            self.sv_sq_norms = np.einsum("ij,ij->i", self.support_vectors, self.support_vectors)
+
+    @classmethod
+    def supports(cls, svm) -> bool:
+        return (
+            type(svm).__name__ == "SVC"
+            and getattr(svm, "kernel", None) in KERNELS
+            and not getattr(svm, "_sparse", True)
+            and len(getattr(svm, "probA_", ())) > 0
+            and len(svm.classes_) >= 2
+        )
+
+    # ---------------------------
+    # Nilai keputusan
+    # ---------------------------
+    def decision_pairs(self, features):
+        """Nilai keputusan one-vs-one (n x pasangan, urutan libsvm) dalam float32"""
+        x = np.ascontiguousarray(features, dtype=np.float32)
+        if self.support_vectors is None:
+            return x @ self.weights + self.intercept
+        dots = x @ self.support_vectors.T
+        if self.kernel == "linear":
+            k = dots
+        elif self.kernel == "rbf":
+            sq = np.einsum("ij,ij->i", x, x)[:, None] + self.sv_sq_norms[None, :] - 2 * dots
+            k = np.exp(-self.gamma * np.maximum(sq, 0))
+        elif self.kernel == "poly":
+            k = (self.gamma * dots + self.coef0) ** self.degree
+        else:
+            k = np.tanh(self.gamma * dots + self.coef0)
+        return k @ self.weights + self.intercept
+
+    def _votes(self, decision):
+        """Indeks kelas hasil vote one-vs-one; seri -> kelas dengan indeks terkecil (libsvm)"""
+        classes = len(self.classes_)
+        winner = np.where(decision > 0, self.pair_i, self.pair_j)
+        winner += np.arange(len(decision))[:, None] * classes
+        votes = np.bincount(winner.ravel(), minlength=len(decision) * classes)
+        return votes.reshape(len(decision), classes).argmax(axis=1)
+
+    # ---------------------------
+    # Probabilitas
+    # ---------------------------
+    def _pairwise(self, decision):
+        """r[n, i, j] = P(kelas i | i atau j) dari sigmoid Platt tiap pasangan"""
+        f = decision.astype(np.float64) * self.prob_a + self.prob_b
+        # 1 / (1 + exp(f)) tanpa overflow (sigmoid_predict libsvm)
+        e = np.exp(-np.abs(f))
+        prob = np.where(f >= 0, e, 1.0) / (1 + e)
+        prob = np.clip(prob, MIN_PROB, 1 - MIN_PROB)
+        r = np.zeros((len(decision), len(self.classes_), len(self.classes_)))
+        r[:, self.pair_i, self.pair_j] = prob
+        r[:, self.pair_j, self.pair_i] = 1 - prob
+        return r
+
+    def _couple(self, r):
+        """
+        Pairwise coupling metode 2 Wu-Lin-Weng (multiclass_probability libsvm):
+        p = argmin p'Qp dengan sum(p) = 1. Dengan semua r > 0, Q definit positif
+        dan p = Q^-1 e / (e' Q^-1 e) (juga p > 0); satu solve batch untuk semua baris.
+        """
+        k = r.shape[1]
+        q = -r.transpose(0, 2, 1) * r
+        diag = np.arange(k)
+        q[:, diag, diag] = (r ** 2).sum(axis=1) - r[:, diag, diag] ** 2
+        y = np.linalg.solve(q, np.ones((len(r), k, 1)))[..., 0]
+        return y / y.sum(axis=1, keepdims=True)
+
+    def _probabilities(self, decision):
+        r = self._pairwise(decision)
+        if len(self.classes_) == 2:
+            # Solusi coupling 2 kelas = probabilitas pasangan itu sendiri
+            return np.stack([r[:, 0, 1], r[:, 1, 0]], axis=1)
+        return self._couple(r)
+
+    def predict_proba(self, features):
+        return self._probabilities(self.decision_pairs(features))
+
+    def score(self, features):
+        """(label hasil vote one-vs-one, probabilitas n x kelas) dari satu evaluasi kernel"""
+        decision = self.decision_pairs(features)
+        return self.classes_[self._votes(decision)], self._probabilities(decision)
+
+
+def build_scorer(svm, backend: str = None):
+    """Scorer untuk model SVM; backend default SVM_SCORER, fallback sklearn bila tidak didukung"""
+    if (backend or SVM_SCORER) == "compact" and CompactSVC.supports(svm):
+        return CompactSVC(svm)
+    return SklearnScorer(svm)
@@ -0,0 +1,105 @@
+import itertools
+
+import numpy as np
+
+
+def iou_matrix(boxes_a, boxes_b) -> np.ndarray:
+    """IoU antar dua list bounding box (x1, y1, x2, y2), hasil matriks len(a) x len(b)"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+class Track:
+    __slots__ = ("track_id", "box", "student_id", "confidence", "misses", "classified")
+
+    def __init__(self, track_id: int, box):
+        self.track_id = track_id
+        self.box = tuple(box)
+        self.student_id = None
+        self.confidence = None
+        self.misses = 0
+        self.classified = 0  # berapa kali HOG+SVM dijalankan untuk track ini
+
+
+class FaceTracker:
+    """
+    Tracker IoU sederhana: box di frame baru dicocokkan (greedy, IoU terbesar)
+    ke track yang ada. Identitas (student_id, confidence) menempel di track,
+    jadi klasifikasi cukup dijalankan untuk track baru / yang confidence-nya
+    masih di bawah threshold.
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_misses: int = 5,
+        min_confidence: float = 0.6,
+        max_attempts: int = 10,
+    ):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_confidence = min_confidence
+        self.max_attempts = max_attempts
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def update(self, boxes):
+        """Update track dengan box hasil deteksi frame ini, return track yang terlihat"""
+        boxes = [tuple(box) for box in boxes]
+        matched_tracks, matched_boxes = set(), set()
+        visible = []
+
+        if self.tracks and boxes:
+            ious = iou_matrix([t.box for t in self.tracks], boxes)
+            # Greedy: pasangan IoU terbesar dulu
+            for flat in np.argsort(ious, axis=None)[::-1]:
+                ti, bi = divmod(int(flat), len(boxes))
+                if ious[ti, bi] < self.iou_threshold:
+                    break
+                if ti in matched_tracks or bi in matched_boxes:
+                    continue
+                matched_tracks.add(ti)
+                matched_boxes.add(bi)
+                track = self.tracks[ti]
+                track.box = boxes[bi]
+                track.misses = 0
+                visible.append(track)
+
+        survivors = []
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.misses += 1
+            if track.misses <= self.max_misses:
+                survivors.append(track)
+
+        for bi, box in enumerate(boxes):
+            if bi not in matched_boxes:
+                track = Track(next(self._ids), box)
+                survivors.append(track)
+                visible.append(track)
+
+        self.tracks = survivors
+        return visible
+
+    def needs_classification(self, track: Track) -> bool:
+        if track.classified >= self.max_attempts:
+            return False
+        return track.student_id is None or track.confidence < self.min_confidence
+
+    def record(self, track: Track, student_id, confidence):
+        """Simpan hasil klasifikasi; hasil yang lebih yakin menggantikan yang lama"""
+        track.classified += 1
+        if student_id is None:
+            return
+        if track.confidence is None or track.student_id is None or confidence >= track.confidence:
+            track.student_id = student_id
+            track.confidence = confidence
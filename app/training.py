@@ -0,0 +1,319 @@
+"""
+Training ulang model SVM dari app/dataset/<Nama>/*.jpg
+
+    python -m app.training --label-map labels.json
+
+Deteksi (YOLO) + HOG dijalankan paralel di process pool. Hasil per gambar
+(vektor HOG wajah terbesar) di-cache di disk berdasarkan hash isi file,
+jadi training berikutnya hanya memproses gambar baru / yang berubah.
+Cache dipisah per konfigurasi pipeline (detektor + file bobotnya, backend /
+parameter HOG, FACE_SIZE): ganti salah satunya = direktori cache baru.
+
+Model hasil training di-publish ke registry (app/model_registry.py) sebagai
+versi baru tanpa diaktifkan; aktivasi tetap langkah eksplisit:
+    python -m app.model_registry activate <versi>
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+
+from . import detectors, face_recognition, features
+from .features import FEATURE_DIM
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.path.join(BASE_DIR, "dataset")
+CACHE_DIR = os.path.join(BASE_DIR, "model_files", "train_cache")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+
+
+# ---------------------------
+# Cache fitur (shard .npy memory-mapped)
+# ---------------------------
+def _weights_digest(path: str) -> str:
+    """Versi file bobot detektor = hash isi; None jika file tidak ada"""
+    if not path or not os.path.exists(path):
+        return None
+    return _file_digest(path)
+
+
+def pipeline_config() -> dict:
+    """Semua yang menentukan crop + fitur per gambar selain isi file gambar itu sendiri"""
+    weights = {
+        "yolo": detectors.YOLO_MODEL_PATH,
+        "onnx": detectors.ONNX_MODEL_PATH,
+        "yunet": detectors.YUNET_MODEL_PATH,
+        "haar": detectors.HAAR_CASCADE_PATH,
+    }
+    stages = detectors.backend_names()
+    return {
+        "detector": [[name, _weights_digest(weights.get(name))] for name in stages],
+        "yolo_classes": detectors.YOLO_CLASSES,
+        "yolo_conf": detectors.YOLO_CONF,
+        "hog_backend": features.HOG_BACKEND,
+        "hog": [list(features.HOG_SIZE), features.ORIENTATIONS, features.PIXELS_PER_CELL, features.CELLS_PER_BLOCK],
+        "face_size": list(face_recognition.FACE_SIZE),
+    }
+
+
+def config_key(config: dict) -> str:
+    return hashlib.blake2b(json.dumps(config, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+
+class FeatureCache:
+    """
+    Cache fitur HOG per gambar, key = hash isi file, di subdirektori
+    per konfigurasi pipeline (config_key; config.json mencatat isinya).
+    Tiap run menulis shard baru (features .npy) berisi gambar yang baru
+    diproses; shard lama dibuka read-only lewat memory map.
+    index.json: hash -> [shard, baris] atau null jika tidak ada wajah.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, config: dict = None):
+        config = pipeline_config() if config is None else config
+        self.config = config
+        directory = os.path.join(directory, config_key(config))
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        config_path = os.path.join(directory, "config.json")
+        if not os.path.exists(config_path):
+            with open(config_path, "w") as f:
+                json.dump(config, f, indent=2)
+        self.index_path = os.path.join(directory, "index.json")
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        self._shards = {}
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self.index
+
+    def _shard_path(self, shard: int, kind: str) -> str:
+        return os.path.join(self.directory, f"shard_{shard:05d}.{kind}.npy")
+
+    def _open(self, shard: int):
+        if shard not in self._shards:
+            self._shards[shard] = np.load(self._shard_path(shard, "features"), mmap_mode="r")
+        return self._shards[shard]
+
+    def features(self, digest: str):
+        entry = self.index.get(digest)
+        if entry is None:
+            return None
+        shard, row = entry
+        return self._open(shard)[row]
+
+    def add_shard(self, results):
+        """results: list of (hash, fitur atau None)"""
+        found = [(digest, feat) for digest, feat in results if feat is not None]
+        for digest, feat in results:
+            if feat is None:
+                self.index[digest] = None
+
+        if found:
+            used = [entry[0] for entry in self.index.values() if entry is not None]
+            shard = max(used) + 1 if used else 0
+            features = np.lib.format.open_memmap(
+                self._shard_path(shard, "features"), mode="w+", dtype=np.float32,
+                shape=(len(found), FEATURE_DIM),
+            )
+            for row, (digest, feat) in enumerate(found):
+                features[row] = feat
+                self.index[digest] = [shard, row]
+            features.flush()
+            del features
+
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_path)
+
+
+# ---------------------------
+# Worker: deteksi + HOG per gambar
+# ---------------------------
+def _init_worker():
+    try:
+        import torch
+
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    face_recognition.load_models()
+
+
+def _process_image(item):
+    """Return (hash, fitur HOG atau None)"""
+    import cv2
+
+    digest, path = item
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        return digest, None
+    faces = face_recognition.detect_face(image)
+    if not faces:
+        return digest, None
+    crop = face_recognition.crop_face(image, faces[0])
+    if crop is None:
+        return digest, None
+    return digest, face_recognition.extract_hog_features(crop).astype(np.float32)
+
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def scan_dataset(dataset_dir: str = DATASET_DIR):
+    """Return list of (label, path) dari <dataset>/<label>/*.jpg"""
+    items = []
+    for label in sorted(os.listdir(dataset_dir)):
+        folder = os.path.join(dataset_dir, label)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(IMAGE_EXTS):
+                items.append((label, os.path.join(folder, name)))
+    return items
+
+
+def extract_dataset(items, cache: FeatureCache, jobs: int):
+    """Proses gambar yang belum ada di cache, return (X, y) untuk semua gambar berwajah"""
+    digests = [(label, path, _file_digest(path)) for label, path in items]
+    todo = {}
+    for _, path, digest in digests:
+        if digest not in cache and digest not in todo:
+            todo[digest] = path
+
+    if todo:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx, initializer=_init_worker) as pool:
+            results = list(pool.map(_process_image, todo.items(), chunksize=8))
+        cache.add_shard(results)
+
+    X, y = [], []
+    for label, _, digest in digests:
+        feat = cache.features(digest)
+        if feat is not None:
+            X.append(feat)
+            y.append(label)
+    return np.vstack(X) if X else np.zeros((0, FEATURE_DIM), np.float32), np.array(y), len(todo)
+
+
+# ---------------------------
+# Mapping label (nama folder) -> Student.id
+# ---------------------------
+def resolve_label_map(labels, label_map_path: str = None):
+    """Dari file JSON {label: student_id}, atau cocokkan ke Student.name / Student.nim di database"""
+    if label_map_path:
+        with open(label_map_path) as f:
+            mapping = {str(k): int(v) for k, v in json.load(f).items()}
+    else:
+        from sqlalchemy import func, or_
+        from .database import SessionLocal
+        from . import models
+
+        mapping = {}
+        db = SessionLocal()
+        try:
+            for label in labels:
+                student = (
+                    db.query(models.Student)
+                    .filter(
+                        or_(
+                            func.lower(models.Student.name) == label.lower(),
+                            models.Student.nim == label,
+                        )
+                    )
+                    .first()
+                )
+                if student is not None:
+                    mapping[label] = student.id
+        finally:
+            db.close()
+
+    missing = sorted(set(labels) - set(mapping))
+    if missing:
+        raise SystemExit(f"No Student.id mapping for labels: {', '.join(missing)}")
+    return {label: mapping[label] for label in labels}
+
+
+def fit_and_export(X, y, label_map, output: str):
+    """Simpan model + labels.json ke output; tidak boleh menimpa model produksi"""
+    if os.path.abspath(output) == os.path.abspath(face_recognition.SVM_MODEL_PATH):
+        raise SystemExit(
+            f"Refusing to overwrite the production model {output}; "
+            "publish a registry version and activate it explicitly"
+        )
+    from sklearn.svm import SVC
+
+    model = SVC(kernel="linear", probability=True)
+    model.fit(X, y)
+    joblib.dump(model, output)
+    labels_path = face_recognition.labels_path_for(output)
+    with open(labels_path, "w") as f:
+        json.dump({str(label): label_map[str(label)] for label in model.classes_}, f, indent=2)
+    return model, labels_path
+
+
+def fit_and_publish(X, y, label_map, version: str = None):
+    """Fit lalu publish ke registry sebagai versi baru (tidak diaktifkan) -> nama versi"""
+    import tempfile
+
+    from .model_registry import registry
+
+    with tempfile.TemporaryDirectory(prefix="absensi-train-") as tmpdir:
+        output = os.path.join(tmpdir, "svm_face_recognition.pkl")
+        fit_and_export(X, y, label_map, output)
+        return registry.publish(output, version)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train SVM face recognition dari app/dataset")
+    parser.add_argument("--dataset", default=DATASET_DIR)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--output", help="Tulis .pkl ke path ini alih-alih publish ke registry")
+    parser.add_argument("--version", help="Nama versi registry (default: timestamp + sha)")
+    parser.add_argument("--label-map", help="JSON {nama_folder: student_id}; default: cocokkan ke tabel students")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    items = scan_dataset(args.dataset)
+    if not items:
+        raise SystemExit(f"No images found in {args.dataset}")
+
+    label_map = resolve_label_map(sorted({label for label, _ in items}), args.label_map)
+
+    cache = FeatureCache(args.cache_dir)
+    X, y, processed = extract_dataset(items, cache, args.jobs)
+    extract_time = time.perf_counter() - start
+    print(f"images: {len(items)}, newly processed: {processed}, with face: {len(y)} ({extract_time:.1f}s)")
+
+    if len(set(y)) < 2:
+        raise SystemExit("Need faces from at least 2 labels to train")
+
+    if args.output:
+        _, labels_path = fit_and_export(X, y, label_map, args.output)
+        print(f"model: {args.output}")
+        print(f"labels: {labels_path}")
+        print(f"publish: python -m app.model_registry publish {args.output}")
+    else:
+        version = fit_and_publish(X, y, label_map, args.version)
+        print(f"published: {version} (not active)")
+        print(f"activate: python -m app.model_registry activate {version}")
+    print(f"total: {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""
+Write-behind attendance (opt-in, WRITE_BEHIND_ENABLED=1).
+
+Saat awal kuliah puluhan mark datang dalam beberapa detik; tanpa mode ini
+tiap mark adalah transaksi DB sendiri. Dengan write-behind, mark untuk sesi
+aktif (lihat session_registry) dijawab setelah:
+1) ditambahkan ke journal lokal (satu baris JSON, di-fsync),
+2) disimpan di buffer memori, di-coalesce per (session, student): status terakhir menang.
+
+Thread background lalu menulis buffer ke DB setiap WRITE_BEHIND_FLUSH_MS ms
+atau begitu WRITE_BEHIND_MAX_RECORDS record menunggu: satu upsert multi-row +
+hitung ulang counter report per sesi + satu commit untuk semua mark di batch
+(group commit). Setelah commit, journal ditulis ulang berisi sisa buffer saja.
+
+Saat startup journal di-replay dan di-flush sebelum request dilayani, jadi
+mark yang sudah dijawab tidak hilang walau proses crash sebelum flush. Report
+dan registry sesi membaca lewat buffer (pending()), sehingga hasilnya tetap
+konsisten dengan mark yang sudah dijawab.
+
+Journal dikunci (flock pada <journal>.lock) oleh satu proses; worker uvicorn
+lain yang memakai path journal yang sama jalan tanpa write-behind (tulis
+langsung ke DB). Beri path berbeda per worker jika semua worker perlu write-behind.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from . import metrics, models
+from .database import SessionLocal
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "0") == "1"
+WRITE_BEHIND_JOURNAL = os.getenv("WRITE_BEHIND_JOURNAL", os.path.join(BASE_DIR, "journal", "attendance.journal"))
+WRITE_BEHIND_FLUSH_MS = float(os.getenv("WRITE_BEHIND_FLUSH_MS", "500"))
+WRITE_BEHIND_MAX_RECORDS = int(os.getenv("WRITE_BEHIND_MAX_RECORDS", "500"))
+# Jeda sebelum mencoba lagi jika flush ke DB gagal (detik)
+WRITE_BEHIND_RETRY = float(os.getenv("WRITE_BEHIND_RETRY", "2"))
+
+logger = logging.getLogger("absensi.write_behind")
+
+MARKS = metrics.register(metrics.Counter(
+    "write_behind_marks_total", "Mark attendance di buffer write-behind (buffered / coalesced / flushed / replayed)",
+    labels=("result",),
+))
+FLUSHES = metrics.register(metrics.Counter(
+    "write_behind_flushes_total", "Flush buffer write-behind ke DB (ok / error)", labels=("result",)
+))
+FLUSH_SECONDS = metrics.register(metrics.Histogram(
+    "write_behind_flush_seconds", "Durasi satu flush (upsert + report + commit)"
+))
+
+
+class PendingMark:
+    __slots__ = ("session_id", "course_id", "meeting_no", "student_id", "status", "timestamp", "model_version")
+
+    def __init__(self, session_id, course_id, meeting_no, student_id, status, timestamp, model_version=None):
+        self.session_id = session_id
+        self.course_id = course_id
+        self.meeting_no = meeting_no
+        self.student_id = student_id
+        self.status = status
+        self.timestamp = timestamp
+        self.model_version = model_version
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "session_id": self.session_id,
+            "course_id": self.course_id,
+            "meeting_no": self.meeting_no,
+            "student_id": self.student_id,
+            "status": self.status.value,
+            "timestamp": self.timestamp.isoformat(),
+            "model_version": self.model_version,
+        })
+
+    @classmethod
+    def from_json(cls, line: str):
+        data = json.loads(line)
+        return cls(
+            data["session_id"],
+            data["course_id"],
+            data["meeting_no"],
+            data["student_id"],
+            models.AttendanceStatus(data["status"]),
+            datetime.fromisoformat(data["timestamp"]),
+            data.get("model_version"),
+        )
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        journal_path: str = WRITE_BEHIND_JOURNAL,
+        flush_ms: float = WRITE_BEHIND_FLUSH_MS,
+        max_records: int = WRITE_BEHIND_MAX_RECORDS,
+    ):
+        self.journal_path = journal_path
+        self.flush_interval = flush_ms / 1000.0
+        self.max_records = max_records
+        self.enabled = False
+        self._writer = None
+        self._journal = None
+        self._lock_file = None
+        self._lock = threading.Lock()  # buffer + journal
+        self._flush_lock = threading.Lock()  # satu flush ke DB pada satu waktu
+        self._pending = {}  # (session_id, student_id) -> PendingMark
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------------------------
+    # Lifecycle
+    # ---------------------------
+    def start(self, writer):
+        """
+        writer(db, marks) menulis list PendingMark ke DB dan commit.
+        Kunci journal, replay isinya, flush, lalu jalankan thread flush.
+        Return False (write-behind mati di proses ini) jika journal dipakai proses lain.
+        """
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        lock_file = open(self.journal_path + ".lock", "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            logger.warning("Journal %s dipakai proses lain: write-behind mati di proses ini", self.journal_path)
+            return False
+
+        self._writer = writer
+        self._lock_file = lock_file
+        replayed = self._replay()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        # Tulis ulang journal dari mark yang ter-replay sebelum ada append: baris
+        # terakhir yang terpotong dibuang, jadi mark berikutnya tidak tersambung
+        # ke potongan itu (dan ikut hilang saat replay) walau flush di bawah gagal
+        with self._lock:
+            self._compact_journal()
+        if replayed:
+            logger.info("Replay %d mark dari journal %s", replayed, self.journal_path)
+            MARKS.inc(replayed, "replayed")
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flush replay journal gagal, dicoba lagi di background")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        self.enabled = True
+        return True
+
+    def shutdown(self):
+        if self._thread is None:
+            return
+        self.enabled = False
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Flush terakhir gagal, mark tetap di journal untuk replay")
+        self._journal.close()
+        self._journal = None
+        self._lock_file.close()  # flock ikut lepas
+        self._lock_file = None
+
+    def _replay(self) -> int:
+        if not os.path.exists(self.journal_path):
+            return 0
+        count = 0
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    mark = PendingMark.from_json(line)
+                except (ValueError, KeyError):
+                    continue  # baris terakhir yang terpotong saat crash
+                self._pending[(mark.session_id, mark.student_id)] = mark
+                count += 1
+        return count
+
+    # ---------------------------
+    # Mark
+    # ---------------------------
+    def submit(
+        self, session_id: int, course_id: int, meeting_no: int, statuses: dict, timestamp: datetime, model_version=None
+    ):
+        """{student_id: status} -> journal (fsync) + buffer; return setelah durable di disk"""
+        marks = [
+            PendingMark(session_id, course_id, meeting_no, student_id, status_val, timestamp, model_version)
+            for student_id, status_val in statuses.items()
+        ]
+        with self._lock:
+            self._journal.write("".join(mark.to_json() + "\n" for mark in marks))
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            coalesced = 0
+            for mark in marks:
+                coalesced += (mark.session_id, mark.student_id) in self._pending
+                self._pending[(mark.session_id, mark.student_id)] = mark
+            size = len(self._pending)
+        MARKS.inc(len(marks) - coalesced, "buffered")
+        if coalesced:
+            MARKS.inc(coalesced, "coalesced")
+        if size >= self.max_records:
+            self._wakeup.set()
+
+    def pending(self, session_id: int) -> dict:
+        """Mark sesi ini yang belum ada di DB: {student_id: (status, timestamp)}"""
+        with self._lock:
+            return {
+                student_id: (mark.status, mark.timestamp)
+                for (sid, student_id), mark in self._pending.items()
+                if sid == session_id
+            }
+
+    def has_pending(self, session_id: int) -> bool:
+        with self._lock:
+            return any(sid == session_id for sid, _ in self._pending)
+
+    # ---------------------------
+    # Flush
+    # ---------------------------
+    def flush(self) -> int:
+        """Tulis semua mark di buffer ke DB (satu transaksi). Return jumlah mark yang ditulis"""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending.values())
+            if not batch:
+                return 0
+            start = time.perf_counter()
+            db = SessionLocal()
+            try:
+                self._writer(db, batch)
+            except Exception:
+                db.rollback()
+                FLUSHES.inc(1, "error")
+                raise
+            finally:
+                db.close()
+            FLUSH_SECONDS.observe(time.perf_counter() - start)
+            FLUSHES.inc(1, "ok")
+            MARKS.inc(len(batch), "flushed")
+
+            with self._lock:
+                # Mark yang diganti selama flush berjalan tetap menunggu flush berikutnya
+                for mark in batch:
+                    key = (mark.session_id, mark.student_id)
+                    if self._pending.get(key) is mark:
+                        del self._pending[key]
+                self._compact_journal()
+            return len(batch)
+
+    def _compact_journal(self):
+        """
+        Journal = isi buffer saat ini (dipanggil dengan _lock dipegang). Ditulis ke
+        file sementara lalu os.replace, jadi crash di tengah compaction tetap
+        menyisakan journal lama atau baru yang utuh. Direktori journal di-fsync
+        setelah rename supaya rename itu sendiri durable (tanpa ini, setelah
+        power loss nama journal bisa masih menunjuk ke isi lama).
+        """
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as out:
+            out.write("".join(mark.to_json() + "\n" for mark in self._pending.values()))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self.journal_path)
+        _fsync_dir(os.path.dirname(os.path.abspath(self.journal_path)))
+        self._journal.close()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break  # flush terakhir oleh shutdown()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flush write-behind gagal, dicoba lagi dalam %.1fs", WRITE_BEHIND_RETRY)
+                self._stop.wait(WRITE_BEHIND_RETRY)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+
+def _fsync_dir(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+write_behind = WriteBehindBuffer()
+
+metrics.register(metrics.Gauge(
+    "write_behind_pending", "Mark attendance di buffer yang belum ditulis ke DB", lambda: {(): len(write_behind)}
+))
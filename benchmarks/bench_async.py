@@ -0,0 +1,200 @@
+"""
+Throughput beban campuran: DB_ASYNC=0 (Session sync di threadpool) vs DB_ASYNC=1 (AsyncSession).
+
+    python -m benchmarks.bench_async [--duration 10] [--infer-ms 50]
+
+Tiap mode menjalankan uvicorn di subprocess sendiri dengan SQLite sementara
+(aiosqlite untuk mode async). Recognition diganti sleep --infer-ms di threadpool
+(seperti menunggu worker pool inference) dan cache frame dimatikan, jadi
+threadpool penuh oleh request wajah sementara request report / manual mark
+bersaing untuk DB. Dilaporkan request/detik dan p50/p95 latensi per jenis request.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+N_STUDENTS = 60
+FACE_STUDENTS = 40
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(port: int, infer_ms: float):
+    import itertools
+
+    import uvicorn
+
+    from app.main import app
+    from app.routers import attendance
+
+    student_ids = itertools.cycle(range(1, FACE_STUDENTS + 1))
+
+    def fake_recognize(image, candidates=None):
+        time.sleep(infer_ms / 1000)
+        return next(student_ids), 0.99
+
+    attendance.recognize_bgr = fake_recognize
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def seed():
+    from app import models
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        course = models.Course(name="Bench", lecturer_id=1)
+        db.add(course)
+        db.flush()
+        for i in range(N_STUDENTS):
+            st = models.Student(name=f"Student {i}", nim=f"NIM{i:04d}")
+            db.add(st)
+            db.flush()
+            db.add(models.CourseEnrollment(course_id=course.id, student_id=st.id))
+        db.add(models.Session(course_id=course.id, meeting_no=1))
+        db.commit()
+        return course.id
+    finally:
+        db.close()
+
+
+async def load(port: int, course_id: int, duration: float, clients: dict):
+    import httpx
+
+    base = f"http://127.0.0.1:{port}"
+    jpg = cv2.imencode(".jpg", np.full((160, 160, 3), 128, np.uint8))[1].tobytes()
+    latencies = {kind: [] for kind in clients}
+    errors = {kind: 0 for kind in clients}
+    limits = httpx.Limits(max_connections=sum(clients.values()) + 4)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        resp = await client.post(
+            "/auth/register", data={"name": "Bench", "email": "bench@example.com", "password": "bench"}
+        )
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        deadline = time.perf_counter() + duration
+
+        async def worker(kind: str, index: int):
+            n = 0
+            while time.perf_counter() < deadline:
+                n += 1
+                if kind == "face":
+                    call = client.post(
+                        f"/attendance/mark/face?course_id={course_id}&meeting_no=1",
+                        headers=headers, files={"file": ("f.jpg", jpg)},
+                    )
+                elif kind == "report":
+                    call = client.get(f"/report/{course_id}/1", headers=headers)
+                else:
+                    call = client.post("/attendance/mark/manual", headers=headers, json={
+                        "student_id": FACE_STUDENTS + 1 + (index * 7 + n) % (N_STUDENTS - FACE_STUDENTS),
+                        "course_id": course_id,
+                        "meeting_no": 1,
+                        "status": "sakit" if n % 2 else "tanpa_keterangan",
+                    })
+                start = time.perf_counter()
+                resp = await call
+                if resp.status_code == 200:
+                    latencies[kind].append((time.perf_counter() - start) * 1000)
+                else:
+                    errors[kind] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            worker(kind, i) for kind, count in clients.items() for i in range(count)
+        ])
+        elapsed = time.perf_counter() - start
+
+    return {
+        kind: {
+            "rps": len(values) / elapsed,
+            "p50": float(np.percentile(values, 50)) if values else None,
+            "p95": float(np.percentile(values, 95)) if values else None,
+            "errors": errors[kind],
+        }
+        for kind, values in latencies.items()
+    }
+
+
+def run_mode(mode: str, args, clients: dict):
+    tmpdir = tempfile.mkdtemp(prefix="absensi-async-")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+        DB_ASYNC="1" if mode == "async" else "0",
+        MODEL_PRELOAD="0",
+        FRAME_CACHE_ENABLED="0",
+        METRICS_ENABLED="0",
+        PYTHONWARNINGS="ignore",
+    )
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_async", "--seed"], env=env, check=True, capture_output=True, text=True
+    )
+    course_id = json.loads(out.stdout.strip().splitlines()[-1])["course_id"]
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_async", "--serve", str(port), "--infer-ms", str(args.infer_ms)],
+        env=env,
+    )
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                time.sleep(0.2)
+        return asyncio.run(load(port, course_id, args.duration, clients))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput beban campuran sync vs async DB")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--infer-ms", type=float, default=50, help="Durasi recognition tiruan")
+    parser.add_argument("--face-clients", type=int, default=48)
+    parser.add_argument("--report-clients", type=int, default=16)
+    parser.add_argument("--manual-clients", type=int, default=8)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.seed:
+        print(json.dumps({"course_id": seed()}))
+        return 0
+    if args.serve:
+        serve(args.serve, args.infer_ms)
+        return 0
+
+    clients = {"face": args.face_clients, "report": args.report_clients, "manual": args.manual_clients}
+    print(f"clients: {clients}, recognition {args.infer_ms:.0f} ms, {args.duration:.0f} s per mode")
+    print(f"{'mode':<7}{'request':<9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+    totals = {}
+    for mode in ("sync", "async"):
+        results = run_mode(mode, args, clients)
+        totals[mode] = sum(r["rps"] for r in results.values())
+        for kind, r in results.items():
+            p50 = f"{r['p50']:.1f}" if r["p50"] is not None else "-"
+            p95 = f"{r['p95']:.1f}" if r["p95"] is not None else "-"
+            print(f"{mode:<7}{kind:<9}{r['rps']:>9.1f}{p50:>9}{p95:>9}{r['errors']:>8}")
+    print(f"total req/s: sync {totals['sync']:.1f}, async {totals['async']:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Hitung jumlah query SQL + commit per request mark attendance dan GET report.
+
+    python -m benchmarks.bench_attendance_writes
+
+Default memakai SQLite sementara; set DATABASE_URL untuk PostgreSQL, DB_ASYNC=1 untuk mode async.
+Recognition di-patch ke student_id tetap, jadi yang diukur hanya jalur DB
+(plus cache frame: kiriman ulang / frame hampir sama, dan badai duplikat paralel).
+"""
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_tmpdir = tempfile.mkdtemp(prefix="absensi-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+os.environ.setdefault("MODEL_PRELOAD", "0")
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import models  # noqa: E402
+from app.database import DB_ASYNC, SessionLocal, engine, get_async_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.routers import attendance  # noqa: E402
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+        self.commits = 0
+        engines = [engine, get_async_engine().sync_engine] if DB_ASYNC else [engine]
+        for eng in engines:
+            event.listen(eng, "before_cursor_execute", self._on_query)
+            event.listen(eng, "commit", self._on_commit)
+
+    def _on_query(self, *args, **kwargs):
+        self.queries += 1
+
+    def _on_commit(self, *args, **kwargs):
+        self.commits += 1
+
+    def reset(self):
+        self.queries = self.commits = 0
+
+
+def seed(n_students: int = 40):
+    db = SessionLocal()
+    try:
+        course = models.Course(name="Bench", lecturer_id=1)
+        db.add(course)
+        db.flush()
+        for i in range(n_students):
+            st = models.Student(name=f"Student {i}", nim=f"NIM{i:04d}")
+            db.add(st)
+            db.flush()
+            db.add(models.CourseEnrollment(course_id=course.id, student_id=st.id))
+        db.add(models.Session(course_id=course.id, meeting_no=1))
+        db.commit()
+        return course.id
+    finally:
+        db.close()
+
+
+def main():
+    with TestClient(app) as client:
+        token = client.post(
+            "/auth/register",
+            data={"name": "Bench", "email": "bench@example.com", "password": "bench"},
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        course_id = seed()
+
+        rng = np.random.default_rng(0)
+
+        def frame():
+            # Frame berbeda per "mahasiswa" supaya tidak kena cache frame
+            image = cv2.resize(rng.integers(0, 256, (8, 8, 3), dtype=np.uint8), (160, 160))
+            return image, cv2.imencode(".jpg", image)[1].tobytes()
+
+        counter = QueryCounter()
+
+        def run(label, method, url, extra_headers=None, **kwargs):
+            counter.reset()
+            resp = method(url, headers={**headers, **(extra_headers or {})}, **kwargs)
+            print(f"{label:<40} HTTP {resp.status_code}  queries={counter.queries:<3} commits={counter.commits}")
+            return resp
+
+        attendance.recognize_bgr = lambda img, candidates=None: (1, 0.99)
+        face_url = f"/attendance/mark/face?course_id={course_id}&meeting_no=1"
+        run("face mark (first, creates report)", client.post, face_url, files={"file": ("f.jpg", frame()[1])})
+        attendance.recognize_bgr = lambda img, candidates=None: (2, 0.99)
+        image, jpg = frame()
+        run("face mark (new student)", client.post, face_url, files={"file": ("f.jpg", jpg)})
+        run("face mark (repeat, new frame)", client.post, face_url, files={"file": ("f.jpg", frame()[1])})
+        run("face mark (resend, frame cache)", client.post, face_url, files={"file": ("f.jpg", jpg)})
+        noisy = np.clip(image.astype(np.int16) + rng.integers(-3, 4, image.shape), 0, 255).astype(np.uint8)
+        near = cv2.imencode(".jpg", noisy, [cv2.IMWRITE_JPEG_QUALITY, 70])[1].tobytes()
+        run("face mark (near-duplicate, frame cache)", client.post, face_url, files={"file": ("f.jpg", near)})
+
+        # Badai duplikat: 16 kiriman paralel frame yang sama, inference lambat
+        calls = []
+
+        def slow_recognize(img, candidates=None):
+            calls.append(threading.get_ident())
+            time.sleep(0.2)
+            return 4, 0.99
+
+        attendance.recognize_bgr = slow_recognize
+        storm_jpg = frame()[1]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(16) as pool:
+            codes = list(pool.map(
+                lambda _: client.post(face_url, headers=headers, files={"file": ("f.jpg", storm_jpg)}).status_code,
+                range(16),
+            ))
+        print(
+            f"{'duplicate storm (16 parallel)':<40} HTTP {sorted(set(codes))}  inference calls={len(calls)} "
+            f"({(time.perf_counter() - start) * 1000:.0f} ms)"
+        )
+
+        manual = {"student_id": 3, "course_id": course_id, "meeting_no": 1, "status": "sakit"}
+        run("manual mark (new)", client.post, "/attendance/mark/manual", json=manual)
+        manual["status"] = "tanpa_keterangan"
+        run("manual mark (status change)", client.post, "/attendance/mark/manual", json=manual)
+
+        report_url = f"/report/{course_id}/1"
+        etag = run("report (cold)", client.get, report_url).headers["etag"]
+        run("report (cached)", client.get, report_url)
+        run("report (If-None-Match)", client.get, report_url, {"If-None-Match": etag})
+        run("manual mark (invalidates report)", client.post, "/attendance/mark/manual", json=manual | {"status": "sakit"})
+        run("report (If-None-Match, stale ETag)", client.get, report_url, {"If-None-Match": etag})
+
+        bulk = {
+            "course_id": course_id,
+            "meeting_no": 1,
+            "items": [{"student_id": i, "status": "sakit"} for i in range(3, 23)] + [{"student_id": 999, "status": "sakit"}],
+            "mark_remaining_absent": True,
+        }
+        resp = run("manual bulk (20 students + remaining)", client.post, "/attendance/mark/manual/bulk", json=bulk)
+        body = resp.json()
+        print(
+            f"  updated={body['updated']} unchanged={body['unchanged']} "
+            f"not_enrolled={body['not_enrolled']} remaining_absent={body['marked_remaining_absent']}"
+        )
+
+        db = SessionLocal()
+        report = db.query(models.Report).filter_by(course_id=course_id, meeting_no=1).one()
+        print(
+            f"report: hadir={report.hadir_count} sakit={report.sakit_count} "
+            f"tanpa_keterangan={report.tanpa_keterangan_count}"
+        )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Klasifikasi dibatasi ke kandidat sesi (mahasiswa terdaftar, app/candidates.py)
+vs semua kelas.
+
+    python -m benchmarks.bench_candidates [--limit 0] [--gallery-students 5000] [--enrolled 40]
+
+SVM (svm_face_recognition.pkl, app/dataset): akurasi semua kelas vs dibatasi ke
+{kelas benar + satu kelas lain}; prediksi ke kelas di luar sesi tidak mungkin
+lagi (crop app/dataset di sini center-crop, bobot YOLO tanpa deteksi). Galeri (sintetis, dim HOG): ms per batch 32 wajah untuk galeri N
+mahasiswa vs subset kandidat sesi, dan jumlah hasil di luar kandidat.
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from app import face_recognition, features, model_registry
+from app.gallery import FaceGallery
+from app.training import scan_dataset
+
+from .bench_hog import _center_box
+
+
+def bench_svm(limit: int):
+    face_recognition.load_models()
+    model = face_recognition.active_model
+    classes = [str(c) for c in model.svm.classes_]
+    # Tanpa <model>.labels.json label = nama folder: beri id 1..n khusus bench
+    ids = {label: i + 1 for i, label in enumerate(classes)}
+    face_recognition.install_model(model_registry.LoadedModel(model.version, model.svm, ids, model.path))
+
+    items = [(label, path) for label, path in scan_dataset() if label in ids]
+    if limit:
+        items = items[::max(1, len(items) // limit)][:limit]
+    crops, truth = [], []
+    for label, path in items:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        faces = face_recognition.detect_face(image) or [_center_box(image)]
+        crop = face_recognition.crop_face(image, faces[0])
+        if crop is not None:
+            crops.append(crop)
+            truth.append(ids[label])
+    feats = features.extract_hog_batch(crops)
+
+    full = face_recognition.classify_features(feats)
+    rng = np.random.default_rng(0)
+    candidates = []
+    for true_id in truth:
+        other = rng.choice([i for i in ids.values() if i != true_id])
+        candidates.append(frozenset((true_id, int(other))))
+    restricted = face_recognition.classify_features(feats, candidates)
+
+    def timed(*args):
+        start = time.perf_counter()
+        for _ in range(5):
+            face_recognition.classify_features(*args)
+        return (time.perf_counter() - start) / 5 * 1000 / len(feats)
+
+    acc_full = np.mean([sid == t for (sid, _), t in zip(full, truth)])
+    acc_restricted = np.mean([sid == t for (sid, _), t in zip(restricted, truth)])
+    outside = sum(sid not in cand for (sid, _), cand in zip(full, candidates))
+    print(f"SVM: {len(feats)} wajah, {len(classes)} kelas, kandidat per wajah = 2")
+    print(f"  akurasi semua kelas   {acc_full:6.1%}   ({outside} prediksi di luar kandidat sesi)")
+    print(f"  akurasi dibatasi      {acc_restricted:6.1%}")
+    print(f"  ms per wajah          {timed(feats):.3f} vs {timed(feats, candidates):.3f} (predict_proba tetap semua kelas)")
+
+
+def bench_gallery(students: int, per_student: int, enrolled: int, queries: int = 32):
+    rng = np.random.default_rng(1)
+    dim = features.FEATURE_DIM
+    tmp = tempfile.mkdtemp(prefix="gallery-bench-")
+    try:
+        gallery = FaceGallery(directory=tmp, max_distance=0.5, calibration=None)  # vektor sintetis
+        centers = rng.standard_normal((students, dim)).astype(np.float32)
+        vectors = np.repeat(centers, per_student, axis=0)
+        vectors += 0.3 * rng.standard_normal(vectors.shape).astype(np.float32)
+        labels = np.repeat(np.arange(1, students + 1), per_student)
+        # Tulis langsung (enroll per mahasiswa menulis meta tiap kali)
+        gallery._rewrite(vectors, labels.astype(np.int64))
+        gallery._write_meta(vectors, labels)
+        gallery.load()
+
+        session = rng.choice(np.arange(1, students + 1), size=enrolled, replace=False)
+        candidates = frozenset(int(s) for s in session)
+        who = rng.choice(session, size=queries)
+        # Wajah kandidat, tapi mirip juga dengan mahasiswa lain (kembaran di kelas lain)
+        twins = rng.integers(1, students + 1, size=queries)
+        q = 0.5 * centers[who - 1] + 0.5 * centers[twins - 1] + 0.3 * rng.standard_normal((queries, dim))
+
+        def timed(cand):
+            gallery.search(q, candidates=cand)  # warmup / bangun subset
+            start = time.perf_counter()
+            for _ in range(10):
+                result = gallery.search(q, candidates=cand)
+            return (time.perf_counter() - start) / 10 * 1000, result
+
+        ms_full, full = timed(None)
+        ms_sub, sub = timed(candidates)
+        acc = lambda res: np.mean([sid == w for (sid, _), w in zip(res, who)])
+        outside = sum(sid is not None and sid not in candidates for sid, _ in full)
+        print(f"Galeri: {students} mahasiswa x {per_student} vektor, sesi {enrolled} kandidat, batch {queries} wajah")
+        print(f"  semua        {ms_full:8.2f} ms   akurasi {acc(full):6.1%}   di luar kandidat {outside}")
+        print(f"  kandidat     {ms_sub:8.2f} ms   akurasi {acc(sub):6.1%}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recognition dibatasi kandidat sesi vs semua kelas")
+    parser.add_argument("--limit", type=int, default=0, help="Jumlah gambar dataset (0 = semua)")
+    parser.add_argument("--gallery-students", type=int, default=5000)
+    parser.add_argument("--per-student", type=int, default=3)
+    parser.add_argument("--enrolled", type=int, default=40)
+    args = parser.parse_args(argv)
+
+    bench_svm(args.limit)
+    bench_gallery(args.gallery_students, args.per_student, args.enrolled)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
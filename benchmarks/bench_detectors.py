@@ -0,0 +1,89 @@
+"""
+Bandingkan backend deteksi wajah (app/detectors.py) di app/dataset.
+
+    python -m benchmarks.bench_detectors [--backends yolo,haar,yunet,haar+yolo] [--limit 100]
+
+Per backend: ms per frame (p50 / p95), persentase frame dengan >= 1 wajah
+(tiap gambar dataset berisi satu wajah, jadi ini proxy recall), rata-rata
+box per frame, dan akurasi SVM pada frame yang terdeteksi untuk folder yang
+ada di kelas SVM. "a+b" = mode cascade (FACE_DETECTOR="a,b"). Backend yang
+file modelnya tidak ada dilewati.
+"""
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from app import detectors, face_recognition
+from app.training import scan_dataset
+
+
+def load_frames(limit: int):
+    items = scan_dataset()
+    if limit:
+        items = items[::max(1, len(items) // limit)][:limit]
+    frames = []
+    for label, path in items:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is not None:
+            frames.append((label, image))
+    return frames
+
+
+def bench_backend(detector, frames, svm):
+    timings, found, boxes_total, correct, scored = [], 0, 0, 0, 0
+    classes = {str(c) for c in svm.classes_}
+    for label, image in frames:
+        start = time.perf_counter()
+        faces = detector.detect_batch([image])[0]
+        timings.append((time.perf_counter() - start) * 1000)
+        boxes_total += len(faces)
+        if not faces:
+            continue
+        found += 1
+        if label not in classes:
+            continue
+        crop = face_recognition.crop_face(image, face_recognition.select_largest_face(faces))
+        if crop is None:
+            continue
+        scored += 1
+        features = face_recognition.extract_hog_features(crop).reshape(1, -1)
+        correct += int(str(svm.predict(features)[0]) == label)
+    return {
+        "p50": float(np.percentile(timings, 50)),
+        "p95": float(np.percentile(timings, 95)),
+        "found": found / len(frames),
+        "boxes": boxes_total / len(frames),
+        "accuracy": correct / scored if scored else None,
+        "scored": scored,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bandingkan backend deteksi wajah")
+    parser.add_argument("--backends", default="yolo,yunet,haar,haar+yolo,yunet+yolo")
+    parser.add_argument("--limit", type=int, default=100, help="Jumlah gambar (0 = semua)")
+    args = parser.parse_args(argv)
+
+    frames = load_frames(args.limit)
+    svm = face_recognition.get_svm_model()
+    print(f"frames: {len(frames)} ({frames[0][1].shape[1]}x{frames[0][1].shape[0]})")
+    print(f"{'backend':<14}{'p50 ms':>9}{'p95 ms':>9}{'found':>8}{'boxes':>7}{'svm acc':>9}")
+    for spec in args.backends.split(","):
+        try:
+            detector = detectors.build_detector(spec.replace("+", ","))
+            detector.load()
+            detector.detect_batch([frames[0][1]])  # warmup
+        except (FileNotFoundError, OSError, RuntimeError) as exc:
+            print(f"{spec:<14} skipped: {exc}")
+            continue
+        r = bench_backend(detector, frames, svm)
+        acc = f"{r['accuracy']:.0%}" if r["accuracy"] is not None else "-"
+        print(f"{spec:<14}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['found']:>8.0%}{r['boxes']:>7.2f}{acc:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
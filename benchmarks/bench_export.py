@@ -0,0 +1,76 @@
+"""
+Ukur waktu + puncak memori export semester (CSV / PDF) untuk beberapa ukuran kelas.
+
+    python -m benchmarks.bench_export
+
+Default memakai SQLite sementara; set DATABASE_URL untuk PostgreSQL.
+Puncak memori (tracemalloc) seharusnya hampir sama untuk kelas kecil dan besar.
+"""
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+_tmpdir = tempfile.mkdtemp(prefix="absensi-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+os.environ.setdefault("EXPORT_DIR", os.path.join(_tmpdir, "exports"))
+
+from app import export, models  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+
+SIZES = [(40, 4), (400, 16), (2000, 16)]  # (mahasiswa, pertemuan)
+
+
+def seed(n_students: int, n_meetings: int) -> int:
+    db = SessionLocal()
+    try:
+        course = models.Course(name=f"Bench {n_students}x{n_meetings}", lecturer_id=1)
+        db.add(course)
+        db.flush()
+        students = [models.Student(name=f"Student {i}", nim=f"{course.id:03d}{i:05d}") for i in range(n_students)]
+        db.add_all(students)
+        db.flush()
+        db.add_all([models.CourseEnrollment(course_id=course.id, student_id=st.id) for st in students])
+        statuses = list(models.AttendanceStatus)
+        for meeting_no in range(1, n_meetings + 1):
+            sess = models.Session(course_id=course.id, meeting_no=meeting_no)
+            db.add(sess)
+            db.flush()
+            db.bulk_insert_mappings(
+                models.Attendance,
+                [
+                    {"session_id": sess.id, "student_id": st.id, "status": random.choice(statuses)}
+                    for st in students
+                    if random.random() < 0.9
+                ],
+            )
+        db.commit()
+        return course.id
+    finally:
+        db.close()
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    print(f"{'students x meetings':<22}{'format':<8}{'rows':>8}{'seconds':>10}{'peak MiB':>10}{'file KiB':>10}")
+    for n_students, n_meetings in SIZES:
+        course_id = seed(n_students, n_meetings)
+        db = SessionLocal()
+        fingerprint = export.course_fingerprint(db, course_id)
+        db.close()
+        for fmt in ("csv", "pdf"):
+            tracemalloc.start()
+            start = time.perf_counter()
+            path = export.generate(course_id, fmt, fingerprint)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{f'{n_students} x {n_meetings}':<22}{fmt:<8}{n_students * n_meetings:>8}"
+                f"{elapsed:>10.2f}{peak / 2**20:>10.1f}{os.path.getsize(path) / 1024:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Paritas + kecepatan backend HOG (app/features.py) pada crop wajah app/dataset.
+
+    python -m benchmarks.bench_hog [--limit 0] [--repeat 3]
+
+Paritas: fitur backend "numpy" dibandingkan dengan skimage.feature.hog
+(selisih absolut maksimum) dan prediksi SVM svm_face_recognition.pkl dari
+kedua fitur harus identik; exit 1 jika tidak. Kecepatan: µs per wajah untuk
+implementasi lama (skimage, visualize=True), skimage tanpa visualisasi,
+numpy per crop, dan numpy satu batch.
+"""
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from app import face_recognition, features
+from app.training import scan_dataset
+
+MAX_ABS_DIFF = 1e-6
+
+
+def _center_box(image):
+    # Bobot YOLO tanpa wajah terdeteksi: paritas HOG tidak bergantung pada letak box
+    h, w = image.shape[:2]
+    side = min(h, w) // 3
+    x1, y1 = (w - side) // 2, (h - side) // 3
+    return (x1, y1, x1 + side, y1 + side)
+
+
+def load_crops(limit: int):
+    items = scan_dataset()
+    if limit:
+        items = items[::max(1, len(items) // limit)][:limit]
+    crops, fallback = [], 0
+    for _, path in items:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            continue
+        faces = face_recognition.detect_face(image)
+        if not faces:
+            faces = [_center_box(image)]
+            fallback += 1
+        crop = face_recognition.crop_face(image, faces[0])
+        if crop is not None:
+            crops.append(crop)
+    return crops, fallback
+
+
+def _legacy(crop):
+    """extract_hog_features sebelum app/features.py"""
+    from skimage.feature import hog
+
+    gray = cv2.resize(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY), features.HOG_SIZE)
+    return hog(
+        gray, pixels_per_cell=(8, 8), cells_per_block=(2, 2), orientations=9,
+        visualize=True, block_norm="L2-Hys",
+    )[0]
+
+
+def _per_face_us(fn, crops, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(crops)
+        best = min(best, time.perf_counter() - start)
+    return best / len(crops) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paritas + kecepatan backend HOG")
+    parser.add_argument("--limit", type=int, default=0, help="Jumlah gambar (0 = semua)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    face_recognition.load_models()
+    crops, fallback = load_crops(args.limit)
+    print(f"crops: {len(crops)}" + (f" ({fallback} with a fixed center box)" if fallback else ""))
+
+    reference = np.vstack([_legacy(crop) for crop in crops])
+    fast = features.extract_hog_batch(crops, backend="numpy")
+    max_diff = float(np.abs(reference - fast).max())
+
+    svm = face_recognition.get_svm_model()
+    pred_ref, pred_fast = svm.predict(reference), svm.predict(fast)
+    mismatched = int((pred_ref != pred_fast).sum())
+    proba_diff = float(np.abs(svm.predict_proba(reference) - svm.predict_proba(fast)).max())
+    print(f"parity: max |diff| {max_diff:.2e}, SVM predictions differ {mismatched}/{len(crops)}, "
+          f"max |proba diff| {proba_diff:.2e}")
+
+    timings = {
+        "skimage (visualize=True, old)": lambda cs: [_legacy(c) for c in cs],
+        "skimage": lambda cs: features.extract_hog_batch(cs, backend="skimage"),
+        "numpy per crop": lambda cs: [features.extract_hog_batch([c], backend="numpy") for c in cs],
+        "numpy batch": lambda cs: features.extract_hog_batch(cs, backend="numpy"),
+    }
+    base = None
+    print(f"{'backend':<32}{'us/face':>10}{'speedup':>9}")
+    for name, fn in timings.items():
+        us = _per_face_us(fn, crops, args.repeat)
+        base = base or us
+        print(f"{name:<32}{us:>10.1f}{base / us:>8.1f}x")
+
+    if max_diff > MAX_ABS_DIFF or mismatched:
+        print("PARITY FAILED")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
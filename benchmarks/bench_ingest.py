@@ -0,0 +1,106 @@
+"""
+Bandingkan decode upload resolusi penuh vs tahap ingest (decode resolusi turun + crop wajah).
+
+    python -m benchmarks.bench_ingest [--image app/dataset/<Nama>/<file>.jpg]
+
+Gambar contoh di-upscale ke beberapa resolusi kamera HP lalu di-encode JPEG.
+Tiap mode dijalankan di subprocess sendiri supaya puncak RSS (MiB) bisa dibandingkan.
+Box wajah tetap (tengah gambar), jadi yang diukur hanya decode + crop + HOG.
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+SIZES = [(1280, 720), (4032, 3024), (6000, 4000)]
+REPEAT = 5
+
+
+def _rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _face_box(width: int, height: int):
+    # Wajah kira-kira 1/6 lebar frame, di tengah
+    side = width // 6
+    x1, y1 = (width - side) // 2, (height - side) // 3
+    return x1, y1, x1 + side, y1 + side
+
+
+def run_mode(mode: str, path: str):
+    from app.face_recognition import crop_face, crop_faces, extract_hog_features
+    from app.ingest import IngestedImage, read_upload
+
+    timings, features = [], None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            if mode == "full":
+                image = cv2.imdecode(np.frombuffer(f.read(), np.uint8), cv2.IMREAD_COLOR)
+                crop = crop_face(image, _face_box(image.shape[1], image.shape[0]))
+            else:
+                image = IngestedImage(read_upload(f))
+                det = image.detection_image
+                # Box wajah di koordinat gambar deteksi (seperti keluaran YOLO)
+                fw, fh = image.full_size
+                x1, y1, x2, y2 = _face_box(fw, fh)
+                sx, sy = fw / det.shape[1], fh / det.shape[0]
+                box = (int(x1 / sx), int(y1 / sy), int(x2 / sx), int(y2 / sy))
+                _, crop = crop_faces(image, [box])[0]
+        features = extract_hog_features(crop)
+        timings.append(time.perf_counter() - start)
+        del image, crop
+    return {
+        "ms": 1000 * float(np.median(timings)),
+        # Modul yang di-import sama untuk kedua mode, jadi puncak RSS absolut bisa dibandingkan
+        "rss_mib": _rss_mib(),
+        "features": features.tolist(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--image", help="Gambar sumber (default: gambar pertama di app/dataset)")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_mode(*args.child)))
+        return 0
+
+    source_path = args.image or sorted(glob.glob(os.path.join("app", "dataset", "*", "*.jpg")))[0]
+    source = cv2.imread(source_path, cv2.IMREAD_COLOR)
+    tmpdir = tempfile.mkdtemp(prefix="absensi-ingest-")
+
+    print(f"{'resolution':<12}{'MB':>6}{'full ms':>10}{'ingest ms':>11}{'full RSS':>10}{'ingest RSS':>12}{'HOG cos':>9}")
+    for width, height in SIZES:
+        path = os.path.join(tmpdir, f"{width}x{height}.jpg")
+        cv2.imwrite(path, cv2.resize(source, (width, height), interpolation=cv2.INTER_CUBIC), [cv2.IMWRITE_JPEG_QUALITY, 92])
+        results = {}
+        for mode in ("full", "ingest"):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_ingest", "--child", mode, path],
+                check=True, capture_output=True, text=True,
+            )
+            results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+        a = np.asarray(results["full"]["features"])
+        b = np.asarray(results["ingest"]["features"])
+        cos = float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+        print(
+            f"{f'{width}x{height}':<12}{os.path.getsize(path) / 2**20:>6.1f}"
+            f"{results['full']['ms']:>10.1f}{results['ingest']['ms']:>11.1f}"
+            f"{results['full']['rss_mib']:>10.1f}{results['ingest']['rss_mib']:>12.1f}{cos:>9.4f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Registry model SVM: load versi (mmap) dan hot swap selagi recognition berjalan.
+
+    python -m benchmarks.bench_model_registry [--threads 4] [--swaps 20]
+
+Memakai MODEL_REGISTRY_DIR sementara; svm_face_recognition.pkl di-publish
+sebagai dua versi. Dicetak: waktu load pkl biasa vs versi registry (mmap),
+latensi classify_features per thread selama N aktivasi / rollback (tidak boleh
+ada error, tiap hasil tercatat dengan salah satu versi yang sah), model dengan
+dimensi fitur salah ditolak smoke test tanpa mengganti versi aktif, dan proses
+lain (registry kedua) melihat versi aktif dari active.json.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="absensi-registry-bench-")
+os.environ.setdefault("MODEL_REGISTRY_DIR", _tmpdir)
+
+import joblib  # noqa: E402
+import numpy as np  # noqa: E402
+from sklearn.svm import SVC  # noqa: E402
+
+from app import face_recognition, model_registry  # noqa: E402
+from app.features import FEATURE_DIM  # noqa: E402
+from app.model_registry import ModelRegistry, ModelValidationError, registry  # noqa: E402
+
+
+def timed_load(fn, repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Registry model SVM: load + hot swap")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--swaps", type=int, default=20)
+    args = parser.parse_args(argv)
+    failed = False
+
+    v1 = registry.publish(model_registry.SVM_MODEL_PATH, "v1")
+    v2 = registry.publish(model_registry.SVM_MODEL_PATH, "v2")
+    print(f"registry {_tmpdir}: {[meta['version'] for meta in registry.versions()]}")
+    print(f"load pkl biasa        {timed_load(lambda: joblib.load(model_registry.SVM_MODEL_PATH)):7.2f} ms")
+    print(f"load versi (mmap)     {timed_load(lambda: registry.load(v1)):7.2f} ms")
+
+    face_recognition.load_models()
+    legacy = face_recognition.active_model.version
+    features = np.random.default_rng(0).random((16, FEATURE_DIM))
+    valid = {legacy, v1, v2}
+    stop = threading.Event()
+    latencies, errors, seen = [], [], set()
+
+    def worker():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                face_recognition.classify_features(features)
+            except Exception as exc:
+                errors.append(repr(exc))
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            seen.add(model_registry.used_version())
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    activations = []
+    for i in range(args.swaps):
+        result = registry.rollback() if i % 4 == 3 else registry.activate(v1 if i % 2 == 0 else v2)
+        activations.append(result["load_seconds"] * 1000)
+        time.sleep(0.02)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    ok = not errors and seen <= valid
+    print(
+        f"hot swap: {args.swaps} aktivasi (load+smoke p50 {np.percentile(activations, 50):.2f} ms), "
+        f"{len(latencies)} classify selama swap, p50 {np.percentile(latencies, 50):.3f} ms, "
+        f"p99 {np.percentile(latencies, 99):.3f} ms, max {max(latencies):.3f} ms"
+    )
+    print(f"  versi terlihat {sorted(seen)}, error {len(errors)} -> {'OK' if ok else 'SALAH'}")
+    failed |= not ok
+
+    # Model dengan dimensi fitur lain: ditolak, versi aktif tetap
+    bad_path = os.path.join(_tmpdir, "bad.pkl")
+    rng = np.random.default_rng(1)
+    joblib.dump(SVC(probability=True).fit(rng.random((20, 10)), [0, 1] * 10), bad_path)
+    bad = registry.publish(bad_path, "bad")
+    before = face_recognition.active_model.version
+    try:
+        registry.activate(bad)
+        rejected = False
+    except ModelValidationError as exc:
+        rejected = True
+        print(f"versi {bad} ditolak: {exc}")
+    ok = rejected and face_recognition.active_model.version == before == registry.active_version()
+    print(f"  versi aktif tetap {before} -> {'OK' if ok else 'SALAH'}")
+    failed |= not ok
+
+    # Proses lain membaca active.json
+    other = ModelRegistry(poll=0)
+    ok = other.active_version() == registry.active_version()
+    print(f"registry proses lain melihat {other.active_version()} -> {'OK' if ok else 'SALAH'}")
+    failed |= not ok
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
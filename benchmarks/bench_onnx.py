@@ -0,0 +1,151 @@
+"""
+Detektor YOLO: PyTorch (ultralytics) vs ONNX fp32 vs ONNX int8 (onnxruntime).
+
+    python -m app.detector_export --int8      # sekali, membuat model ONNX
+    python -m benchmarks.bench_onnx [--limit 100] [--threads 1] [--conf 0.25]
+
+Tiap backend jalan di subprocess sendiri (seperti worker pool inference) supaya
+memori resident (peak RSS) terukur per proses. Dilaporkan waktu load, ms per
+frame p50 / p95, peak RSS, persentase frame dengan wajah, kecocokan box wajah
+terbesar dengan PyTorch (IoU >= 0.5) dan akurasi SVM pada frame terdeteksi.
+Exit 1 jika akurasi SVM backend ONNX turun lebih dari --tolerance dari PyTorch.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def child(limit: int):
+    """Backend dipilih lewat env (FACE_DETECTOR / ONNX_MODEL_PATH / YOLO_CONF), jalur sama dengan app"""
+    import cv2
+
+    from app import detectors, face_recognition
+    from app.training import scan_dataset
+
+    detectors.set_num_threads(detectors.ONNX_THREADS)
+    items = scan_dataset()
+    if limit:
+        items = items[::max(1, len(items) // limit)][:limit]
+    start = time.perf_counter()
+    svm = face_recognition.get_svm_model()
+    detector = face_recognition.get_detector()
+    load_s = time.perf_counter() - start
+
+    timings, frames = [], []
+    for label, path in items:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        start = time.perf_counter()
+        faces = detector.detect_batch([image])[0]
+        timings.append((time.perf_counter() - start) * 1000)
+        box, predicted = None, None
+        if faces:
+            box = face_recognition.select_largest_face(faces)
+            crop = face_recognition.crop_face(image, box)
+            if crop is not None:
+                predicted = str(svm.predict(face_recognition.extract_hog_features(crop).reshape(1, -1))[0])
+        frames.append({"label": label, "box": box and list(box), "predicted": predicted})
+
+    print(json.dumps({
+        "load_s": load_s,
+        # warmup = frame pertama, tidak ikut persentil
+        "timings": timings[1:] or timings,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "torch": "torch" in sys.modules,
+        "classes": [str(c) for c in svm.classes_],
+        "frames": frames,
+    }))
+
+
+def _iou(a, b):
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    inter = max(0, w) * max(0, h)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union else 0.0
+
+
+def summarize(result, reference):
+    frames = result["frames"]
+    classes = set(result["classes"])
+    scored = [f for f in frames if f["predicted"] is not None and f["label"] in classes]
+    both = [(f, r) for f, r in zip(frames, reference["frames"]) if f["box"] or r["box"]]
+    agree = sum(1 for f, r in both if f["box"] and r["box"] and _iou(f["box"], r["box"]) >= 0.5)
+    return {
+        "p50": float(np.percentile(result["timings"], 50)),
+        "p95": float(np.percentile(result["timings"], 95)),
+        "found": sum(1 for f in frames if f["box"]) / len(frames),
+        "box_agree": agree / len(both) if both else None,
+        "accuracy": sum(f["predicted"] == f["label"] for f in scored) / len(scored) if scored else None,
+    }
+
+
+def _pct(value):
+    return f"{value:.0%}" if value is not None else "-"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detektor PyTorch vs ONNX fp32 / int8")
+    parser.add_argument("--limit", type=int, default=100, help="Jumlah gambar dataset (0 = semua)")
+    parser.add_argument("--threads", type=int, default=1, help="Thread intra-op per proses")
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Penurunan akurasi SVM yang masih diterima")
+    parser.add_argument("--onnx", help="Model ONNX fp32 (default ONNX_MODEL_PATH); int8 = <nama>.int8.onnx")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.limit)
+        return 0
+
+    from app.detector_export import int8_path
+    from app.detectors import ONNX_MODEL_PATH
+
+    onnx_path = args.onnx or ONNX_MODEL_PATH
+    backends = {
+        "torch": {"FACE_DETECTOR": "yolo"},
+        "onnx": {"FACE_DETECTOR": "onnx", "ONNX_MODEL_PATH": onnx_path},
+        "onnx-int8": {"FACE_DETECTOR": "onnx", "ONNX_MODEL_PATH": int8_path(onnx_path)},
+    }
+    results = {}
+    for mode, backend_env in backends.items():
+        env = dict(
+            os.environ, **backend_env,
+            YOLO_CONF=str(args.conf), ONNX_THREADS=str(args.threads), PYTHONWARNINGS="ignore",
+        )
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_onnx", "--child", "--limit", str(args.limit)],
+            env=env, capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            print(f"{mode:<10} failed: {out.stderr.strip().splitlines()[-1] if out.stderr.strip() else out.returncode}")
+            continue
+        results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    if "torch" not in results:
+        return 1
+    reference = results["torch"]
+    print(f"frames: {len(reference['frames'])}, threads: {args.threads}, conf: {args.conf}")
+    print(f"{'backend':<10}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'RSS MB':>8}{'torch':>7}{'found':>7}{'box=pt':>8}{'svm acc':>9}")
+    failed = False
+    base_acc = summarize(reference, reference)["accuracy"]
+    for mode, result in results.items():
+        r = summarize(result, reference)
+        print(
+            f"{mode:<10}{result['load_s']:>8.2f}{r['p50']:>9.1f}{r['p95']:>9.1f}{result['rss_mb']:>8.0f}"
+            f"{'ya' if result['torch'] else 'tidak':>7}"
+            f"{_pct(r['found']):>7}{_pct(r['box_agree']):>8}{_pct(r['accuracy']):>9}"
+        )
+        if base_acc is not None and (r["accuracy"] is None or r["accuracy"] < base_acc - args.tolerance):
+            print(f"  REGRESI: akurasi SVM {mode} di bawah PyTorch ({_pct(base_acc)})")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
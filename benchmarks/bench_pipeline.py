@@ -0,0 +1,230 @@
+"""
+Benchmark per tahap pipeline recognition (CPU, offline) dari gambar app/dataset.
+
+    python -m benchmarks.bench_pipeline --output bench.json
+    python -m benchmarks.bench_pipeline --compare bench.json --tolerance 0.2
+
+Tahap: decode, detect_face (YOLO), crop/resize, extract_hog_features,
+SVM predict / predict_proba, dan recognize_face end-to-end. Tiap tahap
+dilaporkan p50/p95/p99 (ms); ditambah throughput recognize_faces_batch untuk
+beberapa ukuran batch dan puncak memori. Hasil ditulis sebagai JSON supaya
+bisa dibandingkan antar commit; --compare gagal (exit 1) jika ada tahap yang
+lebih lambat dari baseline melebihi toleransi.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from app import face_recognition
+
+DATASET_DIR = os.path.join("app", "dataset")
+STAGES = ["decode", "detect", "crop", "hog", "svm_predict", "svm_predict_proba", "recognize_face"]
+
+
+def percentiles(samples_ms):
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "n": int(arr.size),
+        "mean": float(arr.mean()),
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "p99": float(np.percentile(arr, 99)),
+    }
+
+
+def _timed(samples, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    samples.append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def _fallback_box(image):
+    # Model YOLO tanpa wajah terdeteksi (mis. bobot dummy): tetap ukur tahap setelahnya
+    h, w = image.shape[:2]
+    side = min(h, w) // 3
+    x1, y1 = (w - side) // 2, (h - side) // 3
+    return (x1, y1, x1 + side, y1 + side)
+
+
+def load_images(dataset_dir: str, limit: int):
+    paths = sorted(glob.glob(os.path.join(dataset_dir, "*", "*.jpg")))
+    if not paths:
+        raise SystemExit(f"No images found in {dataset_dir}")
+    # Ambil merata dari semua folder
+    step = max(1, len(paths) // limit)
+    paths = paths[::step][:limit]
+    blobs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            blobs.append(f.read())
+    return paths, blobs
+
+
+def bench_stages(blobs, repeat: int):
+    svm = face_recognition.get_svm_model()
+    samples = {stage: [] for stage in STAGES}
+    fallback = 0
+    for _ in range(repeat):
+        for blob in blobs:
+            image = _timed(samples["decode"], cv2.imdecode, np.frombuffer(blob, np.uint8), cv2.IMREAD_COLOR)
+            faces = _timed(samples["detect"], face_recognition.detect_face, image)
+            if not faces:
+                faces = [_fallback_box(image)]
+                fallback += 1
+            crop = _timed(samples["crop"], face_recognition.crop_face, image, faces[0])
+            if crop is None:
+                continue
+            features = _timed(samples["hog"], face_recognition.extract_hog_features, crop).reshape(1, -1)
+            _timed(samples["svm_predict"], svm.predict, features)
+            _timed(samples["svm_predict_proba"], svm.predict_proba, features)
+            _timed(samples["recognize_face"], face_recognition.recognize_face, image)
+    return {stage: percentiles(values) for stage, values in samples.items() if values}, fallback
+
+
+def bench_throughput(images, batch_sizes, repeat: int):
+    throughput = {}
+    for batch_size in batch_sizes:
+        batches = [images[i:i + batch_size] for i in range(0, len(images) - batch_size + 1, batch_size)]
+        if not batches:
+            continue
+        frames = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for batch in batches:
+                face_recognition.recognize_faces_batch(batch, largest_only=True)
+                frames += len(batch)
+        throughput[str(batch_size)] = frames / (time.perf_counter() - start)
+    return throughput
+
+
+def bench_memory(blobs):
+    """Puncak alokasi Python/numpy (tracemalloc) untuk satu lintasan pipeline + puncak RSS proses"""
+    tracemalloc.start()
+    for blob in blobs:
+        image = cv2.imdecode(np.frombuffer(blob, np.uint8), cv2.IMREAD_COLOR)
+        face_recognition.recognize_face(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "tracemalloc_peak_mib": peak / 2**20,
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, tolerance: float, min_ms: float):
+    """Return list pesan regresi (kosong = lolos)"""
+    failures = []
+    for stage, base in baseline.get("stages", {}).items():
+        cur = current["stages"].get(stage)
+        if cur is None:
+            continue
+        for key in ("p50", "p95"):
+            limit = base[key] * (1 + tolerance)
+            if cur[key] > limit and cur[key] - base[key] > min_ms:
+                failures.append(f"{stage} {key}: {cur[key]:.2f} ms > {base[key]:.2f} ms (+{tolerance:.0%})")
+    for batch_size, base in baseline.get("throughput", {}).items():
+        cur = current["throughput"].get(batch_size)
+        if cur is not None and cur < base / (1 + tolerance):
+            failures.append(f"throughput batch={batch_size}: {cur:.1f} < {base:.1f} frames/s (-{tolerance:.0%})")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark per tahap pipeline recognition")
+    parser.add_argument("--dataset", default=DATASET_DIR)
+    parser.add_argument("--limit", type=int, default=40, help="Jumlah gambar yang dipakai")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-sizes", default="1,2,4,8")
+    parser.add_argument("--output", help="Tulis hasil JSON ke file ini")
+    parser.add_argument("--compare", help="JSON baseline; exit 1 jika ada regresi")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Batas perlambatan relatif (0.2 = 20%%)")
+    parser.add_argument("--min-ms", type=float, default=0.5, help="Abaikan selisih di bawah ini (noise)")
+    args = parser.parse_args(argv)
+
+    try:
+        import torch
+
+        torch_threads = torch.get_num_threads()
+    except ImportError:
+        torch_threads = None
+
+    paths, blobs = load_images(args.dataset, args.limit)
+    face_recognition.warmup()
+
+    stages, fallback = bench_stages(blobs, args.repeat)
+    images = [cv2.imdecode(np.frombuffer(blob, np.uint8), cv2.IMREAD_COLOR) for blob in blobs]
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",") if b.strip()]
+    throughput = bench_throughput(images, batch_sizes, max(1, args.repeat // 2))
+    memory = bench_memory(blobs)
+
+    result = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch_threads,
+            "images": len(paths),
+            "repeat": args.repeat,
+            "image_shape": list(images[0].shape),
+            "backend": face_recognition.RECOGNITION_BACKEND,
+            "fallback_boxes": fallback,
+        },
+        "stages": stages,
+        "throughput": throughput,
+        "memory": memory,
+    }
+
+    print(f"{'stage':<20}{'n':>6}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+    for stage, stats in stages.items():
+        print(
+            f"{stage:<20}{stats['n']:>6}{stats['mean']:>9.2f}{stats['p50']:>9.2f}"
+            f"{stats['p95']:>9.2f}{stats['p99']:>9.2f}"
+        )
+    for batch_size, fps in throughput.items():
+        print(f"throughput batch={batch_size:<4} {fps:8.1f} frames/s")
+    print(f"memory: tracemalloc peak {memory['tracemalloc_peak_mib']:.1f} MiB, peak RSS {memory['peak_rss_mib']:.1f} MiB")
+    if fallback:
+        print(f"note: {fallback} frame(s) without detected face, measured with a fixed center box")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"written: {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        failures = compare(result, baseline, args.tolerance, args.min_ms)
+        if failures:
+            print("REGRESSION:")
+            for line in failures:
+                print(f"  {line}")
+            return 1
+        print(f"no regression vs {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
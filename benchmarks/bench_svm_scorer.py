@@ -0,0 +1,106 @@
+"""
+Paritas + kecepatan scorer SVM (app/svm_scorer.py) vs sklearn.
+
+    python -m benchmarks.bench_svm_scorer [--limit 0] [--repeat 20] [--classes 40]
+
+Paritas: fitur HOG crop app/dataset diskor dengan svm_face_recognition.pkl;
+label scorer compact harus sama dengan SVC.predict, kelas probabilitas
+tertinggi sama (kecuali dua teratas hampir seri) dan probabilitasnya dalam
+MAX_PROBA_DIFF dari predict_proba; exit 1 jika tidak. Hal yang sama dicek
+untuk SVC sintetis (dimensi HOG) dengan kernel linear / rbf / poly / sigmoid,
+2 kelas dan --classes kelas (jumlah mahasiswa satu model). Kecepatan: µs per
+wajah untuk predict + predict_proba (jalur lama recognize_face),
+predict_proba saja (classify_features) dan scorer compact, untuk batch 1 dan 32 wajah.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+from sklearn.svm import SVC
+
+from app import face_recognition, features
+from app.features import FEATURE_DIM
+from app.svm_scorer import CompactSVC
+
+from .bench_hog import load_crops
+
+# Coupling compact diselesaikan eksak, libsvm berhenti di toleransi 0.005/k
+MAX_PROBA_DIFF = 5e-3
+
+
+def parity(name: str, svm, feats) -> bool:
+    scorer = CompactSVC(svm)
+    labels, probs = scorer.score(feats)
+    reference = svm.predict_proba(feats)
+    mismatched = int((labels != svm.predict(feats)).sum())
+    # classify_features memilih kelas dengan probabilitas tertinggi (seri dalam toleransi diabaikan)
+    top2 = np.sort(reference, axis=1)[:, -2:]
+    decided = top2[:, 1] - top2[:, 0] > 2 * MAX_PROBA_DIFF
+    best_mismatched = int((probs.argmax(axis=1) != reference.argmax(axis=1))[decided].sum())
+    diff = float(np.abs(probs - reference).max())
+    ok = not mismatched and not best_mismatched and diff <= MAX_PROBA_DIFF
+    print(f"{name:<28}{len(svm.classes_):>4} kelas  label beda {mismatched}/{len(feats)}  "
+          f"argmax proba beda {best_mismatched}  max |proba diff| {diff:.2e}  {'OK' if ok else 'SALAH'}")
+    return ok
+
+
+def _per_face_us(fn, feats, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(feats)
+        best = min(best, time.perf_counter() - start)
+    return best / len(feats) * 1e6
+
+
+def synthetic(kernel: str, classes: int, rng):
+    per_class = 6
+    centers = rng.random((classes, FEATURE_DIM))
+    x = np.vstack([c + 0.05 * rng.standard_normal((per_class, FEATURE_DIM)) for c in centers])
+    y = np.repeat(np.arange(classes), per_class)
+    svm = SVC(kernel=kernel, probability=True, random_state=0).fit(x, y)
+    queries = centers[rng.integers(0, classes, 64)] + 0.08 * rng.standard_normal((64, FEATURE_DIM))
+    return svm, queries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paritas + kecepatan scorer SVM")
+    parser.add_argument("--limit", type=int, default=0, help="Jumlah gambar (0 = semua)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--classes", type=int, default=40)
+    args = parser.parse_args(argv)
+
+    face_recognition.load_models()
+    crops, _ = load_crops(args.limit)
+    feats = features.extract_hog_batch(crops)
+    svm = face_recognition.get_svm_model()
+
+    ok = parity("svm_face_recognition.pkl", svm, feats)
+    rng = np.random.default_rng(0)
+    models = {"svm_face_recognition.pkl": svm}
+    for kernel in ("linear", "rbf", "poly", "sigmoid"):
+        for classes in (2, args.classes):
+            model, queries = synthetic(kernel, classes, rng)
+            ok &= parity(f"sintetis {kernel}", model, queries)
+            if classes > 2 and kernel in ("linear", "rbf"):
+                models[f"sintetis {kernel}"] = model
+
+    print(f"\n{'model':<28}{'batch':>6}{'predict+proba':>15}{'proba':>9}{'compact':>9}  µs/wajah")
+    for name, model in models.items():
+        scorer = CompactSVC(model)
+        for batch in (1, 32):
+            sample = feats[:batch] if len(feats) >= batch else np.resize(feats, (batch, feats.shape[1]))
+            old = _per_face_us(lambda x: (model.predict(x), model.predict_proba(x)), sample, args.repeat)
+            proba = _per_face_us(model.predict_proba, sample, args.repeat)
+            compact = _per_face_us(scorer.score, sample, args.repeat)
+            print(f"{name:<28}{batch:>6}{old:>15.1f}{proba:>9.1f}{compact:>9.1f}")
+
+    if not ok:
+        print("PARITY FAILED")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
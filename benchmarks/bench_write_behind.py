@@ -0,0 +1,191 @@
+"""
+Mark attendance saat puncak (awal kuliah): tulis langsung vs write-behind.
+
+    python -m benchmarks.bench_write_behind [--students 200] [--marks 800] [--threads 8]
+
+Default memakai SQLite + journal di direktori sementara; set DATABASE_URL untuk PostgreSQL.
+Per mode: jumlah commit + query DB, waktu total dan p50 / p95 latensi request
+mark manual paralel (sebagian mahasiswa di-mark ulang -> coalescing). Write-behind:
+report dibaca sebelum flush (harus sudah berisi semua mark), counter report di DB
+setelah flush, dan replay journal setelah "crash" (thread flush dihentikan tanpa flush).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_tmpdir = tempfile.mkdtemp(prefix="absensi-wb-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+os.environ.setdefault("WRITE_BEHIND_JOURNAL", os.path.join(_tmpdir, "attendance.journal"))
+os.environ.setdefault("MODEL_PRELOAD", "0")
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import models  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.routers import attendance  # noqa: E402
+from app.write_behind import WriteBehindBuffer, write_behind  # noqa: E402
+
+from .bench_attendance_writes import QueryCounter  # noqa: E402
+
+STATUSES = ["hadir", "sakit", "tanpa_keterangan"]
+
+
+def seed(n_students: int) -> int:
+    db = SessionLocal()
+    try:
+        course = models.Course(name="Bench WB", lecturer_id=1)
+        db.add(course)
+        db.flush()
+        for i in range(n_students):
+            st = models.Student(name=f"Student {i}", nim=f"WB{i:05d}")
+            db.add(st)
+            db.flush()
+            db.add(models.CourseEnrollment(course_id=course.id, student_id=st.id))
+        db.commit()
+        return course.id
+    finally:
+        db.close()
+
+
+def enrolled_ids(course_id: int):
+    db = SessionLocal()
+    try:
+        return [
+            row.student_id
+            for row in db.query(models.CourseEnrollment.student_id).filter_by(course_id=course_id)
+        ]
+    finally:
+        db.close()
+
+
+def db_counts(course_id: int, meeting_no: int):
+    """(counter di tabel reports, hitungan baris attendance sesi terbaru pertemuan itu)"""
+    db = SessionLocal()
+    try:
+        report = db.query(models.Report).filter_by(course_id=course_id, meeting_no=meeting_no).first()
+        session = (
+            db.query(models.Session).filter_by(course_id=course_id, meeting_no=meeting_no)
+            .order_by(models.Session.id.desc()).first()
+        )
+        rows = db.query(models.Attendance.status).filter_by(session_id=session.id).all()
+        actual = {s: sum(1 for (v,) in rows if v.value == s) for s in STATUSES}
+        return (report and {s: getattr(report, f"{s}_count") for s in STATUSES}), actual
+    finally:
+        db.close()
+
+
+def report_counts(client, headers, course_id: int, meeting_no: int):
+    summary = client.get(f"/report/{course_id}/{meeting_no}", headers=headers).json()["summary"]
+    return {s: summary[f"{s}_count"] for s in STATUSES}
+
+
+def peak(client, headers, course_id: int, meeting_no: int, marks, threads: int, counter: QueryCounter):
+    client.post("/sessions/", headers=headers, json={"course_id": course_id, "meeting_no": meeting_no})
+
+    def post(mark):
+        student_id, status_val = mark
+        start = time.perf_counter()
+        resp = client.post(
+            "/attendance/mark/manual",
+            headers=headers,
+            json={"student_id": student_id, "course_id": course_id, "meeting_no": meeting_no, "status": status_val},
+        )
+        assert resp.status_code == 200, resp.text
+        return (time.perf_counter() - start) * 1000
+
+    counter.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        latencies = list(pool.map(post, marks))
+    return (time.perf_counter() - start) * 1000, latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mark attendance: tulis langsung vs write-behind")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--marks", type=int, default=800)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    with TestClient(app) as client:
+        token = client.post(
+            "/auth/register",
+            data={"name": "Bench WB", "email": "bench-wb@example.com", "password": "bench"},
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        course_id = seed(args.students)
+        students = enrolled_ids(course_id)
+        rng = np.random.default_rng(0)
+        marks = [
+            (int(rng.choice(students)), STATUSES[int(rng.integers(0, 3))]) for _ in range(args.marks)
+        ]
+        counter = QueryCounter()
+        failed = False
+
+        print(f"{args.marks} mark manual, {len(set(m[0] for m in marks))} mahasiswa unik, {args.threads} thread paralel")
+        print(f"{'mode':<14}{'total ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'commits':>9}{'queries':>9}")
+
+        def row(mode, total, latencies):
+            print(
+                f"{mode:<14}{total:>10.0f}{np.percentile(latencies, 50):>9.1f}{np.percentile(latencies, 95):>9.1f}"
+                f"{counter.commits:>9}{counter.queries:>9}"
+            )
+
+        # 1) Tulis langsung (write-behind belum jalan)
+        total, latencies = peak(client, headers, course_id, 1, marks, args.threads, counter)
+        row("langsung", total, latencies)
+        stored, actual = db_counts(course_id, 1)
+        print(f"  report DB {'cocok' if stored == actual else 'SALAH'}: {stored}")
+        failed |= stored != actual
+
+        # 2) Write-behind: flush hanya oleh thread (interval WRITE_BEHIND_FLUSH_MS) / batas record
+        write_behind.start(attendance.write_pending_marks)
+        total, latencies = peak(client, headers, course_id, 2, marks, args.threads, counter)
+        read_through = report_counts(client, headers, course_id, 2)
+        write_behind.flush()
+        row("write-behind", total, latencies)
+        stored, actual = db_counts(course_id, 2)
+        print(f"  report DB setelah flush {'cocok' if stored == actual else 'SALAH'}: {stored}")
+        print(f"  report sebelum flush (lewat buffer) {'cocok' if read_through == actual else 'SALAH'}")
+        failed |= stored != actual or read_through != actual
+
+        # 3) Crash sebelum flush: thread dihentikan tanpa flush, lock journal dilepas, lalu replay
+        client.post("/sessions/", headers=headers, json={"course_id": course_id, "meeting_no": 3})
+        write_behind.flush_interval = 3600
+        write_behind._wakeup.set()
+        time.sleep(0.1)
+        for student_id, status_val in marks[:50]:
+            client.post(
+                "/attendance/mark/manual",
+                headers=headers,
+                json={"student_id": student_id, "course_id": course_id, "meeting_no": 3, "status": status_val},
+            )
+        pending = len(write_behind)
+        write_behind._stop.set()
+        write_behind._wakeup.set()
+        write_behind._thread.join()
+        write_behind._lock_file.close()
+        restarted = WriteBehindBuffer(journal_path=write_behind.journal_path)
+        restarted.start(attendance.write_pending_marks)
+        final = {}
+        for student_id, status_val in marks[:50]:
+            final[student_id] = status_val
+        expected = {s: sum(1 for v in final.values() if v == s) for s in STATUSES}
+        stored, actual = db_counts(course_id, 3)
+        ok = stored == actual == expected
+        print(f"replay journal: {pending} mark pending saat crash -> DB setelah replay {'cocok' if ok else 'SALAH'}: {stored}")
+        failed |= not ok
+        restarted.shutdown()
+        write_behind.enabled = False
+        write_behind._thread = None
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Fixture bersama. Environment di-set sebelum app di-import: SQLite + journal +
+registry model di direktori sementara, tanpa preload model / worker inference.
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmpdir = tempfile.mkdtemp(prefix="absensi-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'test.db')}")
+os.environ.setdefault("WRITE_BEHIND_JOURNAL", os.path.join(_tmpdir, "journal", "attendance.journal"))
+os.environ.setdefault("MODEL_REGISTRY_DIR", os.path.join(_tmpdir, "registry"))
+os.environ.setdefault("YOLO_CONFIG_DIR", os.path.join(_tmpdir, "ultralytics"))
+os.environ.setdefault("MODEL_PRELOAD", "0")
+os.environ.setdefault("INFERENCE_WORKERS", "0")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db():
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def register_lecturer(client):
+    """Lecturer baru -> (id, header Authorization)"""
+    email = f"{uuid.uuid4().hex}@example.com"
+    token = client.post(
+        "/auth/register", data={"name": "Test Lecturer", "email": email, "password": "secret"}
+    ).json()["access_token"]
+    from jose import jwt
+
+    from app.security import ALGORITHM, SECRET_KEY
+
+    lecturer_id = int(jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])["sub"])
+    return lecturer_id, {"Authorization": f"Bearer {token}"}
+
+
+def seed_course(db, lecturer_id: int, n_students: int = 3):
+    """Course milik lecturer + n mahasiswa terdaftar -> (course_id, [student_id])"""
+    from app import models
+
+    course = models.Course(name="Test Course", lecturer_id=lecturer_id)
+    db.add(course)
+    db.flush()
+    students = []
+    for _ in range(n_students):
+        student = models.Student(name="Student", nim=uuid.uuid4().hex[:12])
+        db.add(student)
+        db.flush()
+        db.add(models.CourseEnrollment(course_id=course.id, student_id=student.id))
+        students.append(student.id)
+    db.commit()
+    return course.id, students
+
+
+def center_crops(limit: int = 60):
+    """Crop 128x128 tengah wajah dari app/dataset, tanpa detektor (bobot YOLO tidak menemukan wajah di dataset)"""
+    import cv2
+
+    from app.training import scan_dataset
+
+    items = scan_dataset()
+    crops = []
+    for _, path in items[::max(1, len(items) // limit)][:limit]:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        h, w = image.shape[:2]
+        side = min(h, w) // 3
+        x1, y1 = (w - side) // 2, (h - side) // 3
+        crops.append(cv2.resize(image[y1:y1 + side, x1:x1 + side], (128, 128), interpolation=cv2.INTER_CUBIC))
+    return crops
@@ -0,0 +1,24 @@
+import pytest
+
+from app import security
+
+from conftest import register_lecturer
+
+
+@pytest.mark.parametrize("method, path", [
+    ("get", "/admin/models/"),
+    ("post", "/admin/models/reload"),
+    ("post", "/admin/models/rollback"),
+])
+def test_admin_routes_reject_non_admin(client, method, path):
+    assert getattr(client, method)(path).status_code == 401
+    _, headers = register_lecturer(client)
+    assert getattr(client, method)(path, headers=headers).status_code == 403
+
+
+def test_admin_allowlist_grants_access(client, monkeypatch):
+    lecturer_id, headers = register_lecturer(client)
+    monkeypatch.setattr(security, "ADMIN_LECTURER_IDS", frozenset({lecturer_id}))
+    response = client.get("/admin/models/", headers=headers)
+    assert response.status_code == 200
+    assert "active" in response.json()
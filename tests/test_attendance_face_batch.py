@@ -0,0 +1,22 @@
+from app.routers.attendance import _best_faces
+
+
+def test_best_face_highest_confidence_wins():
+    detections = [((0, 0, 10, 10), 1, 0.7), ((20, 0, 30, 10), 1, 0.9), ((40, 0, 50, 10), 2, 0.8)]
+    assert _best_faces(detections, {1, 2}) == {1: 1, 2: 2}
+
+
+def test_best_face_tie_prefers_larger_box_then_first_index():
+    detections = [
+        ((0, 0, 10, 10), 1, 0.9),
+        ((20, 0, 40, 20), 1, 0.9),  # box terbesar
+        ((50, 0, 60, 10), 2, 0.8),
+        ((70, 0, 80, 10), 2, 0.8),  # seri penuh -> indeks pertama
+    ]
+    best = _best_faces(detections, {1, 2})
+    assert best == {1: 1, 2: 2}
+
+
+def test_best_face_skips_unknown_and_not_enrolled():
+    detections = [((0, 0, 10, 10), None, None), ((20, 0, 30, 10), 3, 0.9)]
+    assert _best_faces(detections, {1}) == {}
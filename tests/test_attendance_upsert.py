@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from app import models
+from app.routers.attendance import _apply_statuses, write_pending_marks
+from app.write_behind import PendingMark
+
+from conftest import register_lecturer, seed_course
+
+
+def _session(client, db):
+    lecturer_id, _ = register_lecturer(client)
+    course_id, students = seed_course(db, lecturer_id)
+    sess = models.Session(course_id=course_id, meeting_no=1)
+    db.add(sess)
+    db.commit()
+    return sess.id, course_id, students
+
+
+def _snapshot(db, session_id, course_id):
+    db.expire_all()
+    rows = sorted(
+        (row.student_id, row.status)
+        for row in db.query(models.Attendance).filter_by(session_id=session_id)
+    )
+    report = db.query(models.Report).filter_by(course_id=course_id, meeting_no=1).one()
+    return rows, (report.hadir_count, report.sakit_count, report.tanpa_keterangan_count)
+
+
+def test_repeated_upsert_is_idempotent(client, db):
+    session_id, course_id, (a, b, c) = _session(client, db)
+    statuses = {a: models.AttendanceStatus.hadir, b: models.AttendanceStatus.sakit}
+
+    records, _ = _apply_statuses(db, session_id, course_id, 1, statuses, use_registry=False)
+    db.commit()
+    assert all(rec["changed"] for rec in records.values())
+    first = _snapshot(db, session_id, course_id)
+    assert first[1] == (1, 1, 0)
+
+    records, _ = _apply_statuses(db, session_id, course_id, 1, statuses, use_registry=False)
+    db.commit()
+    assert not any(rec["changed"] for rec in records.values())
+    assert _snapshot(db, session_id, course_id) == first
+
+    # Status berubah: baris yang sama di-update, counter pindah kolom
+    _apply_statuses(db, session_id, course_id, 1, {a: models.AttendanceStatus.sakit}, use_registry=False)
+    db.commit()
+    rows, counts = _snapshot(db, session_id, course_id)
+    assert len(rows) == 2 and counts == (0, 2, 0)
+
+
+def test_write_behind_writer_is_idempotent(client, db):
+    session_id, course_id, (a, b, c) = _session(client, db)
+    now = datetime.utcnow()
+    marks = [
+        PendingMark(session_id, course_id, 1, a, models.AttendanceStatus.hadir, now),
+        PendingMark(session_id, course_id, 1, c, models.AttendanceStatus.hadir, now),
+    ]
+    write_pending_marks(db, marks)
+    first = _snapshot(db, session_id, course_id)
+    # Replay journal yang sama (mis. crash setelah commit, sebelum kompaksi journal)
+    write_pending_marks(db, marks)
+    assert _snapshot(db, session_id, course_id) == first
+    assert first == ([(a, models.AttendanceStatus.hadir), (c, models.AttendanceStatus.hadir)], (2, 0, 0))
+
+
+def test_recount_covers_every_session_of_the_meeting(client, db):
+    # Data lama: dua sesi untuk pertemuan yang sama, report tetap satu per pertemuan
+    session_id, course_id, (a, b, c) = _session(client, db)
+    _apply_statuses(db, session_id, course_id, 1, {a: models.AttendanceStatus.sakit}, use_registry=False)
+    db.commit()
+    later = models.Session(course_id=course_id, meeting_no=1)
+    db.add(later)
+    db.commit()
+
+    now = datetime.utcnow()
+    write_pending_marks(db, [PendingMark(later.id, course_id, 1, b, models.AttendanceStatus.hadir, now)])
+    assert _snapshot(db, session_id, course_id)[1] == (1, 1, 0)
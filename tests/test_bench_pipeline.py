@@ -0,0 +1,48 @@
+import json
+
+from benchmarks import bench_pipeline
+
+
+def _scaled(result, factor):
+    """Baseline palsu: semua tahap factor x lebih cepat / lambat dari hasil sekarang"""
+    return {
+        "stages": {
+            stage: {key: value * factor for key, value in stats.items()}
+            for stage, stats in result["stages"].items()
+        },
+        "throughput": {batch: fps / factor for batch, fps in result["throughput"].items()},
+    }
+
+
+def test_runner_writes_report_and_regression_mode_exits_1(tmp_path):
+    output = tmp_path / "bench.json"
+    args = ["--limit", "2", "--repeat", "1", "--batch-sizes", "1,2"]
+    assert bench_pipeline.main(args + ["--output", str(output)]) == 0
+
+    result = json.loads(output.read_text())
+    assert set(result) == {"meta", "stages", "throughput", "memory"}
+    assert result["meta"]["images"] == 2
+    assert set(result["stages"]) == set(bench_pipeline.STAGES)
+    assert set(result["throughput"]) == {"1", "2"}
+
+    # Baseline 100x lebih cepat -> regresi, exit 1; 100x lebih lambat -> lolos
+    faster = tmp_path / "faster.json"
+    faster.write_text(json.dumps(_scaled(result, 0.01)))
+    assert bench_pipeline.main(args + ["--compare", str(faster), "--min-ms", "0"]) == 1
+    slower = tmp_path / "slower.json"
+    slower.write_text(json.dumps(_scaled(result, 100)))
+    assert bench_pipeline.main(args + ["--compare", str(slower)]) == 0
+
+
+def test_compare_respects_tolerance_and_noise_floor():
+    base = {"stages": {"hog": {"p50": 1.0, "p95": 2.0}}, "throughput": {"4": 100.0}}
+    same = {"stages": {"hog": {"p50": 1.1, "p95": 2.2}}, "throughput": {"4": 90.0}}
+    assert bench_pipeline.compare(same, base, tolerance=0.2, min_ms=0.0) == []
+
+    slow = {"stages": {"hog": {"p50": 1.5, "p95": 2.0}}, "throughput": {"4": 70.0}}
+    failures = bench_pipeline.compare(slow, base, tolerance=0.2, min_ms=0.0)
+    assert len(failures) == 2 and failures[0].startswith("hog p50")
+    # Selisih 0.5 ms di bawah --min-ms dianggap noise; throughput tetap dicek
+    assert len(bench_pipeline.compare(slow, base, tolerance=0.2, min_ms=1.0)) == 1
+    # Tahap yang tidak ada di hasil sekarang dilewati
+    assert bench_pipeline.compare({"stages": {}, "throughput": {}}, base, 0.2, 0.0) == []
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from app import features
+
+from conftest import center_crops
+
+pytest.importorskip("skimage")
+
+# Numpy vs skimage hanya beda urutan penjumlahan float (teramati ~1e-7)
+MAX_ABS_DIFF = 1e-6
+
+
+def test_numpy_hog_matches_skimage_on_dataset_faces():
+    crops = center_crops()
+    fast = features.extract_hog_batch(crops, backend="numpy")
+    reference = features.extract_hog_batch(crops, backend="skimage")
+    assert fast.shape == reference.shape == (len(crops), features.FEATURE_DIM)
+    assert np.abs(fast - reference).max() < MAX_ABS_DIFF
+
+
+def test_numpy_hog_matches_skimage_on_edge_cases():
+    rng = np.random.default_rng(0)
+    crops = [
+        rng.integers(0, 256, (128, 128, 3), dtype=np.uint8),
+        np.zeros((128, 128, 3), np.uint8),  # tanpa gradien: blok nol
+        np.full((128, 128), 200, np.uint8),  # grayscale
+        rng.integers(0, 256, (90, 70, 3), dtype=np.uint8),  # bukan persegi
+    ]
+    # Lebih dari HOG_CHUNK crop: jalur potongan batch
+    crops += [rng.integers(0, 256, (64, 64, 3), dtype=np.uint8) for _ in range(features.HOG_CHUNK + 3)]
+    fast = features.extract_hog_batch(crops, backend="numpy")
+    reference = features.extract_hog_batch(crops, backend="skimage")
+    assert np.abs(fast - reference).max() < MAX_ABS_DIFF
@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.frame_cache import FrameCache
+from app.inference import InferenceUnavailable
+
+FRAME = np.random.default_rng(0).integers(0, 255, (64, 64, 3), dtype=np.uint8)
+
+
+def _leader_and_waiter(cache, compute):
+    """Leader memanggil compute (yang menunggu sinyal), waiter frame sama ikut menunggu -> exception waiter"""
+    started, waiter_errors = threading.Event(), []
+
+    def leader():
+        try:
+            cache.recognize(1, "single", FRAME, compute(started))
+        except Exception:
+            pass
+
+    def waiter():
+        try:
+            cache.recognize(1, "single", FRAME.copy(), lambda frame: pytest.fail("compute dua kali"))
+        except Exception as exc:
+            waiter_errors.append(exc)
+
+    lead = threading.Thread(target=leader)
+    lead.start()
+    started.wait(5)
+    wait = threading.Thread(target=waiter)
+    wait.start()
+    return lead, wait, waiter_errors
+
+
+def test_waiter_timeout_maps_to_inference_unavailable(monkeypatch):
+    monkeypatch.setattr("app.frame_cache.FRAME_CACHE_WAIT", 0.05)
+    release = threading.Event()
+
+    def compute(started):
+        def run(frame):
+            started.set()
+            release.wait(5)
+            return "ok"
+        return run
+
+    lead, wait, errors = _leader_and_waiter(FrameCache(), compute)
+    wait.join(5)
+    release.set()
+    lead.join(5)
+    assert len(errors) == 1 and isinstance(errors[0], InferenceUnavailable)
+
+
+def test_leader_failure_maps_to_inference_unavailable():
+    release = threading.Event()
+
+    def compute(started):
+        def run(frame):
+            started.set()
+            release.wait(5)
+            raise ValueError("model rusak")
+        return run
+
+    lead, wait, errors = _leader_and_waiter(FrameCache(), compute)
+    # Beri waiter waktu masuk ke future.result sebelum leader gagal
+    wait.join(0.2)
+    release.set()
+    lead.join(5)
+    wait.join(5)
+    assert len(errors) == 1 and isinstance(errors[0], InferenceUnavailable)
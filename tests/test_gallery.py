@@ -0,0 +1,91 @@
+import itertools
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from app import face_recognition, gallery as gallery_module
+from app.features import extract_hog_batch
+from app.gallery import FaceGallery, calibrate
+from app.training import scan_dataset
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    """
+    Fitur HOG app/dataset dari crop tengah tetap, khusus test: bobot YOLO di sini
+    tidak mendeteksi wajah di dataset. Cukup untuk menguji mekanisme galeri +
+    kalibrasi; kalibrasi sungguhan hanya dari wajah hasil deteksi (_dataset_features).
+    """
+    labels, crops = [], []
+    for label, path in scan_dataset():
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        h, w = image.shape[:2]
+        side = min(h, w) // 3
+        x1, y1 = (w - side) // 2, (h - side) // 3
+        labels.append(label)
+        crops.append(face_recognition.crop_face(image, (x1, y1, x1 + side, y1 + side)))
+    return extract_hog_batch(crops), np.array(labels)
+
+
+def _split(labels):
+    persons = sorted(set(labels))
+    known = persons[: len(persons) // 2]
+    rows = np.arange(len(labels))
+    enrolled = np.concatenate([rows[labels == p][::2] for p in known])
+    held_out = np.setdiff1d(rows[np.isin(labels, known)], enrolled)
+    unknown = rows[~np.isin(labels, known)]
+    return {p: i + 1 for i, p in enumerate(persons)}, enrolled, held_out, unknown
+
+
+def test_out_of_gallery_face_is_unknown(dataset, tmp_path):
+    features, labels = dataset
+    ids, enrolled, held_out, unknown = _split(labels)
+    # Kalibrasi dari orang yang dikenal saja; orang unknown tidak ikut menentukan batas
+    known = np.concatenate([enrolled, held_out])
+    calibration = tmp_path / "calibration.json"
+    calibration.write_text(json.dumps(calibrate(features[known], labels[known])))
+    gallery = FaceGallery(directory=str(tmp_path / "gallery"), calibration=str(calibration))
+    for person in sorted(set(labels[enrolled])):
+        rows = enrolled[labels[enrolled] == person]
+        gallery.enroll(ids[person], features[rows])
+
+    rejected = np.mean([student_id is None for student_id, _ in gallery.search(features[unknown])])
+    correct = np.mean([
+        student_id == ids[labels[row]] for (student_id, _), row in zip(gallery.search(features[held_out]), held_out)
+    ])
+    assert rejected >= 0.95
+    assert correct >= 0.85
+
+
+def test_uncentered_default_would_accept_unknown_faces(dataset, tmp_path):
+    """Regresi: tanpa centering, batas lama 0.35 menerima hampir semua wajah unknown"""
+    features, labels = dataset
+    ids, enrolled, _, unknown = _split(labels)
+    gallery = FaceGallery(directory=str(tmp_path), max_distance=0.35, calibration=None)
+    for person in sorted(set(labels[enrolled])):
+        gallery.enroll(ids[person], features[enrolled[labels[enrolled] == person]])
+    rejected = np.mean([student_id is None for student_id, _ in gallery.search(features[unknown])])
+    assert rejected < 0.5
+
+
+def test_calibration_uses_detected_faces_only(monkeypatch):
+    monkeypatch.setattr("app.training.scan_dataset", lambda: scan_dataset()[:6])
+    # Detektor hanya menemukan wajah di foto ke-0, 2, 4; sisanya dilewati, bukan diganti crop tengah
+    calls = itertools.count()
+    monkeypatch.setattr(
+        face_recognition, "detect_face", lambda image: [(0, 0, 64, 64)] if next(calls) % 2 == 0 else []
+    )
+
+    features, labels, skipped = gallery_module._dataset_features()
+    assert skipped == 3
+    assert len(features) == len(labels) == 3
+
+
+def test_calibrate_refuses_without_detections(monkeypatch, tmp_path):
+    monkeypatch.setattr(face_recognition, "detect_face", lambda image: [])
+    monkeypatch.setattr("app.training.scan_dataset", lambda: scan_dataset()[:4])
+    output = tmp_path / "calibration.json"
+    assert gallery_module.main(["calibrate", "--output", str(output)]) == 1
+    assert not output.exists()
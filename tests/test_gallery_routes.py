@@ -0,0 +1,29 @@
+from app import security
+
+from conftest import register_lecturer, seed_course
+
+
+def _student(client, db):
+    owner_id, owner_headers = register_lecturer(client)
+    _, students = seed_course(db, owner_id, n_students=1)
+    return students[0], owner_headers
+
+
+def test_gallery_routes_reject_other_lecturer(client, db):
+    student_id, _ = _student(client, db)
+    files = {"files": ("face.jpg", b"not an image", "image/jpeg")}
+
+    assert client.delete(f"/gallery/{student_id}").status_code == 401
+    assert client.post(f"/gallery/{student_id}/enroll", files=files).status_code == 401
+    _, other_headers = register_lecturer(client)
+    assert client.delete(f"/gallery/{student_id}", headers=other_headers).status_code == 404
+    assert client.post(f"/gallery/{student_id}/enroll", headers=other_headers, files=files).status_code == 404
+
+
+def test_course_owner_and_admin_manage_gallery(client, db, monkeypatch):
+    student_id, owner_headers = _student(client, db)
+    assert client.delete(f"/gallery/{student_id}", headers=owner_headers).status_code == 200
+
+    admin_id, admin_headers = register_lecturer(client)
+    monkeypatch.setattr(security, "ADMIN_LECTURER_IDS", frozenset({admin_id}))
+    assert client.delete(f"/gallery/{student_id}", headers=admin_headers).status_code == 200
@@ -0,0 +1,103 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.inference import InferencePool, InferenceUnavailable, _Request
+
+
+def _done(result=None, exc=None):
+    fut = Future()
+    if exc is not None:
+        fut.set_exception(exc)
+    else:
+        fut.set_result(result)
+    return fut
+
+
+class FakeExecutor:
+    def __init__(self, states):
+        self.states = list(states)
+
+    def submit(self, fn, *args):
+        return _done(self.states.pop(0))
+
+
+def test_probe_requires_every_worker_to_answer():
+    pool = InferencePool(workers=2)
+    pool._running = True
+    # Worker yang sama menjawab dua probe: worker kedua belum terbukti ready
+    pool._executor = FakeExecutor([{"status": "ready", "pid": 1}, {"status": "ready", "pid": 1}])
+    pool._probe_workers()
+    assert not pool.ready
+
+    pool._executor = FakeExecutor([{"status": "ready", "pid": 1}, {"status": "ready", "pid": 2}])
+    pool._probe_workers()
+    assert pool.ready
+
+
+def test_broken_pool_clears_ready_and_maps_error():
+    pool = InferencePool(workers=1)
+    pool.ready = True
+    req = _Request(frame=None, largest_only=True)
+    pool._on_batch_done([req], _done(exc=BrokenProcessPool("worker died")))
+    assert not pool.ready
+    assert pool.worker_states[0]["status"] == "error"
+    with pytest.raises(InferenceUnavailable):
+        req.future.result()
+
+
+def test_run_batch_dispatches_by_kind(monkeypatch):
+    from app import face_recognition, inference
+
+    monkeypatch.setattr(face_recognition, "use_version", lambda version: None)
+    monkeypatch.setattr(face_recognition, "recognize_faces_batch", lambda frames, **kw: [["rec", f] for f in frames])
+    monkeypatch.setattr(face_recognition, "detect_faces_batch", lambda frames: [["box", f] for f in frames])
+    monkeypatch.setattr(face_recognition, "classify_faces", lambda frame, boxes, cand: ["cls", frame, boxes, cand])
+    monkeypatch.setattr(face_recognition, "extract_face_features", lambda frame: ["feat", frame])
+
+    results, _, _ = inference._run_batch(
+        ["a", "b", "c", "d"], [True] * 4, [None, None, {1}, None], None,
+        ["detect", "recognize", "classify", "features"], [None, None, [(0, 0, 1, 1)], None],
+    )
+    assert results == [["box", "a"], ["rec", "b"], ["cls", "c", [(0, 0, 1, 1)], {1}], ["feat", "d"]]
+
+
+class FakePool:
+    def __init__(self):
+        self.calls = []
+
+    def detect(self, frame):
+        self.calls.append("detect")
+        return [(0, 0, 40, 40)]
+
+    def classify(self, frame, boxes, candidates=None):
+        self.calls.append("classify")
+        return [(7, 0.9) for _ in boxes]
+
+    def face_features(self, frame):
+        self.calls.append("features")
+        return None
+
+
+def test_stream_tracking_goes_through_pool(monkeypatch):
+    import numpy as np
+
+    from app import face_recognition, inference
+    from app.routers.attendance import _track_frame
+    from app.tracking import FaceTracker
+
+    def inline(*args, **kwargs):
+        raise AssertionError("model dipanggil di proses API")
+
+    monkeypatch.setattr(face_recognition, "detect_faces", inline)
+    monkeypatch.setattr(face_recognition, "classify_faces", inline)
+    monkeypatch.setattr(face_recognition, "extract_face_features", inline)
+    pool = FakePool()
+    monkeypatch.setattr(inference, "_pool", pool)
+
+    visible, classified, _ = _track_frame(np.zeros((64, 64, 3), np.uint8), FaceTracker(), {7})
+    assert pool.calls == ["detect", "classify"]
+    assert classified == 1 and visible[0].student_id == 7
+    assert inference.extract_face_features(np.zeros((64, 64, 3), np.uint8)) is None
+    assert pool.calls[-1] == "features"
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import migrations
+from app.database import Base
+
+
+@pytest.fixture
+def schema_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'explain.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def test_hot_queries_use_expected_indexes(schema_engine):
+    assert migrations.explain(schema_engine)
+
+
+@pytest.mark.parametrize("index, query", [
+    ("ix_sessions_course_meeting", "resolve_session"),
+    ("ix_course_enrollments_course_student", "report_absentees"),
+    ("uq_attendances_session_student", "enrollment_and_status"),
+])
+def test_dropped_index_fails_even_with_table_alias(schema_engine, index, query):
+    with schema_engine.begin() as conn:
+        conn.execute(text(f"DROP INDEX {index}"))
+    sql, indexes = migrations.HOT_QUERIES[query]
+    with schema_engine.connect() as conn:
+        problems = migrations.check_plan(migrations._plan(conn, sql), indexes)
+    assert f"index not used: {index}" in problems
+    assert not migrations.explain(schema_engine)
+
+
+def test_check_plan_flags_aliased_scans_and_wrong_index():
+    # SQLite dengan alias: dulu lolos karena hanya "SCAN <nama tabel>" yang dicari
+    assert migrations.check_plan(["SCAN e"], ()) == ["full scan: SCAN e"]
+    assert migrations.check_plan(["SCAN a USING COVERING INDEX ix_other"], ()) != []
+    assert migrations.check_plan(["Seq Scan on attendances a  (cost=0.00..1.00 rows=1 width=4)"], ()) != []
+    assert migrations.check_plan(
+        ["SEARCH a USING INDEX ix_attendances_session_status (session_id=?)"], ("uq_attendances_session_student",)
+    ) == ["index not used: uq_attendances_session_student"]
+    # PostgreSQL
+    assert migrations.check_plan(
+        ["Nested Loop Left Join", "  ->  Index Only Scan using ix_course_enrollments_course_student on course_enrollments e",
+         "  ->  Index Scan using uq_attendances_session_student on attendances a"],
+        ("ix_course_enrollments_course_student", "uq_attendances_session_student"),
+    ) == []
+    assert migrations.check_plan(["Bitmap Index Scan on uq_reports_course_meeting"], ("uq_reports_course_meeting",)) == []
@@ -0,0 +1,70 @@
+from sqlalchemy import update
+
+from app import models, report_cache as report_cache_module
+from app.database import SessionLocal
+from app.report_cache import mark_dirty, report_cache
+
+from conftest import register_lecturer, seed_course
+
+
+def _report_setup(client, db):
+    lecturer_id, headers = register_lecturer(client)
+    course_id, students = seed_course(db, lecturer_id)
+    db.add(models.Report(course_id=course_id, meeting_no=1, total_students=len(students)))
+    db.commit()
+    return course_id, f"/report/{course_id}/1", headers
+
+
+def _write_from_other_worker(course_id, monkeypatch):
+    """Write lewat jalur biasa, tapi invalidate lokal dimatikan: cache proses ini tidak tahu, seperti write di worker lain"""
+    monkeypatch.setattr(report_cache, "invalidate", lambda key: None)
+    with SessionLocal() as other:
+        mark_dirty(other, course_id, 1)
+        other.execute(
+            update(models.Report)
+            .where(models.Report.course_id == course_id, models.Report.meeting_no == 1)
+            .values(hadir_count=models.Report.hadir_count + 1)
+        )
+        other.commit()
+
+
+def test_etag_is_stable_and_answers_304(client, db):
+    _, url, headers = _report_setup(client, db)
+    first = client.get(url, headers=headers)
+    etag = first.headers["etag"]
+    assert client.get(url, headers=headers).headers["etag"] == etag
+    assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+
+
+def test_cache_hit_skips_report_build(client, db, monkeypatch):
+    _, url, headers = _report_setup(client, db)
+    etag = client.get(url, headers=headers).headers["etag"]
+
+    def _no_build(*args):
+        raise AssertionError("report dibangun ulang padahal cache masih berlaku")
+
+    monkeypatch.setattr("app.routers.report._build_report", _no_build)
+    assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+
+
+def test_write_in_other_worker_visible_immediately(client, db, monkeypatch):
+    course_id, url, headers = _report_setup(client, db)
+    first = client.get(url, headers=headers)
+    assert first.json()["summary"]["hadir_count"] == 0
+    assert report_cache.get((course_id, 1)) is not None
+
+    _write_from_other_worker(course_id, monkeypatch)
+    # Entry lokal tidak di-invalidate; versi di DB yang membuatnya basi
+    assert report_cache.get((course_id, 1)) is not None
+    fresh = client.get(url, headers={**headers, "If-None-Match": first.headers["etag"]})
+    assert fresh.status_code == 200
+    assert fresh.json()["summary"]["hadir_count"] == 1
+    assert fresh.headers["etag"] != first.headers["etag"]
+
+
+def test_commit_bumps_report_version(client, db):
+    course_id, _, _ = _report_setup(client, db)
+    before = report_cache_module.report_version(db, course_id, 1)
+    mark_dirty(db, course_id, 1)
+    db.commit()
+    assert report_cache_module.report_version(db, course_id, 1) == before + 1
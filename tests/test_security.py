@@ -0,0 +1,37 @@
+import asyncio
+import threading
+
+from app import security
+
+from conftest import register_lecturer
+
+
+def test_password_queue_full_returns_503(client, monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(security, "_password_slots", slots)
+    response = client.post("/auth/login", data={"username": "nobody@example.com", "password": "x"})
+    # Lecturer tidak ada: tidak ada bcrypt, tidak butuh slot
+    assert response.status_code == 401
+
+    response = client.post("/auth/register", data={"name": "A", "email": "full@example.com", "password": "x"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(security.PASSWORD_HASH_RETRY_AFTER)
+
+
+def test_cached_token_opens_no_db_session(client, monkeypatch):
+    lecturer_id, headers = register_lecturer(client)
+    token = headers["Authorization"].split()[1]
+    security.principal_cache.clear()
+
+    opened = []
+    real = security.async_session
+
+    def counting_session():
+        opened.append(1)
+        return real()
+
+    monkeypatch.setattr(security, "async_session", counting_session)
+    assert asyncio.run(security.get_current_lecturer(token)).id == lecturer_id
+    assert asyncio.run(security.get_current_lecturer(token)).id == lecturer_id
+    assert len(opened) == 1
@@ -0,0 +1,74 @@
+from app import models
+
+from conftest import register_lecturer, seed_course
+
+
+def _open_session(client, db):
+    owner_id, owner_headers = register_lecturer(client)
+    course_id, students = seed_course(db, owner_id)
+    response = client.post("/sessions/", headers=owner_headers, json={"course_id": course_id, "meeting_no": 1})
+    session_id = response.json()["id"]
+    return session_id, owner_headers, students
+
+
+def _state(db, session_id):
+    db.expire_all()
+    sess = db.get(models.Session, session_id)
+    marked = db.query(models.Attendance).filter_by(session_id=session_id).count()
+    return sess.finished_at, marked
+
+
+def test_create_rejects_anonymous_and_other_lecturer(client, db):
+    owner_id, _ = register_lecturer(client)
+    course_id, _ = seed_course(db, owner_id)
+    body = {"course_id": course_id, "meeting_no": 1}
+
+    assert client.post("/sessions/", json=body).status_code == 401
+    _, other_headers = register_lecturer(client)
+    assert client.post("/sessions/", headers=other_headers, json=body).status_code == 404
+    assert db.query(models.Session).filter_by(course_id=course_id).count() == 0
+
+
+def test_finish_rejects_anonymous_and_other_lecturer(client, db):
+    session_id, _, _ = _open_session(client, db)
+    url = f"/sessions/{session_id}/finish?mark_remaining_absent=true"
+
+    assert client.post(url).status_code == 401
+    _, other_headers = register_lecturer(client)
+    assert client.post(url, headers=other_headers).status_code == 404
+    assert _state(db, session_id) == (None, 0)
+
+
+def test_owner_finishes_and_marks_remaining_absent(client, db):
+    session_id, owner_headers, students = _open_session(client, db)
+    response = client.post(f"/sessions/{session_id}/finish?mark_remaining_absent=true", headers=owner_headers)
+    assert response.status_code == 200
+    assert response.json()["marked_remaining_absent"] == len(students)
+    finished_at, marked = _state(db, session_id)
+    assert finished_at is not None and marked == len(students)
+
+
+def test_one_session_per_meeting(client, db):
+    session_id, owner_headers, students = _open_session(client, db)
+    course_id = db.get(models.Session, session_id).course_id
+    body = {"course_id": course_id, "meeting_no": 1}
+    again = client.post("/sessions/", headers=owner_headers, json=body)
+    assert again.status_code == 200 and again.json()["id"] == session_id
+
+    client.post(f"/sessions/{session_id}/finish", headers=owner_headers)
+    assert client.post("/sessions/", headers=owner_headers, json=body).status_code == 409
+
+
+def test_mark_after_finish_is_rejected(client, db):
+    session_id, owner_headers, students = _open_session(client, db)
+    course_id = db.get(models.Session, session_id).course_id
+    client.post(f"/sessions/{session_id}/finish", headers=owner_headers)
+
+    response = client.post(
+        "/attendance/mark/manual",
+        headers=owner_headers,
+        json={"student_id": students[0], "course_id": course_id, "meeting_no": 1, "status": "sakit"},
+    )
+    assert response.status_code == 409
+    assert _state(db, session_id)[1] == 0
+    assert db.query(models.Session).filter_by(course_id=course_id).count() == 1
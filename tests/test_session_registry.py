@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from sqlalchemy import delete, update
+
+from app import models
+from app.database import engine
+from app.session_registry import session_registry
+
+from conftest import register_lecturer, seed_course
+
+
+def _open_session(client, db):
+    lecturer_id, headers = register_lecturer(client)
+    course_id, students = seed_course(db, lecturer_id)
+    response = client.post("/sessions/", headers=headers, json={"course_id": course_id, "meeting_no": 1})
+    return response.json()["id"], course_id, students
+
+
+def test_entry_served_until_ttl(client, db, monkeypatch):
+    session_id, _, _ = _open_session(client, db)
+    monkeypatch.setattr(session_registry, "ttl", 3600)
+    assert session_registry.get(session_id) is not None
+
+
+def test_finish_in_other_worker_seen_after_ttl(client, db, monkeypatch):
+    session_id, _, _ = _open_session(client, db)
+    # Worker lain menutup sesi: registry proses ini tidak di-evict
+    with engine.begin() as conn:
+        conn.execute(update(models.Session).where(models.Session.id == session_id).values(finished_at=datetime.utcnow()))
+
+    monkeypatch.setattr(session_registry, "ttl", 0)
+    assert session_registry.get(session_id) is None
+    assert session_registry.load(db, session_id) is None
+
+
+def test_enrollment_change_in_other_worker_seen_after_ttl(client, db, monkeypatch):
+    session_id, course_id, students = _open_session(client, db)
+    with engine.begin() as conn:
+        conn.execute(
+            delete(models.CourseEnrollment).where(
+                models.CourseEnrollment.course_id == course_id, models.CourseEnrollment.student_id == students[0]
+            )
+        )
+
+    monkeypatch.setattr(session_registry, "ttl", 0)
+    assert session_registry.get(session_id) is None
+    assert session_registry.load(db, session_id).candidates == frozenset(students[1:])
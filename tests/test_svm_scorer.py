@@ -0,0 +1,45 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.svm import SVC
+
+from app import features
+from app.model_registry import SVM_MODEL_PATH
+from app.svm_scorer import CompactSVC, SklearnScorer, build_scorer
+
+from conftest import center_crops
+
+# Coupling compact diselesaikan eksak, libsvm berhenti di toleransi 0.005/k (teramati ~1.3e-3)
+MAX_PROBA_DIFF = 5e-3
+
+
+def assert_parity(svm, feats):
+    labels, probs = CompactSVC(svm).score(feats)
+    np.testing.assert_array_equal(labels, svm.predict(feats))
+    assert np.abs(probs - svm.predict_proba(feats)).max() <= MAX_PROBA_DIFF
+    np.testing.assert_allclose(probs.sum(axis=1), 1.0, atol=1e-6)
+
+
+def test_compact_matches_sklearn_on_shipped_model():
+    svm = joblib.load(SVM_MODEL_PATH)
+    feats = features.extract_hog_batch(center_crops(120))
+    assert_parity(svm, feats)
+
+
+@pytest.mark.parametrize("kernel", ["linear", "rbf", "poly", "sigmoid"])
+@pytest.mark.parametrize("classes", [2, 12])
+def test_compact_matches_sklearn_on_synthetic_models(kernel, classes):
+    rng = np.random.default_rng(classes)
+    centers = rng.random((classes, features.FEATURE_DIM))
+    x = np.vstack([c + 0.05 * rng.standard_normal((6, features.FEATURE_DIM)) for c in centers])
+    y = np.repeat(np.arange(classes), 6)
+    svm = SVC(kernel=kernel, probability=True, random_state=0).fit(x, y)
+    queries = centers[rng.integers(0, classes, 48)] + 0.08 * rng.standard_normal((48, features.FEATURE_DIM))
+    assert_parity(svm, queries)
+
+
+def test_unsupported_model_falls_back_to_sklearn():
+    rng = np.random.default_rng(0)
+    svm = SVC(kernel=lambda a, b: a @ b.T, probability=True, random_state=0).fit(rng.random((12, 5)), [0, 1] * 6)
+    assert isinstance(build_scorer(svm), SklearnScorer)
+    assert isinstance(build_scorer(joblib.load(SVM_MODEL_PATH)), CompactSVC)
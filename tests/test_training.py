@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pytest
+
+from app import face_recognition, features, training
+from app.model_registry import registry
+
+
+def test_cache_directory_follows_pipeline_config(tmp_path, monkeypatch):
+    base = training.FeatureCache(str(tmp_path)).directory
+    assert training.FeatureCache(str(tmp_path)).directory == base
+
+    monkeypatch.setattr(features, "HOG_BACKEND", "skimage" if features.HOG_BACKEND != "skimage" else "numpy")
+    assert training.FeatureCache(str(tmp_path)).directory != base
+    monkeypatch.undo()
+
+    monkeypatch.setattr(training.detectors, "FACE_DETECTOR", "haar")
+    assert training.FeatureCache(str(tmp_path)).directory != base
+    monkeypatch.undo()
+
+    monkeypatch.setattr(face_recognition, "FACE_SIZE", (96, 96))
+    assert training.FeatureCache(str(tmp_path)).directory != base
+
+
+def test_cache_key_changes_with_detector_weights(tmp_path, monkeypatch):
+    weights = tmp_path / "yolo.pt"
+    weights.write_bytes(b"v1")
+    monkeypatch.setattr(training.detectors, "FACE_DETECTOR", "yolo")
+    monkeypatch.setattr(training.detectors, "YOLO_MODEL_PATH", str(weights))
+    before = training.config_key(training.pipeline_config())
+    weights.write_bytes(b"v2")
+    assert training.config_key(training.pipeline_config()) != before
+
+
+def _dataset():
+    rng = np.random.default_rng(0)
+    centers = rng.random((2, features.FEATURE_DIM))
+    X = np.vstack([c + 0.05 * rng.standard_normal((6, features.FEATURE_DIM)) for c in centers])
+    y = np.array(["A"] * 6 + ["B"] * 6)
+    return X, y, {"A": 1, "B": 2}
+
+
+def test_training_publishes_inactive_version():
+    active = registry.active_version()
+    mtime = os.path.getmtime(face_recognition.SVM_MODEL_PATH)
+    version = training.fit_and_publish(*_dataset())
+    assert version in [meta["version"] for meta in registry.versions()]
+    assert registry.active_version() == active
+    assert os.path.getmtime(face_recognition.SVM_MODEL_PATH) == mtime
+
+
+def test_export_refuses_production_model_path():
+    with pytest.raises(SystemExit):
+        training.fit_and_export(*_dataset(), face_recognition.SVM_MODEL_PATH)
+
+
+def test_cache_shard_stores_features_only(tmp_path):
+    cache = training.FeatureCache(str(tmp_path))
+    feat = np.arange(features.FEATURE_DIM, dtype=np.float32)
+    cache.add_shard([("a", feat), ("b", None)])
+    assert sorted(os.listdir(cache.directory)) == ["config.json", "index.json", "shard_00000.features.npy"]
+    reopened = training.FeatureCache(str(tmp_path))
+    np.testing.assert_array_equal(reopened.features("a"), feat)
+    assert "b" in reopened and reopened.features("b") is None
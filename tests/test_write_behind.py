@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from app import models, write_behind
+from app.routers.attendance import write_pending_marks
+from app.write_behind import WriteBehindBuffer
+
+from conftest import register_lecturer, seed_course
+
+
+def test_compaction_fsyncs_journal_directory(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(write_behind, "_fsync_dir", synced.append)
+    written = []
+    buffer = WriteBehindBuffer(str(tmp_path / "journal" / "attendance.journal"), flush_ms=60_000)
+    assert buffer.start(lambda db, marks: written.extend(marks))
+    try:
+        buffer.submit(1, 1, 1, {5: models.AttendanceStatus.hadir}, datetime.utcnow())
+        assert buffer.flush() == 1
+    finally:
+        buffer.shutdown()
+    assert [mark.student_id for mark in written] == [5]
+    assert synced and synced[0] == str(tmp_path / "journal")
+
+
+def _mark(session_id, course_id, student_id, status, model_version=None):
+    return write_behind.PendingMark(
+        session_id, course_id, 1, student_id, status, datetime(2024, 1, 1, 8, 0), model_version
+    ).to_json()
+
+
+def test_journal_replay_writes_marks_after_crash(tmp_path, client, db):
+    lecturer_id, _ = register_lecturer(client)
+    course_id, (a, b, c) = seed_course(db, lecturer_id)
+    sess = models.Session(course_id=course_id, meeting_no=1)
+    db.add(sess)
+    db.commit()
+
+    # Journal yang ditinggalkan proses yang crash sebelum flush: mark terakhir per
+    # mahasiswa menang, baris terakhir terpotong di tengah penulisan
+    journal = tmp_path / "attendance.journal"
+    journal.write_text(
+        _mark(sess.id, course_id, a, models.AttendanceStatus.hadir, "v1") + "\n"
+        + _mark(sess.id, course_id, b, models.AttendanceStatus.sakit) + "\n"
+        + _mark(sess.id, course_id, a, models.AttendanceStatus.tanpa_keterangan) + "\n"
+        + _mark(sess.id, course_id, c, models.AttendanceStatus.hadir)[:40]
+    )
+
+    buffer = WriteBehindBuffer(str(journal), flush_ms=60_000)
+    assert buffer.start(write_pending_marks)
+    buffer.shutdown()
+
+    db.expire_all()
+    rows = {
+        row.student_id: row.status
+        for row in db.query(models.Attendance).filter_by(session_id=sess.id)
+    }
+    assert rows == {a: models.AttendanceStatus.tanpa_keterangan, b: models.AttendanceStatus.sakit}
+    report = db.query(models.Report).filter_by(course_id=course_id, meeting_no=1).one()
+    assert (report.hadir_count, report.sakit_count, report.tanpa_keterangan_count) == (0, 1, 1)
+    # Setelah flush journal dikompaksi: start berikutnya tidak me-replay apa pun
+    assert journal.read_text() == ""
+    assert buffer._replay() == 0
+
+
+def test_truncated_journal_tail_does_not_swallow_new_marks(tmp_path):
+    journal = tmp_path / "attendance.journal"
+    journal.write_text(
+        _mark(1, 1, 10, models.AttendanceStatus.hadir) + "\n"
+        + _mark(1, 1, 11, models.AttendanceStatus.hadir)[:40]
+    )
+
+    def failing_writer(db, marks):
+        raise RuntimeError("database down")
+
+    buffer = WriteBehindBuffer(str(journal), flush_ms=60_000)
+    assert buffer.start(failing_writer)  # flush replay gagal, journal tetap dipakai
+    buffer.submit(1, 1, 1, {12: models.AttendanceStatus.sakit}, datetime.utcnow())
+    buffer.shutdown()  # flush terakhir juga gagal
+
+    restarted = WriteBehindBuffer(str(journal), flush_ms=60_000)
+    assert restarted._replay() == 2
+    assert restarted.pending(1).keys() == {10, 12}